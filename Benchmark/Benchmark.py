@@ -0,0 +1,205 @@
+'''
+Benchmark of the phases of the solution of a model
+
+Bars of increasing size are generated and the time and the peak memory of each phase are measured separately:
+mesh, Assemble_K_G, Assemble_f_G, Boundary_Conditions, Factorize, Solve (the substitution) and the evaluation of
+the fields in many points. The peak memory of a phase is the memory allocated on top of the memory in use at its
+start.
+The results are written in a JSON file so that the runs of different versions can be compared.
+
+Usage:
+    python Benchmark/Benchmark.py --sizes 100 1000 10000 --output results.json
+'''
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from FEA_1D import *
+
+
+# Phases measured in the order they are run
+PHASES = ("mesh", "Assemble_K_G", "Assemble_f_G", "Boundary_Conditions", "Factorize", "Solve", "queries")
+
+
+def build_model(n_elements, n_beams=4, length=1000.0):
+    '''
+    A bar with several beams, supports and loads is created
+
+    The bar is fixed at both ends and has a prescribed displacement in the middle aux node when the number of
+    beams is even. Point loads are applied in the rest of aux nodes and the beams have different materials,
+    sections and distributed loads.
+
+    :param n_elements: (int) Approximate number of elements of the mesh
+    :param n_beams: (int) Number of beams of the bar
+    :param length: (float) Length of the bar [mm]
+    :return: (Model, float) Model not meshed and maximum length of the elements
+    '''
+
+    model = Model()
+
+    # The aux nodes and the beams are added as tables
+    x = np.linspace(0, length, n_beams + 1)
+    i = np.arange(n_beams + 1)
+
+    F = np.where((i == 0) | (i == n_beams), np.nan, 1000.0 * i)
+    u = np.full(n_beams + 1, np.nan)
+    u[[0, n_beams]] = 0
+    if n_beams % 2 == 0:
+        F[n_beams // 2], u[n_beams // 2] = np.nan, 0.01
+
+    model.add_aux_nodes(x, F, u)
+
+    materials = [Material("Steel", 200e3), Material("Aluminium", 70e3)]
+    sections = [Section(100), Section(50)]
+
+    i = np.arange(n_beams)
+    model.add_beams(np.column_stack([i, i + 1]), materials, sections, i % 2, (i // 2) % 2, 10.0 * (i % 3))
+
+    # A small margin so that the rounding of the division doesn't add an extra element per beam
+    maximum_length = length / n_elements * (1 + 1e-9)
+
+    return model, maximum_length
+
+
+def run_phases(model, maximum_length, n_points, element):
+    '''
+    The phases of the solution of a model are run one after the other
+
+    :param model: (Model) Model not meshed, built with build_model
+    :param maximum_length: (float) Maximum length of the elements
+    :param n_points: (int) Number of points where the fields are evaluated
+    :param element: (Element) Type of element
+    :return: (generator) Name of each phase after it's run, the last value is the model
+    '''
+
+    model.mesh(maximum_length, element)
+    yield "mesh"
+
+    model.Assemble_K_G()
+    yield "Assemble_K_G"
+
+    model.Assemble_f_G()
+    yield "Assemble_f_G"
+
+    model.Boundary_Conditions()
+    yield "Boundary_Conditions"
+
+    model.Factorize()
+    yield "Factorize"
+
+    # The phases before are up to date, so Solve only does the substitution and the reactions
+    model.Solve()
+    yield "Solve"
+
+    x = np.linspace(0, 1000.0, n_points)
+    model.delta_pos(x)
+    model.sigma_pos(x)
+    model.force_pos(x)
+    yield "queries"
+
+    yield model
+
+
+def benchmark(n_elements, n_beams=4, n_points=100000, element=Element.LINEAR, memory=True):
+    '''
+    The time and the peak memory of each phase are measured for a model
+
+    The memory is measured in a second run because tracing the allocations slows down the code. The model is
+    built before the measures, so the mesh phase is only mesh().
+
+    :param n_elements: (int) Approximate number of elements of the mesh
+    :param n_beams: (int) Number of beams of the bar
+    :param n_points: (int) Number of points where the fields are evaluated
+    :param element: (Element) Type of element
+    :param memory: (bool) If True, the peak memory of each phase is measured
+    :return: (dict) Results of the model
+    '''
+
+    result = {"n_elements": None, "n_nodes": None, "n_beams": n_beams, "n_points": n_points,
+              "element": element.name, "time": {}, "peak_memory": {}}
+
+    model, maximum_length = build_model(n_elements, n_beams)
+
+    gc.collect()
+    start = time.perf_counter()
+    for phase in run_phases(model, maximum_length, n_points, element):
+        end = time.perf_counter()
+        if isinstance(phase, Model):
+            model = phase
+            break
+
+        result["time"][phase] = end - start
+        start = time.perf_counter()
+
+    result["n_elements"] = model.n_elements
+    result["n_nodes"] = model.n_nodes
+    result["max_displacement"] = float(np.max(np.abs(model.delta)))
+    del model
+
+    if memory:
+        model, maximum_length = build_model(n_elements, n_beams)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            for phase in run_phases(model, maximum_length, n_points, element):
+                if isinstance(phase, Model):
+                    break
+
+                # The peak is measured from the memory in use at the start of the phase
+                result["peak_memory"][phase] = tracemalloc.get_traced_memory()[1] - start
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+
+        finally:
+            tracemalloc.stop()
+            del model
+
+    return result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the phases of the solution of FEA_1D models")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** k for k in range(2, 6)],
+                        help="Number of elements of the models (up to 10^7)")
+    parser.add_argument("--beams", type=int, default=4, help="Number of beams of the bar")
+    parser.add_argument("--points", type=int, default=100000, help="Number of points of the field queries")
+    parser.add_argument("--element", choices=[e.name for e in Element], default=Element.LINEAR.name)
+    parser.add_argument("--no-memory", action="store_true", help="Don't measure the peak memory")
+    parser.add_argument("--output", type=Path, help="JSON file with the results, printed if it's not given")
+    options = parser.parse_args(arguments)
+
+    results = {"python": platform.python_version(),
+               "numpy": np.__version__,
+               "machine": platform.machine(),
+               "phases": list(PHASES),
+               "runs": []}
+
+    for n_elements in options.sizes:
+        run = benchmark(n_elements, options.beams, options.points, Element[options.element], not options.no_memory)
+        results["runs"].append(run)
+
+        print("{:>10} elements  ".format(run["n_elements"])
+              + "  ".join("{} {:.3f} s".format(phase, run["time"][phase]) for phase in PHASES),
+              file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if options.output is None:
+        print(text)
+    else:
+        options.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class PiecewiseLinear:
+    '''
+    Property defined by a table of values, linearly interpolated between the points of the table
+
+    It can be used as the Young's modulus of a material, the area of a section or the distributed load of a beam.
+    Outside of the table the first or the last value is used.
+    '''
+
+    def __init__(self, x, values):
+        '''
+        Constructor of the class PiecewiseLinear
+
+        :param x: (list) Coordinates of the points of the table, in increasing order
+        :param values: (list) Value of the property in each point
+        '''
+
+        self.x = np.asarray(x, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+        if self.x.ndim != 1 or self.x.shape != self.values.shape or len(self.x) == 0:
+            raise ValueError("The table must have the same number of coordinates and values")
+
+        if np.any(np.diff(self.x) < 0):
+            raise ValueError("The coordinates of the table must be in increasing order")
+
+    def __call__(self, x):
+        return np.interp(x, self.x, self.values)
+
+
+def as_function(value):
+    '''
+    A property is converted to a function of the coordinate x
+
+    :param value: (float, function, PiecewiseLinear or list of pairs (x, value)) Property
+    :return: (function) Vectorized function of x, None if the property is constant
+    '''
+
+    if callable(value):
+        return value
+
+    if isinstance(value, (list, tuple, np.ndarray)) and np.ndim(value) == 2:
+        table = np.asarray(value, dtype=float)
+        return PiecewiseLinear(table[:, 0], table[:, 1])
+
+    return None
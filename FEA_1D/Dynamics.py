@@ -0,0 +1,129 @@
+import numpy as np
+
+from FEA_1D.IO import FieldWriter, load_fields
+from FEA_1D.Solver import factorize
+
+
+def newmark(model, dt, n_steps, load=None, beta=1/4, gamma=1/2, damping=(0, 0), u0=None, v0=None, output=None,
+            every=1):
+    '''
+    Transient dynamic analysis with the implicit Newmark method
+
+    The equation of motion M·a + C·v + K·u = f(t) is integrated in time. The consistent mass matrix is assembled
+    with the density of the materials and the damping is proportional (Rayleigh): C = alpha·M + beta_K·K.
+
+    The effective stiffness K + a0·M + a1·C is constant, so it is factorized only once and each step only needs
+    products of banded matrices and one substitution: the cost is linear in steps x nodes. The imposed
+    displacements of the model are kept constant in time.
+
+    With the default parameters (beta = 1/4, gamma = 1/2, average acceleration) the method is unconditionally
+    stable and has no numerical damping.
+
+    :param model: (Model) Meshed model, the density of the materials must be defined
+    :param dt: (float) Time step
+    :param n_steps: (int) Number of steps
+    :param load: (function) Loads at the time t:
+        - None: the loads of the model are applied at t = 0 and kept constant (step load)
+        - function of t that returns a scalar: factor that multiplies the loads of the model
+        - function of t that returns an array (n_nodes,): global load vector
+    :param beta: (float) Parameter beta of Newmark
+    :param gamma: (float) Parameter gamma of Newmark
+    :param damping: (tuple) Coefficients (alpha, beta_K) of the Rayleigh damping
+    :param u0: (np.array) Initial displacements (n_nodes,). Imposed displacements and zero by default
+    :param v0: (np.array) Initial velocities (n_nodes,). Zero by default
+    :param output: (str or Path) File where the results are written step by step (see FEA_1D.IO.load_fields).
+        If it's None the results are kept in memory
+    :param every: (int) The results are stored every this number of steps
+    :return: (dict) Results {"t": (n_out,), "delta", "velocity", "acceleration": (n_out, n_nodes)}. If there is
+        an output file, the arrays are memory-mapped from the file
+    '''
+
+    model.Assemble_K_G()
+    model.Assemble_M_G()
+    model.Assemble_f_G()
+    model.Boundary_Conditions()
+
+    free = model.free
+    n = model.n_nodes
+    u_c = model.u_c[:, 0]
+
+    K_ff = model.K_G_cc
+    M_ff = model.M_G.submatrix(free) if not isinstance(model.M_G, np.ndarray) else model.M_G[np.ix_(free, free)]
+    C_ff = damping[0] * M_ff + damping[1] * K_ff
+
+    # Integration constants of the Newmark method
+    a0 = 1 / (beta * dt ** 2)
+    a1 = gamma / (beta * dt)
+    a2 = 1 / (beta * dt)
+    a3 = 1 / (2 * beta) - 1
+    a4 = gamma / beta - 1
+    a5 = dt * (gamma / (2 * beta) - 1)
+
+    # The effective stiffness is factorized only once
+    factorization = factorize(K_ff + a0 * M_ff + a1 * C_ff)
+
+    # Effect of the imposed displacements in the loads of the free nodes, they are constant in time
+    f_c = (model.K_G @ u_c)[free]
+    f_G = model.f_G[:, 0]
+
+    def forces(t):
+        value = f_G if load is None else load(t)
+        value = value * f_G if np.ndim(value) == 0 else np.asarray(value, dtype=float).reshape(-1)
+        return value[free] - f_c
+
+    # Initial conditions, the initial acceleration is obtained from the equation of motion
+    u = (u_c if u0 is None else np.asarray(u0, dtype=float))[free].copy()
+    v = np.zeros(len(free)) if v0 is None else np.asarray(v0, dtype=float)[free].copy()
+
+    try:
+        a = factorize(M_ff).solve(forces(0) - K_ff @ u - C_ff @ v)
+    except np.linalg.LinAlgError:
+        raise np.linalg.LinAlgError("Singular mass matrix, check the density of the materials")
+
+    n_out = n_steps // every + 1
+    fields = ("delta", "velocity", "acceleration")
+
+    if output is None:
+        results = {"t": np.zeros(n_out)}
+        results.update({field: np.zeros((n_out, n)) for field in fields})
+
+        def write(name, row, values):
+            results[name][row] = values
+
+    else:
+        writer = FieldWriter(output, dict({"t": ((n_out,), float)}, **{field: ((n_out, n), float)
+                                                                         for field in fields}),
+                             {"dt": dt, "n_steps": n_steps, "beta": beta, "gamma": gamma})
+        write = writer.write
+
+    def store(row, t):
+        write("t", row, t)
+        for field, values, constrained in zip(fields, (u, v, a), (u_c, 0, 0)):
+            values_global = np.full(n, constrained, dtype=float)
+            values_global[free] = values
+            write(field, row, values_global)
+
+    try:
+        store(0, 0.0)
+
+        for step in range(1, n_steps + 1):
+            t = step * dt
+
+            f = forces(t) + M_ff @ (a0 * u + a2 * v + a3 * a) + C_ff @ (a1 * u + a4 * v + a5 * a)
+
+            u_new = factorization.solve(f)
+            a_new = a0 * (u_new - u) - a2 * v - a3 * a
+            v = v + dt * ((1 - gamma) * a + gamma * a_new)
+            u, a = u_new, a_new
+
+            if step % every == 0:
+                store(step // every, t)
+
+    finally:
+        if output is not None:
+            writer.close()
+
+    if output is not None:
+        return load_fields(output)
+
+    return results
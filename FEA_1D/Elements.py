@@ -1,11 +1,17 @@
 import numpy as np
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from enum import Enum
 
+from FEA_1D.Distribution import as_function
+
 
 
 class element_1D_LINEAR:
 
-    def __init__(self, n1, n2, E, A, n_x, id):
+    __slots__ = ("n1", "n2", "x1", "x2", "L", "E", "A", "n_x", "rho", "id")
+
+    def __init__(self, n1, n2, E, A, n_x, id, rho=0):
         '''
         Linear element in 1D
 
@@ -14,6 +20,7 @@ class element_1D_LINEAR:
         :param E: Elasticity module
         :param A: Area
         :param n_x: Distributed force
+        :param rho: Density
         '''
 
         # Nodes that form the element
@@ -32,6 +39,9 @@ class element_1D_LINEAR:
         # Distributed forces
         self.n_x = n_x
 
+        # Density, for the mass matrix
+        self.rho = rho
+
         # Node identifier
         self.id = id
 
@@ -126,6 +136,17 @@ class element_1D_LINEAR:
 
         return 1 * f(1/np.sqrt(3)) + 1 * f(-1/np.sqrt(3))
 
+    def _M(self):
+        '''
+        Consistent mass matrix
+
+        :return: (np.array) Mass matrix
+        '''
+
+        m = lambda chi: self._N(chi).T @ self._N(chi) * self._J() * self.rho * self.A
+
+        return 1 * m(1/np.sqrt(3)) + 1 * m(-1/np.sqrt(3))
+
 
     def u(self, delta, chi):
         '''
@@ -217,6 +238,672 @@ class element_1D_LINEAR:
         print("x2: ", round(self.x2, 2), "mm")
 
 
+class element_1D_CUADRATIC:
+
+    __slots__ = ("n1", "n2", "n3", "x1", "x2", "L", "E", "A", "n_x", "rho", "id")
+
+    def __init__(self, n1, n2, n3, E, A, n_x, id, rho=0):
+        '''
+        Quadratic element in 1D
+
+        :param n1: Node 1, at the start of the element
+        :param n2: Node 2, in the middle of the element
+        :param n3: Node 3, at the end of the element
+        :param E: Elasticity module
+        :param A: Area
+        :param n_x: Distributed force
+        :param rho: Density
+        '''
+
+        # Nodes that form the element
+        self.n1 = n1
+        self.n2 = n2
+        self.n3 = n3
+
+        # Geometry
+        self.x1 = n1.x
+        self.x2 = n3.x
+        self.L = self.x2 - self.x1
+
+        # Properties of the node
+        self.E = E
+        self.A = A
+
+        # Distributed forces
+        self.n_x = n_x
+
+        # Density, for the mass matrix
+        self.rho = rho
+
+        # Node identifier
+        self.id = id
+
+    def delta_element(self, delta):
+        '''
+        Vector of the displacements of the element
+
+        :param delta: (np.array) Displacement of the nodes
+        :return: (np.array) Displacement of the element
+        '''
+
+        return np.array([delta[self.n1.id_global], delta[self.n2.id_global], delta[self.n3.id_global]])
+
+    def chi_in_x(self, x):
+        '''
+        Coordinates transformation from x to chi
+
+        :param x: (float) Coordinate in x
+        :return: (float) Coordinate in chi
+        '''
+
+        return 2 * (x - self.x1) / self.L - 1
+
+    def _J(self):
+        '''
+        Jacobian of the quadratic element. The middle node is in the center, so it's constant
+
+        :return: (float) Jacobian
+        '''
+
+        return self.L/2
+
+    def _N(self, chi):
+        '''
+        Matrix of the shape functions in natural coordinates
+
+        :return: (np.array) Matrix of shape functions
+        '''
+
+        N1 = 1/2 * chi * (chi - 1)
+        N2 = 1 - chi**2
+        N3 = 1/2 * chi * (chi + 1)
+        return np.array([[N1, N2, N3]])
+
+    def _B(self, chi):
+        '''
+        Matrix of the derivatives of the shape functions in global coordinates
+
+        :return: (np.array) Matrix of derivatives
+        '''
+
+        dN1 = chi - 1/2
+        dN2 = -2 * chi
+        dN3 = chi + 1/2
+        return 1 / self._J() * np.array([[dN1, dN2, dN3]])
+
+    def _D(self):
+        '''
+        Elastic matrix, for 1D it becomes a scalar
+
+        :return: (np.array) Elastic matrix
+        '''
+
+        return np.array([[self.E]])
+
+    def _K(self):
+        '''
+        Stiffness matrix, integrated with three Gauss points
+
+        :return: (np.array) Stiffness matrix
+        '''
+
+        k = lambda chi: self._B(chi).T @ self._D() @ self._B(chi) * self._J() * self.A
+
+        return 5/9 * k(-np.sqrt(3/5)) + 8/9 * k(0) + 5/9 * k(np.sqrt(3/5))
+
+    def _f(self):
+        '''
+        Vector of loads of the element, integrated with three Gauss points
+
+        :return: (np.array) Vector of loads
+        '''
+
+        f = lambda chi: self._J() * self._N(chi).T * self.n_x
+
+        return 5/9 * f(-np.sqrt(3/5)) + 8/9 * f(0) + 5/9 * f(np.sqrt(3/5))
+
+    def _M(self):
+        '''
+        Consistent mass matrix, integrated with three Gauss points
+
+        :return: (np.array) Mass matrix
+        '''
+
+        m = lambda chi: self._N(chi).T @ self._N(chi) * self._J() * self.rho * self.A
+
+        return 5/9 * m(-np.sqrt(3/5)) + 8/9 * m(0) + 5/9 * m(np.sqrt(3/5))
+
+    def u(self, delta, chi):
+        '''
+        Displacement in chi coordinate
+
+        :param delta: (np.array) Displacement of the nodes
+        :param chi: (float) Coordinate in chi
+        :return: (np.array) Displacement
+        '''
+
+        if -1 <= chi <= 1:
+            return self._N(chi) @ self.delta_element(delta)
+
+        else:
+            return None
+
+    def epsilon_chi(self, delta, chi):
+        '''
+        Strain in chi coordinate
+
+        :param delta: (np.array) Displacement of the nodes
+        :param chi: (float) Coordinate in chi
+        :return: (np.array) Strain
+        '''
+
+        if -1 <= chi <= 1:
+            return self._B(chi) @ self.delta_element(delta)
+
+        else:
+            return None
+
+    def sigma_chi(self, delta, chi):
+        '''
+        Stress in chi coordinate
+
+        :param delta: (np.array) Displacement of the nodes
+        :param chi: (float) Coordinate in chi
+        :return: (np.array) Stress
+        '''
+
+        if -1 <= chi <= 1:
+            return self._D() @ self._B(chi) @ self.delta_element(delta)
+
+        else:
+            return None
+
+    def force_chi(self, delta, chi):
+        '''
+        Internal force in chi coordinate
+
+        :param delta: (np.array) Displacement of the nodes
+        :param chi: (float) Coordinate in chi
+        :return: (np.array) Internal force
+        '''
+
+        if -1 <= chi <= 1:
+            return self._D() @ self._B(chi) @ self.delta_element(delta) * self.A
+
+        else:
+            return None
+
+    def info(self):
+        '''
+        Information element
+
+        :return: None
+        '''
+        print("Element information")
+        print("Node 1: ", self.n1.id_global)
+        print("Node 2: ", self.n2.id_global)
+        print("Node 3: ", self.n3.id_global)
+        print("Longitud: ", self.L)
+        print("x1: ", round(self.x1, 2), "mm")
+        print("x2: ", round(self.x2, 2), "mm")
+
+
+class element_1D_batch(ABC):
+    '''
+    Set of elements in 1D of the same type stored in contiguous arrays
+
+    The stiffness matrices and load vectors of all the elements are computed in one vectorized pass, instead
+    of calling _K() and _f() for each element. The shape functions are defined by the subclasses, so the base
+    class can't be instantiated.
+    '''
+
+    # Number of nodes of each element
+    nodes_per_element = None
+
+    # Points and weights of the Gauss quadrature
+    gauss_points = None
+    gauss_weights = None
+
+    def __init__(self, connectivity, x1, x2, E, A, n_x, ids=None, groups=None, functions=None, rho=0):
+        '''
+        Constructor of the class element_1D_batch
+
+        :param connectivity: (np.array) Global id of the nodes of each element (n_elements, nodes per element)
+        :param x1: (np.array) Coordinate of the first node of each element
+        :param x2: (np.array) Coordinate of the last node of each element
+        :param E: (np.array) Elasticity module of each element
+        :param A: (np.array) Area of each element
+        :param n_x: (np.array) Distributed force of each element
+        :param ids: (np.array) Identifier of each element. By default 1, 2, 3, ...
+        :param groups: (np.array) Index in functions of the properties of each element, -1 if they are constant
+        :param functions: (list) Functions of x of the properties of each group (E, A, n_x, rho), None if constant
+        :param rho: (np.array) Density of each element
+        '''
+
+        connectivity = np.asarray(connectivity)
+        if connectivity.dtype.kind not in "iu":
+            connectivity = connectivity.astype(int)
+
+        self.connectivity = connectivity.reshape((-1, self.nodes_per_element))
+        self.n_elements = self.connectivity.shape[0]
+
+        # Geometry
+        self.x1 = np.asarray(x1, dtype=float)
+        self.x2 = np.asarray(x2, dtype=float)
+        self._L = None
+
+        # Properties of the elements. The arrays given are not copied, so a batch built from ElementArrays
+        # shares the properties with the model
+        self.E = _element_values(E, self.n_elements)
+        self.A = _element_values(A, self.n_elements)
+
+        # Distributed forces
+        self.n_x = _element_values(n_x, self.n_elements)
+
+        # Density
+        self.rho = _element_values(rho, self.n_elements)
+
+        # Properties that are functions of x. E, A and n_x are then the values in the middle of the elements
+        self.groups = None if groups is None else np.asarray(groups)
+        self.functions = functions if functions is not None else []
+
+        # Element identifiers, 1, 2, 3, ... are only created when they are used
+        self._ids = None if ids is None else np.asarray(ids, dtype=int)
+
+        # Order of the elements by their first coordinate, it is computed the first time a point is located
+        self._sorted = None
+        self._x1_sorted = None
+
+    @property
+    def L(self):
+        '''
+        Length of the elements. It is computed the first time it's used, so a batch of memory-mapped arrays
+        doesn't read all the coordinates when it's created
+        '''
+
+        if self._L is None:
+            self._L = self.x2 - self.x1
+
+        return self._L
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = np.arange(1, self.n_elements + 1)
+
+        return self._ids
+
+    @staticmethod
+    @abstractmethod
+    def _element_nodes(e):
+        '''
+        Nodes of an element object, in the order of the shape functions
+
+        :param e: Element
+        :return: (list) Nodes of the element
+        '''
+
+    @classmethod
+    def from_elements(cls, elements):
+        '''
+        The arrays are built from a collection of elements
+
+        :param elements: (dict) Elements of the model {id: element}
+        :return: (element_1D_batch) Batch of elements
+        '''
+
+        elements = list(elements.values())
+
+        return cls([[n.id_global for n in cls._element_nodes(e)] for e in elements],
+                   [e.x1 for e in elements],
+                   [e.x2 for e in elements],
+                   [e.E for e in elements],
+                   [e.A for e in elements],
+                   [e.n_x for e in elements],
+                   [e.id for e in elements])
+
+    def take(self, i):
+        '''
+        A subset of the elements is obtained as a new batch
+
+        :param i: (np.array) Position in the batch of the elements
+        :return: (element_1D_batch) Batch with the elements
+        '''
+
+        return type(self)(self.connectivity[i], self.x1[i], self.x2[i], self.E[i], self.A[i], self.n_x[i], self.ids[i],
+                          None if self.groups is None else self.groups[i], self.functions, self.rho[i])
+
+    def _J(self):
+        '''
+        Jacobian of all the elements
+
+        :return: (np.array) Jacobian (n_elements,)
+        '''
+
+        return self.L / 2
+
+    @abstractmethod
+    def _N(self, chi):
+        '''
+        Shape functions in natural coordinates
+
+        :param chi: (float or np.array) Coordinate in chi, one for all the elements or one per element
+        :return: (np.array) Shape functions (..., nodes per element)
+        '''
+
+    @abstractmethod
+    def _dN(self, chi):
+        '''
+        Derivatives of the shape functions in natural coordinates
+
+        :param chi: (float or np.array) Coordinate in chi, one for all the elements or one per element
+        :return: (np.array) Derivatives of the shape functions (..., nodes per element)
+        '''
+
+    def _B(self, chi, i=slice(None)):
+        '''
+        Derivatives of the shape functions in global coordinates
+
+        :param chi: (float or np.array) Coordinate in chi, one for all the elements or one per element
+        :param i: (np.array) Position in the batch of the elements. All the elements by default
+        :return: (np.array) Derivatives of the shape functions (..., nodes per element)
+        '''
+
+        return self._dN(chi) / self._J()[i][..., None]
+
+    def x_in_chi(self, chi, i=slice(None)):
+        '''
+        Coordinates transformation from chi to x
+
+        :param chi: (float or np.array) Coordinate in chi, one for all the elements or one per element
+        :param i: (np.array) Position in the batch of the elements. All the elements by default
+        :return: (np.array) Coordinates in x
+        '''
+
+        return self.x1[i] + (np.asarray(chi) + 1) * self._J()[i]
+
+    def property(self, name, chi, i=slice(None)):
+        '''
+        Value of a property of a set of elements in a point of each element
+
+        If the property is a function of x, it is evaluated at once for all the elements of each group.
+
+        :param name: (str) Property: "E", "A", "n_x" or "rho"
+        :param chi: (float or np.array) Coordinate in chi, one for all the elements or one per element
+        :param i: (np.array) Position in the batch of the elements. All the elements by default
+        :return: (np.array) Value of the property
+        '''
+
+        values = getattr(self, name)[i]
+        if self.groups is None:
+            return values
+
+        k = ("E", "A", "n_x", "rho").index(name)
+        groups = self.groups[i]
+        values = np.array(np.broadcast_to(values, np.broadcast(values, chi).shape), dtype=float)
+
+        for g in np.unique(groups):
+            if g < 0 or self.functions[g][k] is None:
+                continue
+
+            mask = np.broadcast_to(groups == g, values.shape)
+            x = np.broadcast_to(self.x_in_chi(chi, i), values.shape)
+            values[mask] = self.functions[g][k](x[mask])
+
+        return values
+
+    def gauss_interpolation(self, values, i, chi):
+        '''
+        Values known in the Gauss points are interpolated in other points of the elements (Lagrange polynomial
+        through the Gauss points)
+
+        :param values: (np.array) Values in the Gauss points of all the elements (n_elements, n_gauss)
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Interpolated values
+        '''
+
+        chi = np.asarray(chi, dtype=float)
+        result = np.zeros(np.broadcast(chi, i).shape)
+
+        for g, chi_g in enumerate(self.gauss_points):
+            l = np.ones_like(chi)
+            for h, chi_h in enumerate(self.gauss_points):
+                if h != g:
+                    l = l * (chi - chi_h) / (chi_g - chi_h)
+
+            result = result + l * values[i, g]
+
+        return result
+
+    def _K(self):
+        '''
+        Stiffness matrices of all the elements, integrated with the Gauss quadrature
+
+        The properties that are functions of x are evaluated in the Gauss points of each element.
+
+        :return: (np.array) Stiffness matrices (n_elements, nodes per element, nodes per element)
+        '''
+
+        def k(chi):
+            B = self._B(chi)
+            EA = self.property("E", chi) * self.property("A", chi)
+            return (EA * self._J())[:, None, None] * B[:, :, None] * B[:, None, :]
+
+        return sum(w * k(chi) for chi, w in zip(self.gauss_points, self.gauss_weights))
+
+    def _f(self, n_x=None):
+        '''
+        Load vectors of all the elements, integrated with the Gauss quadrature
+
+        :param n_x: (np.array) Distributed force of each element. The one of the elements by default, evaluated in
+            the Gauss points if it's a function of x
+        :return: (np.array) Load vectors (n_elements, nodes per element)
+        '''
+
+        if n_x is None:
+            f = lambda chi: (self._J() * self.property("n_x", chi))[:, None] * self._N(chi)
+        else:
+            f = lambda chi: (self._J() * n_x)[:, None] * self._N(chi)
+
+        return sum(w * f(chi) for chi, w in zip(self.gauss_points, self.gauss_weights))
+
+    def _M(self):
+        '''
+        Consistent mass matrices of all the elements, integrated with the Gauss quadrature
+
+        :return: (np.array) Mass matrices (n_elements, nodes per element, nodes per element)
+        '''
+
+        def m(chi):
+            N = self._N(chi)
+            rhoA = self.property("rho", chi) * self.property("A", chi)
+            return (rhoA * self._J())[:, None, None] * N[None, :, None] * N[None, None, :]
+
+        return sum(w * m(chi) for chi, w in zip(self.gauss_points, self.gauss_weights))
+
+    def scatter_K(self, K_G, K_e=None):
+        '''
+        The stiffness matrices of the elements are added to the global stiffness matrix. It is also used for other
+        matrices of the elements, as the mass matrices
+
+        :param K_G: (np.array or BandedMatrix) Global stiffness matrix
+        :param K_e: (np.array) Stiffness matrices of the elements. They are computed if they are not given
+        :return: None
+        '''
+
+        if K_e is None:
+            K_e = self._K()
+
+        rows = np.broadcast_to(self.connectivity[:, :, None], K_e.shape)
+        cols = np.broadcast_to(self.connectivity[:, None, :], K_e.shape)
+
+        if isinstance(K_G, np.ndarray):
+            np.add.at(K_G, (rows, cols), K_e)
+        else:
+            K_G.add(rows, cols, K_e)
+
+    def scatter_f(self, f_G, f_e=None):
+        '''
+        The load vectors of the elements are added to the global load vector
+
+        :param f_G: (np.array) Global load vector (n_nodes, 1)
+        :param f_e: (np.array) Load vectors of the elements. They are computed if they are not given
+        :return: None
+        '''
+
+        if f_e is None:
+            f_e = self._f()
+
+        f_G[:, 0] += np.bincount(self.connectivity.ravel(), weights=f_e.ravel(), minlength=f_G.shape[0])
+
+    def locate(self, x, tolerance=0):
+        '''
+        The elements that contain a set of points are obtained with a binary search on the sorted elements
+
+        A point on a node between two elements is assigned to the element on its right, except at the end of the bar.
+
+        :param x: (np.array) Coordinates of the points
+        :param tolerance: (float) Distance that a point can be outside of an element
+        :return: (np.array) Position in the batch of the element of each point
+        '''
+
+        # The elements are sorted by their first coordinate only once
+        if self._sorted is None:
+            self._sorted = np.argsort(self.x1, kind="stable")
+
+        if self._x1_sorted is None:
+            self._x1_sorted = self.x1[self._sorted]
+
+        x = np.asarray(x, dtype=float)
+
+        i = np.searchsorted(self._x1_sorted, x, side="right") - 1
+        i = self._sorted[np.clip(i, 0, self.n_elements - 1)]
+
+        # The points must be inside of the element found, otherwise they are outside of the model
+        outside = (x < self.x1[i] - tolerance) | (x > self.x2[i] + tolerance)
+        if np.any(outside):
+            raise ValueError("The points {} are outside of the model".format(x[outside]))
+
+        return i
+
+    def chi_in_x(self, x, i):
+        '''
+        Coordinates transformation from x to chi
+
+        :param x: (np.array) Coordinates in x
+        :param i: (np.array) Position in the batch of the element of each point
+        :return: (np.array) Coordinates in chi
+        '''
+
+        return 2 * (x - self.x1[i]) / self.L[i] - 1
+
+    def delta_element(self, delta, i):
+        '''
+        Displacements of the nodes of a set of elements
+
+        :param delta: (np.array) Displacement of the nodes
+        :param i: (np.array) Position in the batch of the elements
+        :return: (np.array) Displacements of the nodes of the elements (..., nodes per element)
+        '''
+
+        return np.asarray(delta).reshape(-1)[self.connectivity[i]]
+
+    def u(self, delta, i, chi):
+        '''
+        Displacement in chi coordinate of a set of elements
+
+        :param delta: (np.array) Displacement of the nodes
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Displacements
+        '''
+
+        return np.sum(self._N(chi) * self.delta_element(delta, i), axis=-1)
+
+    def epsilon_chi(self, delta, i, chi):
+        '''
+        Strain in chi coordinate of a set of elements
+
+        :param delta: (np.array) Displacement of the nodes
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Strains
+        '''
+
+        return np.sum(self._B(chi, i) * self.delta_element(delta, i), axis=-1)
+
+    def sigma_chi(self, delta, i, chi):
+        '''
+        Stress in chi coordinate of a set of elements
+
+        :param delta: (np.array) Displacement of the nodes
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Stresses
+        '''
+
+        return self.property("E", chi, i) * self.epsilon_chi(delta, i, chi)
+
+    def force_chi(self, delta, i, chi):
+        '''
+        Internal force in chi coordinate of a set of elements
+
+        :param delta: (np.array) Displacement of the nodes
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Internal forces
+        '''
+
+        return self.sigma_chi(delta, i, chi) * self.property("A", chi, i)
+
+
+class element_1D_LINEAR_batch(element_1D_batch):
+    '''
+    Set of linear elements in 1D (element_1D_LINEAR) stored in contiguous arrays
+    '''
+
+    nodes_per_element = 2
+
+    gauss_points = (-1/np.sqrt(3), 1/np.sqrt(3))
+    gauss_weights = (1, 1)
+
+    @staticmethod
+    def _element_nodes(e):
+        return [e.n1, e.n2]
+
+    def _N(self, chi):
+        chi = np.asarray(chi, dtype=float)
+        return np.stack([1/2 * (1 - chi), 1/2 * (1 + chi)], axis=-1)
+
+    def _dN(self, chi):
+        chi = np.asarray(chi, dtype=float)
+        return np.stack([np.full_like(chi, -1/2), np.full_like(chi, 1/2)], axis=-1)
+
+
+class element_1D_CUADRATIC_batch(element_1D_batch):
+    '''
+    Set of quadratic elements in 1D (element_1D_CUADRATIC) stored in contiguous arrays
+    '''
+
+    nodes_per_element = 3
+
+    gauss_points = (-np.sqrt(3/5), 0, np.sqrt(3/5))
+    gauss_weights = (5/9, 8/9, 5/9)
+
+    @staticmethod
+    def _element_nodes(e):
+        return [e.n1, e.n2, e.n3]
+
+    def _N(self, chi):
+        chi = np.asarray(chi, dtype=float)
+        return np.stack([1/2 * chi * (chi - 1), 1 - chi**2, 1/2 * chi * (chi + 1)], axis=-1)
+
+    def _dN(self, chi):
+        chi = np.asarray(chi, dtype=float)
+        return np.stack([chi - 1/2, -2 * chi, chi + 1/2], axis=-1)
+
+
 class Element(Enum):
     '''
     Type of element according to the shape functions
@@ -226,4 +913,270 @@ class Element(Enum):
     CUADRATIC = 2
 
 
+# Batch of elements of each type of element
+ELEMENT_BATCHES = {Element.LINEAR: element_1D_LINEAR_batch, Element.CUADRATIC: element_1D_CUADRATIC_batch}
+
+
+class ElementArrays(Mapping):
+    '''
+    Elements of a model stored as a structure of arrays
+
+    The connectivity (int32) and the properties E, A and n_x of all the elements are stored in contiguous arrays.
+    It behaves as the dictionary {id: element} used before, but the elements are views created when they are
+    accessed, so there isn't a Python object per element. The identifiers of the elements are 1, 2, 3, ...
+    '''
+
+    def __init__(self, nodes, capacity=16):
+        '''
+        Constructor of the class ElementArrays
+
+        :param nodes: (NodeArrays) Nodes of the model
+        :param capacity: (int) Initial number of elements that can be stored without allocating memory
+        '''
+
+        self.nodes = nodes
+        self.element_type = None
+
+        self.n = 0
+        self.connectivity = np.zeros((capacity, 0), dtype=np.int32)
+        self.E = np.zeros(capacity)
+        self.A = np.zeros(capacity)
+        self.n_x = np.zeros(capacity)
+        self.rho = np.zeros(capacity)
+
+        # Properties that are functions of x: group of each element (-1 if they are constant) and functions of
+        # each group (E, A, n_x, rho). The groups are only created if there are functions
+        self.groups = None
+        self.functions = []
+
+        # Number of elements of each group. The groups left without elements are reused by the next functions
+        self.group_sizes = []
+        self.free_groups = []
+
+        # Function called as on_change(i, name, value) instead of set_property when a property of an element is
+        # modified through its view. The model that owns the arrays sets it to update the assembled matrices
+        self.on_change = None
+
+    def extend(self, element_type, connectivity, E, A, n_x, rho=0):
+        '''
+        Several elements of the same type are added at once
+
+        :param element_type: (Element) Type of the elements
+        :param connectivity: (np.array) Global id of the nodes of each element (n_elements, nodes per element)
+        :param E: (np.array or function) Elasticity module of each element or function of x
+        :param A: (np.array or function) Area of each element or function of x
+        :param n_x: (np.array or function) Distributed force of each element or function of x
+        :param rho: (np.array or function) Density of each element or function of x
+        :return: (np.array) Identifiers of the elements added
+        '''
+
+        nodes_per_element = ELEMENT_BATCHES[element_type].nodes_per_element
+        connectivity = np.asarray(connectivity, dtype=np.int32).reshape((-1, nodes_per_element))
+        n_new = connectivity.shape[0]
+
+        if self.element_type is None:
+            self.element_type = element_type
+            self.connectivity = np.zeros((len(self.E), nodes_per_element), dtype=np.int32)
+
+        # The capacity of the arrays is doubled when they are full, so adding an element is O(1) on average
+        if self.n + n_new > len(self.E):
+            capacity = max(2 * len(self.E), self.n + n_new)
+            for name in ("connectivity", "E", "A", "n_x", "rho", "groups"):
+                old = getattr(self, name)
+                if old is None:
+                    continue
+
+                array = np.full((capacity,) + old.shape[1:], -1 if name == "groups" else 0, dtype=old.dtype)
+                array[:self.n] = old[:self.n]
+                setattr(self, name, array)
+
+        i = np.arange(self.n, self.n + n_new)
+        self.connectivity[i] = connectivity
+        self.n += n_new
+
+        self.set_properties(i, E, A, n_x, rho)
+
+        return i + 1
+
+    def set_properties(self, i, E, A, n_x, rho=0):
+        '''
+        The properties of a set of elements are changed
+
+        The properties can be constant or functions of x (functions or tables of values, see
+        FEA_1D.Distribution). The arrays E, A and n_x store the values in the middle of the elements, and the
+        functions are used to integrate the elements.
+
+        :param i: (np.array) Position of the elements in the arrays
+        :param E: (float, np.array or function) Elasticity module
+        :param A: (float, np.array or function) Area
+        :param n_x: (float, np.array or function) Distributed force
+        :param rho: (float, np.array or function) Density
+        :return: None
+        '''
+
+        functions = tuple(as_function(value) for value in (E, A, n_x, rho))
+        x_middle = (self.nodes.x[self.connectivity[i, 0]] + self.nodes.x[self.connectivity[i, -1]]) / 2
+
+        for name, value, function in zip(("E", "A", "n_x", "rho"), (E, A, n_x, rho), functions):
+            getattr(self, name)[i] = value if function is None else function(x_middle)
+
+        # The elements leave their previous groups, which are freed when they have no elements left
+        if self.groups is not None:
+            old_groups, counts = np.unique(self.groups[i], return_counts=True)
+            for g, count in zip(old_groups, counts):
+                if g < 0:
+                    continue
+
+                self.group_sizes[g] -= count
+                if self.group_sizes[g] == 0:
+                    self.functions[g] = None
+                    self.free_groups.append(g)
+
+        if any(function is not None for function in functions):
+            if self.groups is None:
+                self.groups = np.full(len(self.E), -1, dtype=np.int32)
+
+            if self.free_groups:
+                g = self.free_groups.pop()
+                self.functions[g] = functions
+                self.group_sizes[g] = len(i)
+            else:
+                g = len(self.functions)
+                self.functions.append(functions)
+                self.group_sizes.append(len(i))
+
+            self.groups[i] = g
+
+        elif self.groups is not None:
+            self.groups[i] = -1
+
+    def set_property(self, i, name, value):
+        '''
+        A property of an element is changed, the other properties are kept (constants or functions of x)
+
+        :param i: (int) Position of the element in the arrays
+        :param name: (str) Property: "E", "A", "n_x" or "rho"
+        :param value: (float or function) New value of the property
+        :return: None
+        '''
+
+        g = -1 if self.groups is None else self.groups[i]
+
+        values = []
+        for k, key in enumerate(("E", "A", "n_x", "rho")):
+            function = self.functions[g][k] if g >= 0 else None
+            values.append(value if key == name else getattr(self, key)[i] if function is None else function)
+
+        self.set_properties(np.array([i]), *values)
+
+    def batch(self):
+        '''
+        Batch with all the elements. The properties of the batch share the memory with these arrays
+
+        :return: (element_1D_batch) Batch of elements
+        '''
+
+        connectivity = self.connectivity[:self.n]
+        x = self.nodes.x
+
+        return ELEMENT_BATCHES[self.element_type or Element.LINEAR](connectivity, x[connectivity[:, 0]],
+                                                                    x[connectivity[:, -1]], self.E[:self.n],
+                                                                    self.A[:self.n], self.n_x[:self.n],
+                                                                    np.arange(1, self.n + 1),
+                                                                    None if self.groups is None else
+                                                                    self.groups[:self.n], self.functions,
+                                                                    self.rho[:self.n])
+
+    def __getitem__(self, id):
+        if not 1 <= id <= self.n:
+            raise KeyError(id)
+
+        if self.element_type == Element.CUADRATIC:
+            return element_1D_CUADRATIC_view(self, int(id))
+
+        return element_1D_LINEAR_view(self, int(id))
+
+    def __iter__(self):
+        return iter(range(1, self.n + 1))
+
+    def __len__(self):
+        return self.n
+
+
+class element_view:
+    '''
+    Attributes of an element read and written in ElementArrays
+
+    The changes of the properties are notified to the model that owns the arrays.
+    '''
+
+    __slots__ = ()
+
+    def _node(self, position):
+        return self._arrays.nodes[self._arrays.connectivity[self.id - 1, position]]
+
+    n1 = property(lambda self: self._node(0))
+    n2 = property(lambda self: self._node(1))
+    n3 = property(lambda self: self._node(2))
+
+    x1 = property(lambda self: self._node(0).x)
+    x2 = property(lambda self: self._node(-1).x)
+    L = property(lambda self: self.x2 - self.x1)
+
+    def _property(name):
+        def get(self):
+            return getattr(self._arrays, name)[self.id - 1].item()
+
+        def set(self, value):
+            arrays = self._arrays
+            (arrays.on_change or arrays.set_property)(self.id - 1, name, value)
+
+        return property(get, set)
+
+    E = _property("E")
+    A = _property("A")
+    n_x = _property("n_x")
+    rho = _property("rho")
+
+    del _property
+
+
+class element_1D_LINEAR_view(element_view, element_1D_LINEAR):
+    '''
+    Linear element stored in ElementArrays, with the same methods as element_1D_LINEAR
+    '''
+
+    __slots__ = ("_arrays",)
+
+    def __init__(self, arrays, id):
+        self._arrays = arrays
+        self.id = id
+
+
+class element_1D_CUADRATIC_view(element_view, element_1D_CUADRATIC):
+    '''
+    Quadratic element stored in ElementArrays, with the same methods as element_1D_CUADRATIC
+    '''
+
+    __slots__ = ("_arrays",)
+
+    def __init__(self, arrays, id):
+        self._arrays = arrays
+        self.id = id
+
+
+def _element_values(values, n):
+    '''
+    A property of the elements is converted to an array with one value per element. An array with the right
+    size is not copied
+
+    :param values: (float or np.array) Value for all the elements or one value per element
+    :param n: (int) Number of elements
+    :return: (np.array) Values (n,)
+    '''
+
+    values = np.asarray(values, dtype=float)
+    if values.shape == (n,):
+        return values
 
+    return np.full(n, values)
@@ -0,0 +1,489 @@
+import json
+
+import numpy as np
+
+from FEA_1D.Elements import ELEMENT_BATCHES, Element, ElementArrays
+from FEA_1D.Material import Material
+from FEA_1D.Node import NodeArrays
+from FEA_1D.Section import Section
+from FEA_1D.Solver import Precision, Storage
+
+
+# First bytes of a file of a model and version of the format
+MAGIC = b"FEA1D\x00"
+VERSION = 1
+
+# The arrays are aligned in the file, so they can be memory-mapped efficiently
+ALIGNMENT = 64
+
+
+def save_model(model, path):
+    '''
+    A meshed model, and its results if it's solved, is saved in a binary file
+
+    The file has a small JSON header with the description of the model and the position of each array, followed by
+    the raw arrays: nodes, connectivity, properties of the elements, tables of materials and sections, beams,
+    boundary conditions and, if the model is solved, the displacements, the reactions and the stress in the middle
+    of each element for the loads of the model and each load case.
+
+    :param model: (Model) Model to save
+    :param path: (str or Path) Path of the file
+    :return: None
+    '''
+
+    n = model.n_nodes
+    n_elements = model.n_elements
+
+    # The functions of x can't be stored in the file
+    if model.elements.groups is not None and np.any(model.elements.groups[:n_elements] >= 0):
+        raise NotImplementedError("Unimplemented method for models with properties defined as functions of x.")
+
+    # Tables of the materials and sections, each beam stores the index of its material and section
+    materials = []
+    sections = []
+    for beam in model.beams.values():
+        if not any(beam.material is m for m in materials):
+            materials.append(beam.material)
+
+        if not any(beam.section is s for s in sections):
+            sections.append(beam.section)
+
+    beam_ids = list(model.beams)
+    n_aux = model.n_aux_nodes
+    beams = [model.beams[id] for id in beam_ids]
+
+    beam_elements = np.array([[model.beam_elements[id].start, model.beam_elements[id].stop]
+                              if id in model.beam_elements else [0, 0] for id in beam_ids], dtype=np.int64)
+
+    arrays = {"node_x": model.nodes.x[:n],
+              "node_F": model.nodes.F[:n],
+              "node_u": model.nodes.u[:n],
+              "aux_id": np.arange(n_aux, dtype=np.int64),
+              "aux_x": model.aux_nodes.x[:n_aux],
+              "aux_F": model.aux_nodes.F[:n_aux],
+              "aux_u": model.aux_nodes.u[:n_aux],
+              "material_E": np.array([m.E for m in materials], dtype=float),
+              "material_rho": np.array([m.rho for m in materials], dtype=float),
+              "material_sigma_y": np.array([np.nan if m.sigma_y is None else m.sigma_y for m in materials], dtype=float),
+              "material_H": np.array([m.H for m in materials], dtype=float),
+              "section_A": np.array([s.A for s in sections], dtype=float),
+              "beam_id": np.array(beam_ids, dtype=np.int64),
+              "beam_nodes": np.array([[b.nodes[0].id_global, b.nodes[1].id_global] for b in beams],
+                                     dtype=np.int64).reshape((-1, 2)),
+              "beam_material": np.array([next(i for i, m in enumerate(materials) if b.material is m)
+                                         for b in beams], dtype=np.int64),
+              "beam_section": np.array([next(i for i, s in enumerate(sections) if b.section is s)
+                                        for b in beams], dtype=np.int64),
+              "beam_n_x": np.array([b.n_x for b in beams], dtype=float),
+              "beam_elements": beam_elements.reshape((-1, 2))}
+
+    if n_elements > 0:
+        batch = model.element_batch()
+        if batch._sorted is None:
+            batch._sorted = np.argsort(batch.x1, kind="stable")
+
+        arrays.update({"connectivity": model.elements.connectivity[:n_elements],
+                       "element_E": model.elements.E[:n_elements],
+                       "element_A": model.elements.A[:n_elements],
+                       "element_n_x": model.elements.n_x[:n_elements],
+                       "element_rho": model.elements.rho[:n_elements],
+                       "element_x1": batch.x1,
+                       "element_x2": batch.x2,
+                       "element_order": batch._sorted,
+                       "element_x1_sorted": batch.x1[batch._sorted]})
+
+    # Results of the loads of the model in the first column and of the load cases in the next ones
+    cases = list(model.load_cases)
+    if model.solved:
+        arrays["delta"] = np.hstack([model.delta] + [model.load_case_results[c]["delta"] for c in cases])
+        arrays["reactions"] = np.hstack([model.reactions] + [model.load_case_results[c]["reactions"] for c in cases])
+        arrays["element_sigma"] = np.stack([model.sigma_elements(c) for c in [None] + cases], axis=1)
+
+    header = {"version": VERSION,
+              "tolerance": model.tolerance,
+              "storage": model.storage.name,
+              "precision": model.precision.name,
+              "element_type": None if model.element_type is None else model.element_type.name,
+              "solved": model.solved,
+              "materials": [m.name for m in materials],
+              "load_cases": [{"name": c,
+                              "forces": [[id, F] for id, F in model.load_cases[c]["forces"].items()],
+                              "n_x": [[id, n_x] for id, n_x in model.load_cases[c]["n_x"].items()]}
+                             for c in cases],
+              "arrays": {}}
+
+    # The position of each array is given from the start of the data, after the header
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _padded(array.nbytes)
+
+    with open(path, "wb") as file:
+        _write_header(file, header)
+
+        for name, array in arrays.items():
+            file.write(array.tobytes())
+            file.write(b"\x00" * (_padded(array.nbytes) - array.nbytes))
+
+
+def load_model(path, mmap=True):
+    '''
+    A model saved with save_model is loaded
+
+    With mmap the arrays of the nodes, elements and results are memory-mapped: opening the file doesn't read them,
+    and only the pages used by the queries are read from the disk. The arrays are copy-on-write, the model can be
+    changed and solved again without modifying the file.
+
+    :param path: (str or Path) Path of the file
+    :param mmap: (bool) If True the arrays are memory-mapped, otherwise they are read into memory
+    :return: (Model) Model
+    '''
+
+    from FEA_1D.Model import Model
+
+    header, start = _read_header(path)
+    if "storage" not in header:
+        raise ValueError("The file {} doesn't contain a model".format(path))
+
+    def array(name):
+        return _read_array(path, header, start, name, mmap)
+
+    model = Model(Storage[header["storage"]], header["tolerance"], Precision[header.get("precision", "DOUBLE")])
+
+    # Auxiliary nodes, materials, sections and beams
+    model.add_aux_nodes(array("aux_x"), array("aux_F"), array("aux_u"))
+
+    materials = [Material(name, E, rho, None if np.isnan(sigma_y) else sigma_y, H)
+                 for name, E, rho, sigma_y, H in zip(header["materials"], array("material_E").tolist(),
+                                                     array("material_rho").tolist(),
+                                                     array("material_sigma_y").tolist(), array("material_H").tolist())]
+    sections = [Section(A) for A in array("section_A").tolist()]
+
+    model.add_beams(array("beam_nodes").reshape((-1, 2)), materials, sections, array("beam_material"),
+                    array("beam_section"), array("beam_n_x"))
+
+    for id, elements in zip(array("beam_id").tolist(), array("beam_elements").tolist()):
+        if elements[1] > elements[0]:
+            model.beam_elements[id] = range(*elements)
+
+    # Nodes, the arrays are used directly by the model
+    nodes = NodeArrays(0)
+    nodes.x, nodes.F, nodes.u = array("node_x"), array("node_F"), array("node_u")
+    nodes.n = len(nodes.x)
+
+    elements = ElementArrays(nodes, 0)
+    if "connectivity" in header["arrays"]:
+        elements.element_type = Element[header["element_type"]]
+        elements.connectivity = array("connectivity")
+        elements.E, elements.A, elements.n_x = array("element_E"), array("element_A"), array("element_n_x")
+        elements.rho = array("element_rho")
+        elements.n = len(elements.E)
+
+        # The batch is built with the saved coordinates and order, so it doesn't read the arrays
+        batch = ELEMENT_BATCHES[elements.element_type](elements.connectivity, array("element_x1"),
+                                                       array("element_x2"), elements.E, elements.A, elements.n_x,
+                                                       rho=elements.rho)
+        batch._sorted = array("element_order")
+        batch._x1_sorted = array("element_x1_sorted")
+        model._element_batch = batch
+
+    model.nodes = nodes
+    model.elements = elements
+    model._connect_arrays()
+    model.n_nodes = nodes.n
+    model.n_elements = elements.n
+    model.element_type = elements.element_type
+
+    # The index of coordinates is built only if a node is searched
+    model._node_index = None
+
+    for case in header["load_cases"]:
+        model.load_cases[case["name"]] = {"forces": {id: F for id, F in case["forces"]},
+                                          "n_x": {id: n_x for id, n_x in case["n_x"]}}
+
+    # Results
+    if header["solved"]:
+        delta, reactions, sigma = array("delta"), array("reactions"), array("element_sigma")
+
+        model.delta = delta[:, :1]
+        model.reactions = reactions[:, :1]
+        model._sigma_elements[None] = sigma[:, 0]
+
+        for i, case in enumerate(model.load_cases, start=1):
+            model.load_case_results[case] = {"delta": delta[:, i:i + 1], "reactions": reactions[:, i:i + 1]}
+            model._sigma_elements[case] = sigma[:, i]
+
+        model.solved = True
+
+    return model
+
+
+# Fields of the solution that can be exported {name: method of element_1D_batch}
+FIELDS = {"delta": "u", "epsilon": "epsilon_chi", "sigma": "sigma_chi", "force": "force_chi"}
+
+
+def iter_fields(model, x=None, n_points=None, fields=tuple(FIELDS), case=None, chunk_size=65536):
+    '''
+    The fields of the solution are evaluated in chunks of a fixed number of points
+
+    The points can be given as an array of coordinates, as a number of points evenly distributed along the model
+    (the coordinates of each chunk are generated when it's evaluated) or, by default, the middle of each element
+    in the order of their coordinate. Only one chunk is in memory at the same time.
+
+    :param model: (Model) Solved model
+    :param x: (np.array) Coordinates of the points. It can be a memory-mapped array
+    :param n_points: (int) Number of points evenly distributed between the first and the last node
+    :param fields: (tuple) Fields evaluated, some of "delta", "epsilon", "sigma" and "force"
+    :param case: (str) Name of the load case. The loads of the model by default
+    :param chunk_size: (int) Maximum number of points of each chunk
+    :return: (generator) Chunks {"x": np.array, "element": np.array (only for elements), field: np.array}
+    '''
+
+    if not model.solved:
+        raise Exception("The model is not solved")
+
+    for field in fields:
+        if field not in FIELDS:
+            raise ValueError("Unknown field {}, it must be one of {}".format(field, list(FIELDS)))
+
+    batch = model.element_batch()
+    delta = model.delta if case is None else model.load_case_results[case]["delta"]
+
+    if x is not None:
+        n = len(x)
+    elif n_points is not None:
+        n = n_points
+        x_min, x_max = batch.x1.min(), batch.x2.max()
+    else:
+        n = batch.n_elements
+        if batch._sorted is None:
+            batch._sorted = np.argsort(batch.x1, kind="stable")
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+
+        if x is not None or n_points is not None:
+            if x is not None:
+                x_chunk = np.asarray(x[start:stop], dtype=float)
+            else:
+                x_chunk = x_min + (x_max - x_min) * np.arange(start, stop) / max(n - 1, 1)
+
+            i = batch.locate(x_chunk, model.tolerance)
+            chi = batch.chi_in_x(x_chunk, i)
+            chunk = {"x": x_chunk}
+
+        else:
+            # The middle of the elements
+            i = batch._sorted[start:stop]
+            chi = np.zeros(len(i))
+            chunk = {"x": (batch.x1[i] + batch.x2[i]) / 2, "element": batch.ids[i]}
+
+        for field in fields:
+            chunk[field] = getattr(batch, FIELDS[field])(delta, i, chi)
+
+        yield chunk
+
+
+def export_fields(model, path, format="csv", x=None, n_points=None, fields=tuple(FIELDS), case=None,
+                  chunk_size=65536):
+    '''
+    The fields of the solution are written in a file chunk by chunk, see iter_fields
+
+    :param model: (Model) Solved model
+    :param path: (str or Path) Path of the file
+    :param format: (str) Format of the file
+        - "csv": text with a column per field and a row per point
+        - "binary": a column per field in a binary file with the same structure as the files of the models. It's
+          read with load_fields
+    :param x: (np.array) Coordinates of the points
+    :param n_points: (int) Number of points evenly distributed between the first and the last node
+    :param fields: (tuple) Fields exported
+    :param case: (str) Name of the load case. The loads of the model by default
+    :param chunk_size: (int) Maximum number of points of each chunk
+    :return: (int) Number of points written
+    '''
+
+    if format not in ("csv", "binary"):
+        raise ValueError("Unknown format {}, it must be csv or binary".format(format))
+
+    chunks = iter_fields(model, x, n_points, fields, case, chunk_size)
+
+    if x is not None:
+        n = len(x)
+    elif n_points is not None:
+        n = n_points
+    else:
+        n = model.n_elements
+
+    columns = ["x"] + (["element"] if x is None and n_points is None else []) + list(fields)
+
+    if format == "csv":
+        with open(path, "w") as file:
+            file.write(",".join(columns) + "\n")
+
+            for chunk in chunks:
+                table = np.column_stack([chunk[column] for column in columns])
+                np.savetxt(file, table, delimiter=",", fmt=["%d" if c == "element" else "%.17g" for c in columns])
+
+        return n
+
+    # The size of all the columns is known, so each chunk is written directly in its position of the file
+    with FieldWriter(path, {column: ((n,), np.int64 if column == "element" else float) for column in columns},
+                     {"case": case}) as writer:
+        position = 0
+        for chunk in chunks:
+            for column in columns:
+                writer.write(column, position, chunk[column])
+
+            position += len(chunk["x"])
+
+    return n
+
+
+class FieldWriter:
+    '''
+    Binary file with columns of results that are written by parts
+
+    The size of the columns is fixed when the file is created, so each part is written directly in its position
+    and only the part being written is in memory. The file is read with load_fields.
+    '''
+
+    def __init__(self, path, columns, attributes=None):
+        '''
+        Constructor of the class FieldWriter. The file is created
+
+        :param path: (str or Path) Path of the file
+        :param columns: (dict) Shape and dtype of each column {name: (shape, dtype)}, the rows are the first axis
+        :param attributes: (dict) Other values stored in the header of the file
+        '''
+
+        self.header = dict(attributes or {})
+        self.header.update({"version": VERSION, "columns": list(columns), "arrays": {}})
+
+        offset = 0
+        for name, (shape, dtype) in columns.items():
+            dtype = np.dtype(dtype)
+            self.header["arrays"][name] = {"dtype": dtype.str, "shape": list(shape), "offset": offset}
+            offset += _padded(int(np.prod(shape)) * dtype.itemsize)
+
+        self.file = open(path, "wb")
+        self.start = _write_header(self.file, self.header)
+        self.file.truncate(self.start + offset)
+
+    def write(self, name, row, values):
+        '''
+        Rows of a column are written
+
+        :param name: (str) Name of the column
+        :param row: (int) First row written
+        :param values: (np.array) Values of the rows
+        :return: None
+        '''
+
+        spec = self.header["arrays"][name]
+        row_size = int(np.prod(spec["shape"][1:])) * np.dtype(spec["dtype"]).itemsize
+
+        self.file.seek(self.start + spec["offset"] + row * row_size)
+        self.file.write(np.ascontiguousarray(values, dtype=spec["dtype"]).tobytes())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_fields(path, mmap=True):
+    '''
+    The fields written by export_fields in binary format are loaded
+
+    :param path: (str or Path) Path of the file
+    :param mmap: (bool) If True the columns are memory-mapped, otherwise they are read into memory
+    :return: (dict) Columns {"x": np.array, field: np.array}
+    '''
+
+    header, start = _read_header(path)
+    if "columns" not in header:
+        raise ValueError("The file {} doesn't contain fields".format(path))
+
+    return {column: _read_array(path, header, start, column, mmap) for column in header["columns"]}
+
+
+def _write_header(file, header):
+    '''
+    The identifier of the format and the header are written at the start of a file
+
+    :param file: (file) File opened in binary mode
+    :param header: (dict) Header, with the description of the arrays
+    :return: (int) Position of the start of the arrays
+    '''
+
+    text = json.dumps(header).encode()
+    start = _padded(len(MAGIC) + 2 + 8 + len(text))
+
+    file.write(MAGIC)
+    file.write(np.uint16(VERSION).tobytes())
+    file.write(np.uint64(len(text)).tobytes())
+    file.write(text)
+    file.write(b"\x00" * (start - file.tell()))
+
+    return start
+
+
+def _read_header(path):
+    '''
+    The header of a file is read
+
+    :param path: (str or Path) Path of the file
+    :return: (dict, int) Header and position of the start of the arrays
+    '''
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("The file {} is not a file of FEA_1D".format(path))
+
+        version = int(np.frombuffer(file.read(2), dtype=np.uint16)[0])
+        if version > VERSION:
+            raise ValueError("The version {} of the file is not supported".format(version))
+
+        length = int(np.frombuffer(file.read(8), dtype=np.uint64)[0])
+        header = json.loads(file.read(length).decode())
+
+    return header, _padded(len(MAGIC) + 2 + 8 + length)
+
+
+def _read_array(path, header, start, name, mmap=True):
+    '''
+    An array of a file is read or memory-mapped (copy-on-write)
+
+    :param path: (str or Path) Path of the file
+    :param header: (dict) Header of the file
+    :param start: (int) Position of the start of the arrays
+    :param name: (str) Name of the array
+    :param mmap: (bool) If True the array is memory-mapped
+    :return: (np.array) Array
+    '''
+
+    spec = header["arrays"][name]
+    shape = tuple(spec["shape"])
+    if np.prod(shape) == 0:
+        return np.zeros(shape, dtype=spec["dtype"])
+
+    values = np.memmap(path, dtype=spec["dtype"], mode="c", offset=start + spec["offset"], shape=shape)
+    return values if mmap else np.array(values)
+
+
+def _padded(size):
+    '''
+    Size rounded up to the alignment of the arrays
+
+    :param size: (int) Size in bytes
+    :return: (int) Size with padding
+    '''
+
+    return -(-size // ALIGNMENT) * ALIGNMENT
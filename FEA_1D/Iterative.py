@@ -0,0 +1,261 @@
+import numpy as np
+from enum import Enum
+
+from FEA_1D.Multigrid import Multigrid
+from FEA_1D.Solver import BandedMatrix, band_order, factorize
+
+
+class Preconditioner(Enum):
+    '''
+    Preconditioner of the conjugate gradient method
+        - JACOBI: diagonal of the stiffness matrix
+        - TRIDIAGONAL: tridiagonal part of the stiffness matrix in the order of the coordinates, factorized once.
+          It's exact for linear elements (one iteration). For quadratic elements the terms outside of the band are
+          added to the diagonal, so the preconditioner stays positive definite
+        - MULTIGRID: one V-cycle of the geometric multigrid (only linear elements), the number of iterations doesn't
+          depend on the size of the elements
+    '''
+
+    JACOBI = 1
+    TRIDIAGONAL = 2
+    MULTIGRID = 3
+
+
+class StiffnessOperator:
+    '''
+    Product of the global stiffness matrix with a vector, computed element by element without assembling K_G
+
+    Only the coefficient E·A·w/J of each Gauss point of each element is stored, so the memory is a few vectors
+    of the size of the number of elements.
+    '''
+
+    def __init__(self, batch, n_nodes):
+        '''
+        Constructor of the class StiffnessOperator
+
+        :param batch: (element_1D_batch) Batch of the elements of the model
+        :param n_nodes: (int) Number of nodes of the model
+        '''
+
+        self.connectivity = batch.connectivity
+        self.n = n_nodes
+
+        # K_e = sum_g c_g · dN_g ⊗ dN_g, with B = dN / J
+        self.dN = [batch._dN(chi) for chi in batch.gauss_points]
+        self.c = [w * batch.property("E", chi) * batch.property("A", chi) / batch._J()
+                  for chi, w in zip(batch.gauss_points, batch.gauss_weights)]
+
+        # The derivatives of the linear elements are constant, so one product is enough
+        if all(np.allclose(dN, self.dN[0]) for dN in self.dN):
+            self.dN = self.dN[:1]
+            self.c = [sum(self.c)]
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    def __matmul__(self, v):
+        '''
+        Product K_G·v
+
+        :param v: (np.array) Vector (n_nodes,)
+        :return: (np.array) Product (n_nodes,)
+        '''
+
+        v_element = np.asarray(v, dtype=float)[self.connectivity]
+        result = np.zeros(self.n)
+
+        for dN, c in zip(self.dN, self.c):
+            strain = c * (v_element @ dN)
+            result += np.bincount(self.connectivity.ravel(), weights=(strain[:, None] * dN).ravel(), minlength=self.n)
+
+        return result
+
+    def _term(self, a, b):
+        '''
+        Term (a, b) of the stiffness matrices of all the elements
+
+        :param a: (int) Local row
+        :param b: (int) Local column
+        :return: (np.array) Term of each element (n_elements,)
+        '''
+
+        return sum(c * dN[a] * dN[b] for dN, c in zip(self.dN, self.c))
+
+    def diagonal(self):
+        '''
+        Diagonal of the global stiffness matrix
+
+        :return: (np.array) Diagonal (n_nodes,)
+        '''
+
+        nodes = self.connectivity.shape[1]
+        return sum(np.bincount(self.connectivity[:, a], weights=self._term(a, a), minlength=self.n)
+                   for a in range(nodes))
+
+    def norm(self):
+        '''
+        Infinity norm of the global stiffness matrix (maximum sum of the absolute values of a row), it's an upper
+        bound of the 2-norm of the symmetric matrix
+
+        :return: (float) Norm
+        '''
+
+        nodes = self.connectivity.shape[1]
+        rows = sum(np.bincount(self.connectivity[:, a], weights=np.abs(self._term(a, b)), minlength=self.n)
+                   for a in range(nodes) for b in range(nodes))
+
+        return float(np.max(rows, initial=0))
+
+    def tridiagonal(self, indices, x):
+        '''
+        Tridiagonal part of a block of the global stiffness matrix, with the nodes sorted by their coordinate
+
+        The terms outside of the band are added to the diagonal of their row, so the sum of each row is kept and
+        the matrix is positive definite if the block is.
+
+        :param indices: (np.array) Nodes of the block
+        :param x: (np.array) Coordinates of all the nodes
+        :return: (BandedMatrix) Block with bandwidth 1, the index i of the block is indices[i]
+        '''
+
+        order, _ = band_order(x[indices], np.zeros((0, 2), dtype=int))
+        T = BandedMatrix(len(indices), 1, order)
+
+        local = np.full(self.n, -1)
+        local[indices] = np.arange(len(indices))
+        rows_all = local[self.connectivity]
+
+        nodes = self.connectivity.shape[1]
+        for a in range(nodes):
+            for b in range(nodes):
+                rows, cols = rows_all[:, a], rows_all[:, b]
+                values = self._term(a, b)
+
+                inside = (rows >= 0) & (cols >= 0)
+                band = inside & (np.abs(T.rank[np.maximum(rows, 0)] - T.rank[np.maximum(cols, 0)]) <= 1)
+                outside = inside & ~band
+
+                T.add(rows[band], cols[band], values[band])
+                T.add(rows[outside], rows[outside], values[outside])
+
+        return T
+
+
+def conjugate_gradient(K, b, x0=None, precondition=None, tolerance=1e-10, maximum_iterations=None, norm_K=0.0):
+    '''
+    The system K·x = b is solved with the preconditioned conjugate gradient method
+
+    :param K: (function) Product of the matrix of the system with a vector, the matrix must be symmetric and positive
+        definite
+    :param b: (np.array) Right hand side
+    :param x0: (np.array) Initial solution. Zero by default
+    :param precondition: (function) Product of the preconditioner with a vector. None for no preconditioner
+    :param tolerance: (float) Relative tolerance of the norm of the residual
+    :param maximum_iterations: (int) Maximum number of iterations. 10 times the size of the system by default
+        (the rounding errors delay the convergence in n iterations of the exact arithmetic)
+    :param norm_K: (float) Norm of the matrix. The rounding errors of the product K·x of a large stiff system can be
+        larger than tolerance·||b||, so the iterations stop when ||r|| <= tolerance·||b|| + eps·||K||·||x||
+    :return: (np.array, int, float) Solution, number of iterations and relative norm of the residual
+    '''
+
+    b = np.asarray(b, dtype=float)
+    x = np.zeros_like(b) if x0 is None else np.array(x0, dtype=float)
+    maximum_iterations = maximum_iterations or 10 * max(len(b), 1)
+
+    norm_b = np.linalg.norm(b)
+    if norm_b == 0:
+        return np.zeros_like(b), 0, 0.0
+
+    r = b - K(x)
+    z = precondition(r) if precondition is not None else r
+    p = z.copy()
+    rz = r @ z
+
+    iterations = 0
+    residual = np.linalg.norm(r) / norm_b
+    eps = np.finfo(float).eps
+
+    while residual * norm_b > tolerance * norm_b + eps * norm_K * np.linalg.norm(x):
+        if iterations == maximum_iterations:
+            raise RuntimeError("The conjugate gradient doesn't converge after {} iterations, relative residual {:.3e}"
+                               .format(iterations, residual))
+
+        Kp = K(p)
+        alpha = rz / (p @ Kp)
+        x += alpha * p
+        r -= alpha * Kp
+
+        z = precondition(r) if precondition is not None else r
+        rz_new = r @ z
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+
+        iterations += 1
+        residual = np.linalg.norm(r) / norm_b
+
+    return x, iterations, residual
+
+
+def solve_matrix_free(model, f, preconditioner=Preconditioner.TRIDIAGONAL, tolerance=1e-10,
+                      maximum_iterations=None, x0=None):
+    '''
+    The model is solved with the preconditioned conjugate gradient method without assembling the stiffness matrix
+
+    :param model: (Model) Meshed model
+    :param f: (np.array) Global load vectors (n_nodes, n_cases)
+    :param preconditioner: (Preconditioner) Preconditioner of the conjugate gradient
+    :param tolerance: (float) Relative tolerance of the residual
+    :param maximum_iterations: (int) Maximum number of iterations of each load vector
+    :param x0: (np.array) Initial displacements (n_nodes, n_cases), for example the previous solution. None to
+        start from the imposed displacements
+    :return: (np.array, np.array, list, list) Displacements and reactions (n_nodes, n_cases), number of iterations
+        and relative residual of each load vector
+    '''
+
+    n = model.n_nodes
+    K = StiffnessOperator(model.element_batch(), n)
+
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+    is_constrained = ~np.isnan(displacements_imposed)
+    free = np.flatnonzero(~is_constrained)
+    u_c = np.where(is_constrained, displacements_imposed, 0)
+
+    def K_ff(v):
+        v_global = np.zeros(n)
+        v_global[free] = v
+        return (K @ v_global)[free]
+
+    if preconditioner == Preconditioner.JACOBI:
+        inverse = 1 / K.diagonal()[free]
+        precondition = lambda r: inverse * r
+    elif preconditioner == Preconditioner.TRIDIAGONAL:
+        precondition = factorize(K.tridiagonal(free, model.nodes.x[:n])).solve
+    else:
+        multigrid = Multigrid(model)
+
+        def precondition(r):
+            r_global = np.zeros(n)
+            r_global[free] = r
+            return multigrid.vcycle(r_global)[free]
+
+    f = np.asarray(f, dtype=float).reshape((n, -1))
+    f_c = (K @ u_c)[free]
+    norm_K = K.norm()
+
+    delta = np.repeat(u_c[:, None], f.shape[1], axis=1)
+    reactions = np.zeros_like(f)
+    iterations = []
+    residuals = []
+
+    for j in range(f.shape[1]):
+        start = None if x0 is None else np.asarray(x0, dtype=float).reshape((n, -1))[free, j]
+
+        delta[free, j], count, residual = conjugate_gradient(K_ff, f[free, j] - f_c, start, precondition, tolerance,
+                                                             maximum_iterations, norm_K)
+        iterations.append(count)
+        residuals.append(residual)
+
+        reactions[is_constrained, j] = (K @ delta[:, j])[is_constrained] - f[is_constrained, j]
+
+    return delta, reactions, iterations, residuals
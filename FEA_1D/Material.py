@@ -5,8 +5,20 @@ class Material:
     The material needs to be defined for commodities of the user. In this way, the user
     can define diferents materials to each beam.
 
-    For the moment, the material is going to be defined as a constant.
+    The properties can be constants or functions of x (see FEA_1D.Distribution).
     """
-    def __init__(self, name, E):
+    def __init__(self, name, E, rho=0, sigma_y=None, H=0):
+        """
+        Constructor of the class material
+
+        :param name: (str) Name of the material
+        :param E: (float) Young's modulus
+        :param rho: (float) Density, only needed for dynamic analysis
+        :param sigma_y: (float) Yield stress, only used by the elasto-plastic solve. None if it's always elastic
+        :param H: (float) Plastic hardening modulus (linear isotropic hardening), 0 for perfect plasticity
+        """
         self.name = name
-        self.E = E
\ No newline at end of file
+        self.E = E
+        self.rho = rho
+        self.sigma_y = sigma_y
+        self.H = H
\ No newline at end of file
@@ -0,0 +1,103 @@
+import numpy as np
+
+from FEA_1D.Solver import factorize
+
+
+def lanczos(K, M, k, shift=0.0, tolerance=1e-10, maximum_vectors=None):
+    '''
+    The k eigenvalues of K·phi = lambda·M·phi closest to a shift are obtained with the shift-invert Lanczos method
+
+    The matrix K - shift·M is factorized once, and each Lanczos vector only needs a substitution and a product
+    with M, so the cost is linear in the number of rows for banded matrices. The vectors are orthogonalized
+    again against all the previous ones (M inner product), so the number of vectors is limited: if the modes
+    haven't converged, the method is started again with twice the number of vectors.
+
+    :param K: (np.array or BandedMatrix) Stiffness matrix, symmetric
+    :param M: (np.array or BandedMatrix) Mass matrix, symmetric and positive definite
+    :param k: (int) Number of eigenvalues
+    :param shift: (float) The eigenvalues closest to the shift are obtained. 0 gives the lowest ones
+    :param tolerance: (float) Relative tolerance of the residual of the eigenvalues
+    :param maximum_vectors: (int) Maximum number of Lanczos vectors. The size of the matrix by default
+    :return: (np.array, np.array) Eigenvalues in increasing order (k,) and eigenvectors normalized with M (n, k)
+    '''
+
+    n = K.shape[0]
+    k = min(k, n)
+    maximum_vectors = min(maximum_vectors or n, n)
+
+    factorization = factorize(K - shift * M if shift else K)
+
+    # The starting vector is the same in all the calls, so the results are reproducible
+    start = np.random.default_rng(0).standard_normal(n)
+
+    m = min(maximum_vectors, max(2 * k, k + 20))
+    while True:
+        theta, vectors, residual = _lanczos_iteration(factorization, M, start, m)
+
+        # The largest eigenvalues of the inverse are the closest to the shift
+        closest = np.argsort(-np.abs(theta))[:k]
+        converged = np.all(residual[closest] <= tolerance * np.abs(theta[closest]))
+
+        if converged or m >= maximum_vectors or len(theta) < m:
+            break
+
+        m = min(2 * m, maximum_vectors)
+
+    eigenvalues = shift + 1 / theta[closest]
+    vectors = vectors[:, closest]
+
+    # Sign of the modes: the largest component is positive
+    largest = np.argmax(np.abs(vectors), axis=0)
+    vectors = vectors * np.sign(vectors[largest, np.arange(vectors.shape[1])])
+
+    order = np.argsort(eigenvalues)
+    return eigenvalues[order], vectors[:, order]
+
+
+def _lanczos_iteration(factorization, M, start, m):
+    '''
+    Lanczos iteration with the operator (K - shift·M)^-1·M and the inner product of M
+
+    :param factorization: (BandedLDL or DenseFactorization) Factorization of K - shift·M
+    :param M: (np.array or BandedMatrix) Mass matrix
+    :param start: (np.array) Starting vector
+    :param m: (int) Number of Lanczos vectors
+    :return: (np.array, np.array, np.array) Eigenvalues of the operator, Ritz vectors and residual of each one
+    '''
+
+    n = len(start)
+    Q = np.zeros((n, m))
+    MQ = np.zeros((n, m))
+    alpha = np.zeros(m)
+    beta = np.zeros(m)
+
+    q = start / np.sqrt(start @ (M @ start))
+    size = m
+
+    for j in range(m):
+        Q[:, j] = q
+        MQ[:, j] = M @ q
+
+        w = factorization.solve(MQ[:, j])
+        alpha[j] = w @ MQ[:, j]
+
+        # Full orthogonalization with all the previous vectors, applied twice for the loss of precision
+        for _ in range(2):
+            w -= Q[:, :j + 1] @ (MQ[:, :j + 1].T @ w)
+
+        beta[j] = np.sqrt(max(w @ (M @ w), 0))
+
+        # The space is invariant, the eigenvalues are exact
+        if beta[j] <= 1e-14 * abs(alpha[j]) or j == n - 1:
+            size = j + 1
+            break
+
+        q = w / beta[j]
+
+    # Eigenvalues of the tridiagonal matrix of the Lanczos method
+    T = np.diag(alpha[:size]) + np.diag(beta[:size - 1], 1) + np.diag(beta[:size - 1], -1)
+    theta, s = np.linalg.eigh(T)
+
+    residual = np.abs(beta[size - 1] * s[-1]) if size == m else np.zeros(size)
+
+    return theta, Q[:, :size] @ s, residual
@@ -2,12 +2,48 @@ import math
 
 from FEA_1D import *
 from FEA_1D.Beam import *
+from FEA_1D.Solver import *
+from FEA_1D.Node import _to_array
+from FEA_1D.Distribution import as_function
+from FEA_1D.Profiler import Profiler
+from FEA_1D.IO import save_model, load_model
+from FEA_1D.Dynamics import newmark
+from FEA_1D.Modal import lanczos
+from FEA_1D.Plasticity import NonlinearMethod, solve_plastic
+from FEA_1D.Substructuring import solve_substructured
+from FEA_1D.Iterative import Preconditioner, solve_matrix_free
+from FEA_1D.Multigrid import solve_multigrid
+
+# Methods of the model measured by the profiler
+PROFILED_PHASES = ("mesh", "mesh_adaptive", "Assemble_K_G", "Assemble_M_G", "Assemble_f_G", "Boundary_Conditions",
+                   "Factorize", "Solve", "Solve_substructured", "Solve_iterative", "Solve_multigrid",
+                   "Solve_transient", "Solve_modal", "Solve_plastic",
+                   "delta_pos", "epsilon_pos", "sigma_pos", "force_pos")
+
+# Default value of the optional parameters that are not changed, None is a valid value of F and u
+_UNCHANGED = object()
+
 
 class Model:
-    def __init__(self):
-        self.nodes = {}
-        self.elements = {}
-        self.aux_nodes = {}
+    def __init__(self, storage=Storage.BANDED, tolerance=1e-9, precision=Precision.DOUBLE):
+        '''
+        Constructor of the class Model
+
+        :param storage: (Storage) Storage of the global stiffness matrix
+            - Storage.BANDED: banded matrix and linear-time solver (default)
+            - Storage.DENSE: full matrix, only recommended for debugging small models
+        :param tolerance: (float) Two nodes closer than this distance are considered the same node
+        :param precision: (Precision) Precision of the factorization of the global stiffness matrix
+            - Precision.DOUBLE: float64 (default)
+            - Precision.MIXED: factors stored and solves done in float32, iterative refinement with float64
+              residuals
+        '''
+
+        # The nodes and elements are stored in arrays, they are accessed as dictionaries {id: node}, {id: element}
+        self.nodes = NodeArrays()
+        self.elements = ElementArrays(self.nodes)
+        self.aux_nodes = NodeArrays()
+        self._connect_arrays()
         self.beams = {}
 
         # Se incializan a cero el número de componentes del modelo
@@ -16,6 +52,11 @@ class Model:
         self.n_elements = 0
         self.n_beams = 0
 
+        # Index of the nodes by their coordinate. The coordinate is divided in buckets of size tolerance, so a
+        # node is found in O(1) looking only in its bucket and the neighbouring ones. None if it's not built yet
+        self.tolerance = tolerance
+        self._node_index = None
+
         # Se indicara el nodo que esté articulado
         self.list_joints_AUX = []
         self.list_joints = []
@@ -25,14 +66,57 @@ class Model:
         self.punctual_forces = {}
 
         # Matriz de rigidez global
+        self.storage = storage
+        self.precision = precision
         self.K_G = None
 
+        # Report of the iterative refinement of the last solve with Precision.MIXED {"iterations", "residuals"}
+        self.refinement = None
+
+        # Global mass matrix, only for dynamic analysis
+        self.M_G = None
+
         # Vector de cargas global
         self.f_G = None
 
+        # Type of the elements of the model and arrays with the properties of all the elements, they are built
+        # when the model is assembled
+        self.element_type = None
+        self._element_batch = None
+
+        # Elements generated by the mesh in each beam {id beam: range of id elements}
+        self.beam_elements = {}
+
+        # Load cases solved together with the loads of the model {name: {"forces": ..., "n_x": ...}}
+        self.load_cases = {}
+        self.load_case_results = {}
+
+        # Stress in the middle of each element {name of the load case or None: np.array}, computed when it's used
+        self._sigma_elements = {}
+
         # Parameter of the model that indicates if the model is solved
         self.solved = False
 
+        # State of the material in the Gauss points after an elasto-plastic solve, None if the solution is elastic
+        self.plastic_state = None
+
+        # Results of the modal analysis: eigenvalues (omega^2), natural frequencies and mode shapes (n_nodes, modes)
+        self.eigenvalues = None
+        self.frequencies = None
+        self.mode_shapes = None
+
+        # Parts of the model that have changed since the last solution. Solve only repeats the phases affected:
+        #   - geometry: nodes and elements, everything is assembled again
+        #   - stiffness: properties of the elements, the factorization is computed again
+        #   - loads: forces and distributed loads, only the load vector is assembled again
+        #   - supports: free and constrained nodes, the factorization is computed again
+        # Each phase (Assemble_K_G, Assemble_f_G, Boundary_Conditions, Factorize) clears its part when it's run
+        # and marks the phases after it, so Solve doesn't repeat the phases that are already up to date
+        self.changed = {"geometry": True, "stiffness": True, "loads": True, "supports": True}
+
+        # Profiler of the phases of the model, None when the profiling is disabled
+        self.profiler = None
+
 
     def add_node(self, x, F=None, u=None):
         '''
@@ -49,16 +133,36 @@ class Model:
         # The number of nodes is updated
 
         # A node is created and stored
-        n = Node(x, self.n_nodes, F, u)
-        self.nodes[self.n_nodes] = n
+        id = self._add_nodes([x], [F], [u])[0]
+
+        return self.nodes[id]
+
+
+    def _add_nodes(self, x, F, u):
+        '''
+        Several nodes are added to the arrays of the nodes at once
+
+        :param x: (np.array) Coordinates of the nodes
+        :param F: (np.array) Forces in the nodes, None or NaN if there isn't force
+        :param u: (np.array) Displacements of the nodes, None or NaN if the node is free
+        :return: (np.array) Global id of the nodes
+        '''
+
+        ids = self.nodes.extend(x, F, u)
+
+        # The nodes are added to the index of coordinates, only the id is stored. If the index is not built yet,
+        # the nodes will be added when it's built
+        if self._node_index is not None:
+            for id, x_node in zip(ids.tolist(), self.nodes.x[ids].tolist()):
+                self._node_index.setdefault(self._node_key(x_node), id)
 
         # The number of nodes is updated
-        self.n_nodes += 1
+        self.n_nodes = len(self.nodes)
 
         # Update the parameter of the model that indicates if the model is unsolved
-        self.solved = False
+        self._set_changed("geometry")
 
-        return n
+        return ids
 
 
     def add_aux_node(self, x, F=None, u=None):
@@ -74,14 +178,50 @@ class Model:
         '''
 
         # A node is created and stored
-        aux_n = Node(x, self.n_aux_nodes, F, u)
-        self.aux_nodes[self.n_aux_nodes] = aux_n
+        self.add_aux_nodes([x], [F], [u])
+
+
+    def add_aux_nodes(self, x, F=None, u=None):
+        '''
+        Several auxiliary nodes are added at once, for example from a table of points
+
+        The arrays are validated as a whole and the model is marked as changed only once.
+
+        :param x: (np.array) Coordinates of the nodes (n,)
+        :param F: (np.array) Forces in the nodes (n,), NaN (or None in a list) if there isn't force. No forces by
+            default
+        :param u: (np.array) Displacements of the nodes (n,), NaN (or None in a list) if the node is free. Free
+            nodes by default
+        :return: (np.array) Ids of the auxiliary nodes added
+        '''
+
+        x = np.asarray(x, dtype=float)
+        if x.ndim != 1:
+            raise ValueError("The coordinates of the auxiliary nodes must be a vector")
+
+        n = len(x)
+        F = _to_array(F, n)
+        u = _to_array(u, n)
+
+        for name, values in (("forces", F), ("displacements", u)):
+            if values.shape != (n,):
+                raise ValueError("The {} of the auxiliary nodes must be a vector of length {}".format(name, n))
+
+            if np.any(np.isinf(values)):
+                raise ValueError("The {} of the auxiliary nodes must be finite".format(name))
+
+        if not np.all(np.isfinite(x)):
+            raise ValueError("The coordinates of the auxiliary nodes must be finite")
+
+        ids = self.aux_nodes.extend(x, F, u)
 
         # The number of nodes is updated
-        self.n_aux_nodes += 1
+        self.n_aux_nodes = len(self.aux_nodes)
 
         # Update the parameter of the model that indicates if the model is unsolved
-        self.solved = False
+        self._set_changed("geometry")
+
+        return ids
 
 
     def add_beam(self, aux_nodes, material, section, n_x):
@@ -112,7 +252,101 @@ class Model:
         self.n_beams += 1
 
         # Update the parameter of the model that indicates if the model is unsolved
-        self.solved = False
+        self._set_changed("geometry")
+
+
+    def add_beams(self, aux_nodes, materials, sections, material, section, n_x=0.0):
+        '''
+        Several beams are added at once, for example from a table of spans
+
+        The materials and sections are given as lists, and each beam stores the index of its material and section
+        in them. The arrays are validated as a whole and the model is marked as changed only once.
+
+        :param aux_nodes: (np.array) Ids of the auxiliary nodes of each beam (n, 2)
+        :param materials: (list) Materials used by the beams
+        :param sections: (list) Sections used by the beams
+        :param material: (np.array) Index of the material of each beam in materials (n,) or the same for all
+        :param section: (np.array) Index of the section of each beam in sections (n,) or the same for all
+        :param n_x: (float, function or table) Load per unit length of all the beams, or a list with the load of
+            each beam (n,). The loads can be numbers, functions of x or tables of values (see FEA_1D.Distribution)
+        :return: (np.array) Ids of the beams added
+        '''
+
+        # An empty table doesn't change the model
+        aux_nodes = np.asarray(aux_nodes)
+        if aux_nodes.size == 0:
+            return np.zeros(0, dtype=int)
+
+        if aux_nodes.ndim != 2 or aux_nodes.shape[1] != 2 or not np.issubdtype(aux_nodes.dtype, np.integer):
+            raise ValueError("The auxiliary nodes of the beams must be an array of ids (n_beams, 2)")
+
+        aux_nodes = aux_nodes.astype(int)
+        n = aux_nodes.shape[0]
+
+        missing = (aux_nodes < 0) | (aux_nodes >= self.n_aux_nodes)
+        if np.any(missing):
+            raise KeyError("The auxiliary node {} is not defined".format(aux_nodes[missing][0]))
+
+        # The ends of a beam must be different points
+        x = self.aux_nodes.x[aux_nodes]
+        short = np.abs(x[:, 1] - x[:, 0]) <= self.tolerance
+        if np.any(short):
+            raise ValueError("The beam {} has zero length".format(self.n_beams + np.flatnonzero(short)[0]))
+
+        indices = []
+        for name, index, table in (("material", material, materials), ("section", section, sections)):
+            index = np.asarray(index)
+            if not np.issubdtype(index.dtype, np.integer) and index.size:
+                raise ValueError("The {} of each beam must be an index".format(name))
+
+            index = np.broadcast_to(index.astype(int), (n,))
+            if np.any((index < 0) | (index >= len(table))):
+                raise ValueError("The index of the {} must be between 0 and {}".format(name, len(table) - 1))
+
+            indices.append(index.tolist())
+
+        # A single load (number, function of x or table of values) is the same for all the beams, otherwise there
+        # is one load per beam
+        try:
+            loads = np.asarray(n_x, dtype=float)
+        except (TypeError, ValueError):
+            loads = None
+
+        if callable(n_x) or loads is not None and loads.ndim == 2:
+            loads = [n_x] * n
+        elif loads is not None and loads.ndim == 0:
+            loads = [float(loads)] * n
+        else:
+            loads = n_x.tolist() if isinstance(n_x, np.ndarray) else list(n_x)
+            if len(loads) != n:
+                raise ValueError("There must be one load per unit length for each beam")
+
+        for id, load in enumerate(loads):
+            if isinstance(load, (int, float, np.number)):
+                valid = np.isfinite(load)
+            else:
+                try:
+                    valid = as_function(load) is not None
+                except ValueError:
+                    valid = False
+
+            if not valid:
+                raise ValueError("The load per unit length of the beam {} must be a finite number, a function of x "
+                                 "or a table of values".format(self.n_beams + id))
+
+        # The beams are created and stored
+        ids = np.arange(self.n_beams, self.n_beams + n)
+        self.beams.update(
+            (id, Beam([self.aux_nodes[n1], self.aux_nodes[n2]], materials[m], sections[s], q))
+            for id, (n1, n2), m, s, q in zip(ids.tolist(), aux_nodes.tolist(), *indices, loads))
+
+        # The number of beams is updated
+        self.n_beams += n
+
+        # Update the parameter of the model that indicates if the model is unsolved
+        self._set_changed("geometry")
+
+        return ids
 
 
     def add_element(self, tipo_Elemento, nodos_elemento, E, A, n_x):
@@ -121,82 +355,304 @@ class Model:
 
 
         :param tipo_Elemento: (Elemento) Type of element
-            - Element.LINEAL
-            - Element.CUADRATICO
-        :param nodos_elemento: (list) Nodes of the element. The global id of the nodes is entered
+            - Element.LINEAR
+            - Element.CUADRATIC
+        :param nodos_elemento: (list) Nodes of the element. The global id of the nodes is entered. For quadratic
+            elements the nodes are the start, the middle and the end of the element
         :param E: (float) Elasticity module
         :param A: (float) Cross-sectional area
         :param n_x: (float) Vector of distributed loads
         :return: None
         '''
-        # The number of nodes is updated
-        self.n_elements += 1
+        # The nodes of the element: start and end (linear) or start, middle and end (quadratic)
+        for id_global in nodos_elemento:
+            if id_global not in self.nodes:
+                raise KeyError("The node {} is not defined".format(id_global))
+
+        self._add_elements(tipo_Elemento, [nodos_elemento], E, A, n_x)
 
-        # Type of linear element
-        if Element.LINEAR == tipo_Elemento:
 
-            # The global nodes of the element are obtained
-            id_global_n1 = nodos_elemento[0]
-            id_global_n2 = nodos_elemento[1]
+    def _add_elements(self, tipo_Elemento, connectivity, E, A, n_x, rho=0):
+        '''
+        Several elements of the same type are added to the arrays of the elements at once
+
+        :param tipo_Elemento: (Elemento) Type of element
+        :param connectivity: (np.array) Global id of the nodes of each element (n_elements, nodes per element)
+        :param E: (float or np.array) Elasticity module
+        :param A: (float or np.array) Cross-sectional area
+        :param n_x: (float or np.array) Distributed load
+        :param rho: (float or np.array) Density
+        :return: None
+        '''
 
-            # The node class associated with the nodes is obtained
-            n1 = self.nodes[id_global_n1]
-            n2 = self.nodes[id_global_n2]
+        # All the elements of the model must be of the same type
+        if self.element_type is not None and self.element_type != tipo_Elemento:
+            raise NotImplementedError("Unimplemented method for models with linear and quadratic elements together.")
 
-            # The element is created
-            e = element_1D_LINEAR(n1, n2, E, A, n_x, self.n_elements)
+        # The elements are stored in the arrays of the elements
+        self.elements.extend(tipo_Elemento, connectivity, E, A, n_x, rho)
 
-            # The element is added to the dictionary
-            self.elements[self.n_elements] = e
+        # The number of elements is updated
+        self.n_elements = len(self.elements)
+        self.element_type = tipo_Elemento
 
-        # Type of quadratic element
-        elif Element.CUADRATIC == tipo_Elemento:
-            raise NotImplementedError("Unimplemented method for quadratic elements.")
+        # The arrays of the elements have to be built again
+        self._element_batch = None
 
         # Update the parameter of the model that indicates if the model is unsolved
-        self.solved = False
+        self._set_changed("geometry")
 
-    def mesh(self, maximum_length):
+    def mesh(self, maximum_length, element=Element.LINEAR):
         '''
         The model is meshed
 
         :param maximum_length: (float) Maximum length of the elements
+        :param element: (Element) Type of the elements
+            - Element.LINEAR: 2 nodes per element (default)
+            - Element.CUADRATIC: 3 nodes per element, the middle node is added in the center of the element
         :return: None
         '''
 
-        # The elements are traversed for adding intermediate nodes
-        for id, beam in self.beams.items():
+        ids = list(self.beams)
+        x = self.aux_nodes.x[self._beam_ends(ids)]
+
+        # The number of elements of each beam, the length of the elements is at most maximum_length
+        length = x[:, 1] - x[:, 0]
+        n_elements = np.maximum(np.ceil(length / maximum_length), 1).astype(int)
+
+        # The coordinate is computed from the first node instead of adding the length of the element each time, so
+        # the rounding errors are not accumulated. The last node of each beam is exactly its second node
+        beam = np.repeat(np.arange(len(ids)), n_elements + 1)
+        i = np.arange(len(beam)) - np.repeat(np.cumsum(n_elements + 1) - n_elements - 1, n_elements + 1)
+        boundaries = x[beam, 0] + i * length[beam] / n_elements[beam]
+        boundaries[np.cumsum(n_elements + 1) - 1] = x[:, 1]
 
-            # The element is meshed
-            distance = abs(beam.nodes[1].x - beam.nodes[0].x)
+        # All the beams are meshed at once
+        self._mesh_beams(ids, boundaries, n_elements, element)
 
-            # The number of elements between two auxiliary nodes is calculated
-            n_elements = math.ceil(distance / maximum_length)
+        # Update the parameter of the model that indicates if the model is unsolved
+        self._set_changed("geometry")
 
-            length_element = distance / n_elements
 
-            # Add intermediate nodes
-            self._Add_intermediate_nodes_elements(beam.nodes[0], beam.nodes[1], length_element, beam)
+    def _set_changed(self, *parts):
+        '''
+        Some parts of the model are marked as changed, so the model is unsolved
+
+        :param parts: (str) Parts changed: "geometry", "stiffness", "loads" or "supports"
+        :return: None
+        '''
+
+        for part in parts:
+            self.changed[part] = True
 
         # Update the parameter of the model that indicates if the model is unsolved
         self.solved = False
 
 
+    def update_node(self, id, F=_UNCHANGED, u=_UNCHANGED):
+        '''
+        The punctual force or the imposed displacement of a node are changed
+
+        Only the parts of the solution affected are computed again in the next Solve(): a change of the force
+        or of the value of the displacement only needs the load vector, a node that becomes free or constrained
+        needs a new factorization.
+
+        :param id: (int) Global id of the node
+        :param F: (float) New force in the node. None to remove the force
+        :param u: (float) New displacement in the node. None to release the node
+        :return: None
+        '''
+
+        # The node notifies the parts of the model changed
+        node = self.nodes[id]
+
+        if F is not _UNCHANGED:
+            node.F = F
+
+        if u is not _UNCHANGED:
+            node.u = u
+
+
+    def update_aux_node(self, id, F=_UNCHANGED, u=_UNCHANGED):
+        '''
+        The punctual force or the imposed displacement of an auxiliary node are changed. If the model is
+        meshed, the node created in its position is also changed.
+
+        :param id: (int) Id of the auxiliary node
+        :param F: (float) New force in the node. None to remove the force
+        :param u: (float) New displacement in the node. None to release the node
+        :return: None
+        '''
+
+        aux_n = self.aux_nodes[id]
+
+        if F is not _UNCHANGED:
+            aux_n.F = F
+
+        if u is not _UNCHANGED:
+            aux_n.u = u
+
+        # The node of the mesh in the same position
+        n = self.created_node(aux_n.x)
+        if n is not None:
+            self.update_node(n.id_global, F, u)
+        else:
+            self._set_changed("loads", "supports")
+
+
+    def update_beam(self, id, material=None, section=None, n_x=None):
+        '''
+        The material, the section or the distributed load of a beam are changed
+
+        Only the contributions of the elements of the beam to the global stiffness matrix are updated, the rest
+        of the model is not assembled again.
+
+        :param id: (int) Id of the beam
+        :param material: (Material) New material of the beam
+        :param section: (Section) New section of the beam
+        :param n_x: (float) New load per unit length of the beam
+        :return: None
+        '''
+
+        beam = self.beams[id]
+        stiffness = material is not None or section is not None
+
+        if material is not None:
+            beam.material = material
+
+        if section is not None:
+            beam.section = section
+
+        if n_x is not None:
+            beam.n_x = n_x
+            self._set_changed("loads")
+
+        # The elements generated by the mesh in the beam (position in the arrays of the elements)
+        i = np.asarray(self.beam_elements.get(id, range(0)), dtype=int) - 1
+
+        self._update_elements(i, stiffness, lambda: self.elements.set_properties(i, beam.material.E, beam.section.A,
+                                                                                 beam.n_x, beam.material.rho))
+
+        if stiffness:
+            self._set_changed("stiffness")
+
+
+    def _update_element(self, i, name, value):
+        '''
+        A property of an element is changed through its view (model.elements[id].E = value)
+
+        :param i: (int) Position of the element in the arrays of the elements
+        :param name: (str) Property: "E", "A", "n_x" or "rho"
+        :param value: (float or function) New value of the property
+        :return: None
+        '''
+
+        stiffness = name in ("E", "A")
+        self._update_elements(np.array([i]), stiffness, lambda: self.elements.set_property(i, name, value))
+
+        # The density is only used by the mass matrix, which is assembled in each dynamic analysis
+        if stiffness:
+            self._set_changed("stiffness")
+        elif name == "n_x":
+            self._set_changed("loads")
+        else:
+            self._set_changed()
+
+
+    def _update_elements(self, i, stiffness, update):
+        '''
+        The properties of a set of elements are changed. If the global stiffness matrix is assembled, only the
+        contributions of the elements are updated and the rest of the model is not assembled again.
+
+        :param i: (np.array) Position of the elements in the arrays of the elements
+        :param stiffness: (bool) The stiffness of the elements changes
+        :param update: (function) Function without arguments that changes the properties in the arrays
+        :return: None
+        '''
+
+        # If the global stiffness matrix is assembled, the old contribution of the elements is removed
+        assembled = stiffness and len(i) > 0 and self.K_G is not None and not self.changed["geometry"]
+        if assembled:
+            old = self.element_batch().take(i)
+            old.scatter_K(self.K_G, -old._K())
+
+        # The arrays are shared with the batch of elements, so it's also updated
+        update()
+        if self._element_batch is not None:
+            self._element_batch.groups = self.elements.groups[:self.n_elements] \
+                if self.elements.groups is not None else None
+
+        # The new contribution of the elements is added
+        if assembled:
+            self.element_batch().take(i).scatter_K(self.K_G)
+
+
+    def _connect_arrays(self):
+        '''
+        The arrays of the nodes and the elements notify the model of the changes made through their views
+        (model.nodes[id].F = value, model.elements[id].E = value), so they are tracked as the update_* methods
+
+        :return: None
+        '''
+
+        self.nodes.on_change = self._set_changed
+        self.aux_nodes.on_change = self._set_changed
+        self.elements.on_change = self._update_element
+
+
+    def add_load_case(self, name, forces=None, n_x=None):
+        '''
+        A load case is added to the model. All the load cases are solved together with the loads of the model
+        in Solve(), with the stiffness matrix factorized only once.
+
+        The loads of the load case replace the loads of the model, the loads that are not given are zero.
+
+        :param name: (str) Name of the load case
+        :param forces: (dict) Punctual forces in the auxiliary nodes {id auxiliary node: F}
+        :param n_x: (dict) Load per unit length of the beams {id beam: n_x}
+        :return: None
+        '''
+
+        self.load_cases[name] = {"forces": forces or {}, "n_x": n_x or {}}
+
+        # Update the parameter of the model that indicates if the model is unsolved
+        self._set_changed("loads")
+
+
+    def obtain_vector_forces_load_case(self, name):
+        '''
+        The global load vector of a load case is obtained
+
+        :param name: (str) Name of the load case
+        :return: (np.array) Global load vector of the load case
+        '''
+
+        load_case = self.load_cases[name]
+        batch = self.element_batch()
+
+        # The distributed load of each element is the one of its beam
+        n_x = np.zeros(batch.n_elements)
+        for id, value in load_case["n_x"].items():
+            n_x[np.searchsorted(batch.ids, self.beam_elements[id])] = value
+
+        f = np.zeros((self.n_nodes, 1))
+        batch.scatter_f(f, batch._f(n_x))
+
+        # The punctual forces are applied in the node created in the position of the auxiliary node
+        for id, F in load_case["forces"].items():
+            f[self.created_node(self.aux_nodes[id].x).id_global] += F
+
+        return f
+
+
     def obtain_vector_forces(self):
         '''
         The vector of forces is obtained
 
         :return: (np.array) Vector of forces
         '''
-        # The vector of forces is created
-        f = np.zeros((self.n_nodes, 1))
-
-        # The forces are added to the vector
-        for id, node in self.nodes.items():
-            if node.F == None:
-                f[node.id_global] = 0
-            else:
-                f[node.id_global] = node.F
+        # The vector of forces is created, the nodes without force are NaN in the arrays of the nodes
+        f = np.nan_to_num(self.nodes.F[:self.n_nodes]).reshape((-1, 1))
 
         return f
 
@@ -208,69 +664,298 @@ class Model:
         :return: (np.array) Vector of displacements
         '''
 
-        # The vector of displacements is created
-        u = np.zeros((self.n_nodes, 1))
-
-        # The displacements are added to the vector
-        for id, node in self.nodes.items():
-            if node.u == None:
-                u[node.id_global] = np.nan
-            else:
-                u[node.id_global] = node.u
+        # The vector of displacements is created, the free nodes are NaN in the arrays of the nodes
+        u = self.nodes.u[:self.n_nodes].reshape((-1, 1)).copy()
 
         return u
 
-    def _Add_intermediate_nodes_elements(self, n1, n2, length_element, beam):
+    def _mesh_beams(self, ids, boundaries, n_elements, element=Element.LINEAR):
         '''
-        Intermediate nodes are added between two nodes
+        The nodes and elements of several beams are generated at once from the boundaries of their elements
 
-        All the elements that are added have the same features as the beam
+        The nodes and elements get the same ids as if the beams were meshed one after the other. A node that
+        already exists (or that is in the same position as a node of a previous beam) is not added, its id is
+        used for the elements.
 
-        :param n1: (Node) Node 1. Initial node
-        :param n2: (Node) Node 2. Final node
-        :param length_element: (float) Length of the element
+        :param ids: (list) Ids of the beams
+        :param boundaries: (np.array) Sorted coordinates of the ends of the elements of each beam, from the
+            smallest to the largest coordinate, one beam after the other
+        :param n_elements: (np.array) Number of elements of each beam
+        :param element: (Element) Type of the elements
         :return: None
         '''
 
-        # The list of nodes added is created to facilitate the addition of elements
-        list_nodes_adeed = []
+        if len(ids) == 0:
+            return
 
-        # The coordinate starts at the coordinate of the first node
-        x = n1.x
+        n_elements = np.asarray(n_elements, dtype=int)
+        boundaries = np.asarray(boundaries, dtype=float)
+        beams = [self.beams[id] for id in ids]
 
-        # While x is less or equal than the coordinate of the second node continue adding nodes
-        while x <= n2.x:
+        # Quadratic elements have a node in the middle, so each element is divided in two
+        step = ELEMENT_BATCHES[element].nodes_per_element - 1
 
-            # If the node already exists, it is not added but the node is obtained to add the element
-            if self.bool_created_node(x):
-                n = self.created_node(x)
+        # Position of the first node of each beam in the coordinates of all the nodes
+        n_beam_nodes = n_elements * step + 1
+        first = np.cumsum(n_beam_nodes) - n_beam_nodes
+        last = first + n_beam_nodes - 1
 
-            # If the node does not exist, it is added
-            else:
-                if x == n1.x:
-                    n = self.add_node(x, n1.F, n1.u)
+        # The last boundary of a beam isn't the start of an element
+        is_start = np.ones(len(boundaries), dtype=bool)
+        is_start[np.cumsum(n_elements + 1) - 1] = False
+        starts = np.flatnonzero(is_start)
+        size = (boundaries[starts + 1] - boundaries[starts]) / step
+
+        # Position of the first node of each element
+        beam = np.repeat(np.arange(len(beams)), n_elements)
+        element_first = first[beam] + (np.arange(len(beam)) - np.repeat(np.cumsum(n_elements) - n_elements,
+                                                                          n_elements)) * step
+
+        coordinates = np.zeros(int(np.sum(n_beam_nodes)))
+        coordinates[element_first[:, None] + np.arange(step)] = (boundaries[starts, None] +
+                                                                 np.arange(step) * size[:, None])
+        coordinates[last] = boundaries[np.cumsum(n_elements + 1) - 1]
+
+        # The first and the last nodes of each beam have the force and displacement of the auxiliary nodes
+        ends = self._beam_ends(ids)
+        F = np.full(len(coordinates), np.nan)
+        u = np.full(len(coordinates), np.nan)
+        F[first], u[first] = self.aux_nodes.F[ends[:, 0]], self.aux_nodes.u[ends[:, 0]]
+        F[last], u[last] = self.aux_nodes.F[ends[:, 1]], self.aux_nodes.u[ends[:, 1]]
+
+        node_ids = self._merge_nodes(coordinates, F, u)
+
+        connectivity = node_ids[element_first[:, None] + np.arange(step + 1)]
+
+        # The properties of the elements, the beams with properties that are functions of x are set one by one.
+        # The materials and sections are shared by many beams, so each one is checked once
+        properties = [[b.material.E, b.section.A, b.n_x, b.material.rho] for b in beams]
+        is_function = {}
+        for b in beams:
+            for part, values in ((b.material, (b.material.E, b.material.rho)), (b.section, (b.section.A,))):
+                if id(part) not in is_function:
+                    is_function[id(part)] = any(as_function(value) is not None for value in values)
+
+        variable = np.array([is_function[id(b.material)] or is_function[id(b.section)] or
+                             (not isinstance(b.n_x, (int, float)) and as_function(b.n_x) is not None)
+                             for b in beams], dtype=bool)
+        constant = np.array([[0.0] * 4 if v else values for values, v in zip(properties, variable)],
+                            dtype=float).reshape((-1, 4))
+
+        n_elements_before = self.n_elements
+        self._add_elements(element, connectivity, *np.repeat(constant, n_elements, axis=0).T)
+
+        # The elements of each beam are stored
+        ends = n_elements_before + np.cumsum(n_elements)
+        for k, beam_id in enumerate(ids):
+            self.beam_elements[beam_id] = range(ends[k] - n_elements[k] + 1, ends[k] + 1)
+
+            if variable[k]:
+                self.elements.set_properties(np.arange(ends[k] - n_elements[k], ends[k]), *properties[k])
+
+
+    def _beam_ends(self, ids):
+        '''
+        Auxiliary nodes of the ends of several beams, sorted by their coordinate
+
+        :param ids: (list) Ids of the beams
+        :return: (np.array) Id of the auxiliary node with the smallest and the largest coordinate of each beam
+            (n_beams, 2)
+        '''
+
+        ends = np.array([[b.nodes[0].id_global, b.nodes[1].id_global] for b in map(self.beams.get, ids)],
+                        dtype=int).reshape((-1, 2))
+
+        backwards = self.aux_nodes.x[ends[:, 1]] < self.aux_nodes.x[ends[:, 0]]
+        ends[backwards] = ends[backwards, ::-1]
+
+        return ends
+
+
+    def _merge_nodes(self, x, F, u):
+        '''
+        The ids of the nodes in a set of coordinates are obtained, the nodes that don't exist are added
+
+        Two coordinates closer than the tolerance of the model are the same node. The new nodes are added in the
+        order of their first coordinate, with its force and displacement.
+
+        :param x: (np.array) Coordinates
+        :param F: (np.array) Force of each coordinate, NaN if there isn't force
+        :param u: (np.array) Displacement of each coordinate, NaN if it's free
+        :return: (np.array) Global id of the node of each coordinate
+        '''
+
+        ids = np.full(len(x), -1)
+
+        # The coordinates of the nodes that already exist
+        if self.n_nodes > 0:
+            existing = self.nodes.x[:self.n_nodes]
+            order = np.argsort(existing, kind="stable")
+            position = np.searchsorted(existing[order], x)
+
+            for candidate in (np.maximum(position - 1, 0), np.minimum(position, self.n_nodes - 1)):
+                found = (ids < 0) & (np.abs(existing[order[candidate]] - x) <= self.tolerance)
+                ids[found] = order[candidate[found]]
+
+        # The new coordinates are grouped when they are closer than the tolerance, the first one of each group is
+        # the node
+        new = np.flatnonzero(ids < 0)
+        order = new[np.argsort(x[new], kind="stable")]
+        group = np.cumsum(np.diff(x[order], prepend=-np.inf) > self.tolerance) - 1
+
+        representative = np.full(group[-1] + 1 if len(group) else 0, len(x))
+        np.minimum.at(representative, group, order)
+
+        # The nodes are added in the order of their first coordinate
+        sorted_groups = np.argsort(representative)
+        node_ids = np.empty(len(representative), dtype=int)
+        node_ids[sorted_groups] = self._add_nodes(x[representative[sorted_groups]], F[representative[sorted_groups]],
+                                                  u[representative[sorted_groups]])
+        ids[order] = node_ids[group]
+
+        return ids
+
+
+    def _clear_mesh(self):
+        '''
+        The nodes and elements created by the mesh are removed. The auxiliary nodes, the beams and the load
+        cases are kept
+
+        :return: None
+        '''
+
+        self.nodes = NodeArrays()
+        self.elements = ElementArrays(self.nodes)
+        self._connect_arrays()
+        self.n_nodes = 0
+        self.n_elements = 0
+
+        self._node_index = None
+        self.beam_elements = {}
+        self.element_type = None
+        self._element_batch = None
+
+        self._set_changed("geometry")
+
+
+    def mesh_adaptive(self, tolerance, maximum_elements=None, maximum_length=None, element=Element.LINEAR,
+                      fraction=0.5, maximum_iterations=50):
+        '''
+        The model is meshed adaptively
+
+        The model is solved, the error of each element is estimated (see estimate_error) and only the elements
+        with the largest errors are divided in two. This is repeated until the estimated relative error is
+        smaller than the tolerance or the maximum number of elements is reached.
+
+        :param tolerance: (float) Estimated relative error in energy norm that is accepted
+        :param maximum_elements: (int) Maximum number of elements of the mesh. No limit by default
+        :param maximum_length: (float) Maximum length of the elements of the initial mesh. One element per beam
+            by default
+        :param element: (Element) Type of the elements
+        :param fraction: (float) Elements with an error larger than fraction * maximum error are refined
+        :param maximum_iterations: (int) Maximum number of refinements
+        :return: (float) Estimated relative error of the final mesh
+        '''
+
+        if not self.beams:
+            raise ValueError("The model has no beams to mesh")
+
+        # Initial mesh
+        if maximum_length is None:
+            maximum_length = max(abs(b.nodes[1].x - b.nodes[0].x) for b in self.beams.values())
+
+        self._clear_mesh()
+        self.mesh(maximum_length, element)
+
+        for iteration in range(maximum_iterations + 1):
+            self.Solve()
 
-                elif x == n2.x:
-                    n = self.add_node(x, n2.F, n2.u)
+            eta, relative_error = self.estimate_error()
 
-                else:
-                    n = self.add_node(x)
+            # The number of elements that can be added without exceeding the maximum
+            available = np.inf if maximum_elements is None else maximum_elements - self.n_elements
 
-            # Append the node to the list of nodes added
-            list_nodes_adeed.append(n)
+            if relative_error <= tolerance or available <= 0 or iteration == maximum_iterations:
+                break
 
-            x += length_element
+            # The elements with the largest errors are marked, as many as the maximum number of elements allows
+            marked = np.flatnonzero(eta >= fraction * eta.max())
+            marked = marked[np.argsort(-eta[marked], kind="stable")][:int(min(available, len(marked)))]
 
+            # The new boundaries of the elements of each beam, the marked elements are divided in two
+            batch = self.element_batch()
+            boundaries = {}
+            for id in self.beams:
+                i = np.searchsorted(batch.ids, self.beam_elements[id])
+                refined = np.isin(i, marked)
 
-        # Convierte la lista de nodos en una lista de pares de nodos concatenados es decir [(n1, n2), (n2, n3), (n3, n4), ...]
-        list_nodes_adeed = list(zip(list_nodes_adeed, list_nodes_adeed[1:]))
+                x = np.concatenate([batch.x1[i], batch.x2[i], (batch.x1[i] + batch.x2[i])[refined] / 2])
+                boundaries[id] = np.unique(x)
 
+            # The model is meshed again with the new boundaries
+            self._clear_mesh()
+            self._mesh_beams(list(boundaries), np.concatenate(list(boundaries.values())),
+                             [len(x) - 1 for x in boundaries.values()], element)
 
+        return relative_error
 
-        # The elements are added
-        for nodes in list_nodes_adeed:
-            self.add_element(Element.LINEAR, [nodes[0].id_global, nodes[1].id_global], beam.material.E, beam.section.A, beam.n_x)
 
+    def estimate_error(self):
+        '''
+        The error of the solution is estimated in each element
+
+        The axial force of the finite element solution is not in equilibrium at the nodes. The residual of the
+        equilibrium of each node (forces of the elements, punctual forces and reactions) is shared between the
+        ends of its elements to obtain a recovered force N*, and the error of each element is:
+
+            eta_e^2 = integral of (N* - N)^2 / (E·A) dx
+
+        :return: (np.array, float) Error of each element (in the order of element_batch) and relative error of
+            the model in energy norm
+        '''
+
+        if not self.solved:
+            raise Exception("The model is not solved")
+
+        batch = self.element_batch()
+        i = np.arange(batch.n_elements)
+
+        # Forces at the ends of the elements
+        N_start = batch.force_chi(self.delta, i, -np.ones(batch.n_elements))
+        N_end = batch.force_chi(self.delta, i, np.ones(batch.n_elements))
+
+        start = batch.connectivity[:, 0]
+        end = batch.connectivity[:, -1]
+
+        # Residual of the equilibrium of each node and number of elements connected to it
+        P = (self.obtain_vector_forces() + self.reactions)[:, 0]
+        residual = (np.bincount(start, N_start, self.n_nodes) - np.bincount(end, N_end, self.n_nodes) + P)
+        k = np.bincount(start, minlength=self.n_nodes) + np.bincount(end, minlength=self.n_nodes)
+
+        # Difference between the recovered force and the force of the element at its ends, N* - N is linear
+        c1 = -residual[start] / k[start]
+        c2 = residual[end] / k[end]
+
+        eta = np.sqrt(batch._J() / (batch.E * batch.A) * 2/3 * (c1**2 + c1 * c2 + c2**2))
+
+        # Energy norm of the solution
+        energy = np.sum(self.delta * (self.K_G @ self.delta))
+        error = np.sum(eta**2)
+
+        relative_error = np.sqrt(error / (energy + error)) if energy + error > 0 else 0.0
+
+        return eta, relative_error
+
+
+    def _node_key(self, x):
+        '''
+        Key of the bucket of the index of coordinates where a coordinate is stored
+
+        :param x: (float) Position in space in coordinate x
+        :return: (int) Key of the bucket
+        '''
+
+        return math.floor(x / self.tolerance)
 
     def bool_created_node(self, x):
         '''
@@ -280,48 +965,108 @@ class Model:
         :return: (bool) True if the node is created
         '''
 
-        for id, node in self.nodes.items():
-            if node == x:
-                return True
-
-        return False
+        return self.created_node(x) is not None
 
     def created_node(self, x):
         """
         Search a node in the list of nodes created
 
+        The node is searched in the index of coordinates, a node at a distance smaller than the tolerance
+        of the model is considered the same node.
+
         :param x: (float) Position in space in coordinate x
         :return:
         """
-        for id, node in self.nodes.items():
-            if node == x:
-                return node
+
+        id = self._find_node(x)
+
+        return None if id is None else self.nodes[id]
+
+    def _find_node(self, x):
+        '''
+        Search the id of a node in the index of coordinates
+
+        :param x: (float) Position in space in coordinate x
+        :return: (int) Global id of the node, None if it's not created
+        '''
+
+        key = self._node_key(x)
+
+        # The index is built the first time a node is searched, the bulk construction of the mesh doesn't need it
+        if self._node_index is None:
+            self._node_index = {}
+            for id_node, x_node in enumerate(self.nodes.x[:self.n_nodes].tolist()):
+                self._node_index.setdefault(self._node_key(x_node), id_node)
+
+        # A node within the tolerance can only be in the same bucket or in the neighbouring ones
+        for k in (key, key - 1, key + 1):
+            id = self._node_index.get(k)
+            if id is not None and abs(self.nodes.x[id] - x) <= self.tolerance:
+                return id
+
         return None
 
 
 
 
 
+    def element_batch(self):
+        '''
+        The properties of all the elements of the model are obtained in contiguous arrays
+
+        :return: (element_1D_batch) Batch of elements
+        '''
+
+        if self._element_batch is None:
+            self._element_batch = self.elements.batch()
+
+        return self._element_batch
+
+
     def Assemble_K_G(self):
         '''
         The global stiffness matrix of a 1D finite element problem is assembled
         :return:
         '''
 
+        # The elements are stored in contiguous arrays to compute all of them at once
+        batch = self.element_batch()
+
         # The global stiffness matrix is created
-        self.K_G = np.zeros((self.n_nodes, self.n_nodes))
+        if self.storage == Storage.BANDED:
+            x = self.nodes.x[:self.n_nodes]
 
-        # The elements are traversed
-        for id, e in self.elements.items():
+            # The nodes are sorted by their coordinate to obtain the narrowest band
+            order, bandwidth = band_order(x, batch.connectivity)
+            self.K_G = BandedMatrix(self.n_nodes, bandwidth, order)
+
+        else:
+            self.K_G = np.zeros((self.n_nodes, self.n_nodes))
 
-            # The stiffness matrix of the element is obtained
-            K_e = e._K()
+        # The stiffness matrices of all the elements are computed and assembled
+        batch.scatter_K(self.K_G)
 
-            # The global stiffness matrix is assembled
-            self.K_G[e.n1.id_global, e.n1.id_global] += K_e[0,0]
-            self.K_G[e.n1.id_global, e.n2.id_global] += K_e[0,1]
-            self.K_G[e.n2.id_global, e.n1.id_global] += K_e[1,0]
-            self.K_G[e.n2.id_global, e.n2.id_global] += K_e[1,1]
+        # The load vector and the factorization have to follow the new matrix
+        self.changed.update(geometry=False, stiffness=True, loads=True)
+
+    def Assemble_M_G(self):
+        '''
+        The global consistent mass matrix is assembled, with the same storage as the global stiffness matrix
+
+        :return:
+        '''
+
+        batch = self.element_batch()
+
+        if self.storage == Storage.BANDED:
+            order, bandwidth = band_order(self.nodes.x[:self.n_nodes], batch.connectivity)
+            self.M_G = BandedMatrix(self.n_nodes, bandwidth, order)
+
+        else:
+            self.M_G = np.zeros((self.n_nodes, self.n_nodes))
+
+        # The mass matrices of all the elements are computed and assembled
+        batch.scatter_K(self.M_G, batch._M())
 
     def Assemble_f_G(self):
         '''
@@ -335,133 +1080,442 @@ class Model:
 
 
 
-        # The elements are traversed
-        for id, e in self.elements.items():
-
-            # The load vector of the element is obtained
-            f_e = e._f()
-
-            # The global load vector is assembled
-            self.f_G[e.n1.id_global] += f_e[0]
-            self.f_G[e.n2.id_global] += f_e[1]
+        # The load vectors of all the elements are computed and assembled
+        self.element_batch().scatter_f(self.f_G)
 
 
         # The punctual loads are added to the global load vector
         self.f_G += self.obtain_vector_forces()
 
+        if not self.changed["geometry"]:
+            self.changed["loads"] = False
+
 
 
-    def Boundary_Conditions(self):
+    def Boundary_Conditions(self, stiffness=True):
         '''
-        The boundary conditions of the model are imposed in:
-            - The global stiffness matrix
-            - The global load vector
-            
+        The boundary conditions of the model are imposed by partitioning the degrees of freedom in:
+            - Free: the displacement is unknown
+            - Constrained: the displacement is imposed by the user
+
+        Only the block of the free degrees of freedom is kept (cc = boundary conditions):
+            K_G_cc = K_ff
+            f_G_cc = f_f - K_fc · u_c
+
+        so the imposed displacements different from zero are taken into account in the loads.
+
+        :param stiffness: (bool) If False, the block K_G_cc of the previous call is kept and only the loads are
+            imposed. It can only be used when the stiffness and the supports haven't changed
         :return: None
         '''
-        # A copy of the global stiffness matrix is created so as not to modify the original (cc = boundary conditions)
-        self.K_G_cc = self.K_G.copy()
-
-        # A copy of the global load vector is created so as not to modify the original (cc = boundary conditions)
-        self.f_G_cc = self.f_G.copy()
 
         # The displacement of the nodes that area imposed
         displacements_imposed = self.obtain_displacements_imposed()
 
-        # The displacements are added to the vector using np.isnan()
-        for i in range(self.n_nodes):
+        # The index sets of the free and constrained degrees of freedom are built once
+        is_constrained = ~np.isnan(displacements_imposed[:, 0])
+        self.free = np.flatnonzero(~is_constrained)
+        self.constrained = np.flatnonzero(is_constrained)
 
-            # When the user imposes a displacement, the row and column of the global stiffness matrix are set to zero
-            if not np.isnan(displacements_imposed[i]):
-                self.K_G_cc[i, :] = 0
-                self.K_G_cc[:, i] = 0
-                self.K_G_cc[i, i] = 1
+        # Vector with the imposed displacements and zero in the free degrees of freedom
+        self.u_c = np.where(is_constrained[:, None], displacements_imposed, 0)
 
-                self.f_G_cc[i] = displacements_imposed[i]
+        # The block of the free degrees of freedom of the global stiffness matrix, it has to be factorized again
+        if stiffness:
+            if self.storage == Storage.BANDED:
+                self.K_G_cc = self.K_G.submatrix(self.free)
+            else:
+                self.K_G_cc = self.K_G[np.ix_(self.free, self.free)]
+
+            if not self.changed["geometry"]:
+                self.changed.update(supports=False, stiffness=True)
 
-    def delta_pos(self, x):
+        # The loads of the free degrees of freedom, including the effect of the imposed displacements
+        self.f_G_cc = self.f_G[self.free] - (self.K_G @ self.u_c)[self.free]
+
+    def delta_pos(self, x, case=None):
         '''
         The displacement of a point is obtained
 
-        :param x: (float) Position in space in coordinate x
-        :return: (float) Displacement
+        :param x: (float or np.array) Position in space in coordinate x. An array of points can be given
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (float or np.array) Displacement
         '''
 
-        # If the model is not solved, the displacement is not calculated
-        if self.solved:
-            # The element is obtained
-            e = self._obtain_element(x)
+        return self._field_pos(x, "u", case)
 
-            # The displacement is obtained
-            return e.u(self.delta, e.chi_in_x(x)).item()
 
-        else:
-            raise Exception("The model is not solved")
+    def epsilon_pos(self, x, case=None):
+        '''
+        The strain of a point is obtained
+
+        :param x: (float or np.array) Position in space in coordinate x. An array of points can be given
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (float or np.array) Strain
+        '''
 
+        return self._field_pos(x, "epsilon_chi", case)
 
-    def epsilon_pos(self, x):
+
+    def sigma_pos(self, x, case=None):
         '''
-        The strain of a point is obtained
+        The stress of a point is obtained
 
-        :param x: (float) Position in space in coordinate x
-        :return: (float) Strain
+        :param x: (float or np.array) Position in space in coordinate x. An array of points can be given
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (float or np.array) Stress
         '''
 
-        # If the model is not solved, the strain is not calculated
-        if self.solved:
-            # The element is obtained
-            e = self._obtain_element(x)
+        return self._field_pos(x, "sigma_chi", case)
 
-            # The strain is obtained
-            return e.epsilon_chi(self.delta, e.chi_in_x(x)).item()
 
-        else:
-            raise Exception("The model is not solved")
+    def force_pos(self, x, case=None):
+        '''
+        The force of a point is obtained
+
+        :param x: (float or np.array) Position in space in coordinate x. An array of points can be given
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (float or np.array) Force
+        '''
 
+        return self._field_pos(x, "force_chi", case)
 
-    def sigma_pos(self, x):
+
+    def _field_pos(self, x, field, case=None):
         '''
-        The stress of a point is obtained
+        A field of the solution is evaluated in a point or in an array of points at once
 
-        :param x: (float) Position in space in coordinate x
-        :return: (float) Stress
+        :param x: (float or np.array) Position in space in coordinate x
+        :param field: (str) Method of element_1D_batch that evaluates the field
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (float or np.array) Value of the field, with the same shape as x
         '''
 
-        # If the model is not solved, the stress is not calculated
+        # If the model is not solved, the field is not calculated
         if self.solved:
-            # The element is obtained
-            e = self._obtain_element(x)
+            # The stresses of an elasto-plastic solution depend on the plastic strain
+            if case is None and self.plastic_state is not None and field in ("sigma_chi", "force_chi"):
+                batch = self.element_batch()
+                i = batch.locate(x, self.tolerance)
+                value = self._plastic_field(field, i, batch.chi_in_x(x, i))
+
+                return value.item() if np.ndim(x) == 0 else value
 
-            # The stress is obtained
-            return e.sigma_chi(self.delta, e.chi_in_x(x)).item()
+            # The displacements of the load case
+            delta = self.delta if case is None else self.load_case_results[case]["delta"]
+
+            return self._evaluate(x, field, delta)
 
         else:
             raise Exception("The model is not solved")
 
+    def _evaluate(self, x, field, delta):
+        '''
+        A field is evaluated in a point or in an array of points for a vector of displacements of the nodes
 
-    def force_pos(self, x):
+        :param x: (float or np.array) Position in space in coordinate x
+        :param field: (str) Method of element_1D_batch that evaluates the field
+        :param delta: (np.array) Displacements of the nodes
+        :return: (float or np.array) Value of the field, with the same shape as x
         '''
-        The force of a point is obtained
 
-        :param x: (float) Position in space in coordinate x
-        :return: (float) Force
+        batch = self.element_batch()
+
+        # The elements are obtained with a binary search
+        i = batch.locate(x, self.tolerance)
+
+        # The field is evaluated in all the points at once
+        value = getattr(batch, field)(delta, i, batch.chi_in_x(x, i))
+
+        return value.item() if np.ndim(x) == 0 else value
+
+    def _plastic_field(self, field, i, chi):
         '''
+        Stress or internal force of the elasto-plastic solution in points of the elements
 
-        # If the model is not solved, the force is not calculated
-        if self.solved:
-            # The element is obtained
-            e = self._obtain_element(x)
+        :param field: (str) "sigma_chi" or "force_chi"
+        :param i: (np.array) Position in the batch of the element of each point
+        :param chi: (np.array) Coordinate in chi of each point
+        :return: (np.array) Values of the field
+        '''
+
+        batch = self.element_batch()
+
+        # The plastic strain is interpolated from the Gauss points
+        plastic_strain = batch.gauss_interpolation(self.plastic_state["plastic_strain"], i, chi)
+        sigma = batch.property("E", chi, i) * (batch.epsilon_chi(self.delta, i, chi) - plastic_strain)
+
+        if field == "force_chi":
+            return sigma * batch.property("A", chi, i)
+
+        return sigma
+
+    def mode_pos(self, x, mode, field="delta"):
+        '''
+        A mode shape is evaluated in a position of the model
+
+        :param x: (float or np.array) Position in space in coordinate x
+        :param mode: (int) Number of the mode, 0 is the lowest frequency
+        :param field: (str) Field of the mode: "delta", "epsilon", "sigma" or "force"
+        :return: (float or np.array) Value of the mode shape
+        '''
+
+        if self.mode_shapes is None:
+            raise Exception("The modal analysis is not solved")
+
+        methods = {"delta": "u", "epsilon": "epsilon_chi", "sigma": "sigma_chi", "force": "force_chi"}
+
+        return self._evaluate(x, methods[field], self.mode_shapes[:, mode])
+
+
+    def Solve_substructured(self, processes=None, chunksize=None):
+        '''
+        The model is solved by substructuring, see FEA_1D.Substructuring.solve_substructured
+
+        The interior nodes of each beam are condensed to the ends of the beam in a pool of processes, the system of
+        the ends is solved and the interior displacements are recovered. The solution is the same as Solve(), with
+        the loads of the model and the load cases, but the global stiffness matrix is not assembled.
+
+        :param processes: (int) Number of processes. All the cores by default, 1 to solve without a pool
+        :param chunksize: (int) Number of beams condensed by a process in each task
+        :return: None
+        '''
+
+        delta, reactions = solve_substructured(self, self._load_vectors(), processes, chunksize)
+        self._set_solution(delta, reactions)
+
+
+    def Solve_iterative(self, preconditioner=Preconditioner.TRIDIAGONAL, tolerance=1e-10, maximum_iterations=None,
+                        warm_start=True):
+        '''
+        The model is solved with the preconditioned conjugate gradient method, see FEA_1D.Iterative
+
+        The product of the stiffness matrix with a vector is computed element by element, so the global stiffness
+        matrix is never assembled and the memory is a few vectors. The loads of the model and the load cases are
+        solved one after the other.
+
+        :param preconditioner: (Preconditioner) JACOBI, TRIDIAGONAL (exact for linear elements) or MULTIGRID
+        :param tolerance: (float) Relative tolerance of the residual
+        :param maximum_iterations: (int) Maximum number of iterations of each load vector. 10 times the number of
+            nodes by default
+        :param warm_start: (bool) The iterations start from the previous solution of the model, if there is one
+        :return: (dict) Number of iterations and relative residual of each load vector {"iterations", "residuals"}
+        '''
+
+        x0 = self._previous_solution() if warm_start else None
+
+        delta, reactions, iterations, residuals = solve_matrix_free(self, self._load_vectors(), preconditioner,
+                                                                    tolerance, maximum_iterations, x0)
+        self._set_solution(delta, reactions)
+
+        return {"iterations": iterations, "residuals": residuals}
+
+
+    def Solve_multigrid(self, tolerance=1e-10, maximum_cycles=100, smoothing=2, warm_start=True):
+        '''
+        The model is solved with geometric multigrid V-cycles, see FEA_1D.Multigrid
+
+        The levels are built halving the number of elements of each beam. Only for linear elements. The number of
+        V-cycles doesn't depend on the size of the elements and each V-cycle costs O(n).
+
+        :param tolerance: (float) Relative tolerance of the residual
+        :param maximum_cycles: (int) Maximum number of V-cycles of each load vector
+        :param smoothing: (int) Number of red-black Gauss-Seidel sweeps before and after the coarse correction
+        :param warm_start: (bool) The cycles start from the previous solution of the model, if there is one
+        :return: (dict) Number of V-cycles and relative residual of each load vector {"cycles", "residuals"}
+        '''
+
+        x0 = self._previous_solution() if warm_start else None
+
+        delta, reactions, cycles, residuals = solve_multigrid(self, self._load_vectors(), tolerance, maximum_cycles,
+                                                              smoothing, x0)
+        self._set_solution(delta, reactions)
+
+        return {"cycles": cycles, "residuals": residuals}
 
-            # The force is obtained
-            return e.force_chi(self.delta, e.chi_in_x(x)).item()
 
+    def _load_vectors(self):
+        '''
+        The global load vector of the model and of the load cases are assembled
+
+        :return: (np.array) Load vectors (n_nodes, 1 + number of load cases)
+        '''
+
+        self.Assemble_f_G()
+
+        return np.hstack([self.f_G] + [self.obtain_vector_forces_load_case(name) for name in self.load_cases])
+
+
+    def _previous_solution(self):
+        '''
+        Displacements of the last solution, used as the initial value of the iterative solvers
+
+        :return: (np.array) Displacements (n_nodes, 1 + number of load cases), None if the nodes or the load cases
+            have changed
+        '''
+
+        delta = getattr(self, "delta", None)
+        if delta is None or delta.shape[0] != self.n_nodes or \
+                any(name not in self.load_case_results for name in self.load_cases):
+            return None
+
+        return np.hstack([delta] + [self.load_case_results[name]["delta"] for name in self.load_cases])
+
+
+    def _set_solution(self, delta, reactions):
+        '''
+        The solution of a solver without the global stiffness matrix is stored in the model
+
+        :param delta: (np.array) Displacements (n_nodes, 1 + number of load cases)
+        :param reactions: (np.array) Reactions (n_nodes, 1 + number of load cases)
+        :return: None
+        '''
+
+        # The first column is the solution with the loads of the model
+        self.delta = delta[:, :1]
+        self.reactions = reactions[:, :1]
+
+        for i, name in enumerate(self.load_cases, start=1):
+            self.load_case_results[name] = {"delta": delta[:, i:i + 1], "reactions": reactions[:, i:i + 1]}
+
+        self._sigma_elements = {}
+        self.plastic_state = None
+
+        # The changes are kept, so the next call of Solve() assembles what it needs
+        self.solved = True
+
+
+    def Solve_transient(self, dt, n_steps, load=None, output=None, **options):
+        '''
+        Transient dynamic analysis of the model with the implicit Newmark method, see FEA_1D.Dynamics.newmark
+
+        :param dt: (float) Time step
+        :param n_steps: (int) Number of steps
+        :param load: (function) Factor of the loads of the model or global load vector as a function of the time
+        :param output: (str or Path) File where the results are written step by step, in memory if it's None
+        :param options: Other parameters of newmark (beta, gamma, damping, u0, v0, every)
+        :return: (dict) Results {"t", "delta", "velocity", "acceleration"}
+        '''
+
+        return newmark(self, dt, n_steps, load, output=output, **options)
+
+
+    def Solve_plastic(self, increments=10, method=NonlinearMethod.NEWTON, tolerance=1e-8, maximum_iterations=20,
+                      minimum_increment=1e-6):
+        '''
+        The model is solved with elasto-plastic materials, see FEA_1D.Plasticity.solve_plastic
+
+        The materials with a yield stress (sigma_y) follow a bilinear law with hardening, the rest are elastic. The
+        loads and imposed displacements are applied in increments and the load cases are not solved. After the
+        solve, delta_pos, sigma_pos... give the elasto-plastic solution and the state of the material is kept in
+        plastic_state.
+
+        :param increments: (int) Number of increments of the first try
+        :param method: (NonlinearMethod) NEWTON, or MODIFIED_NEWTON to reuse the factorized tangent of each increment
+        :param tolerance: (float) Relative tolerance of the residual forces
+        :param maximum_iterations: (int) Maximum number of iterations of an increment before it's halved
+        :param minimum_increment: (float) Minimum increment of the load factor
+        :return: (dict) Statistics of the solve {"load_factors", "iterations", "factorizations"}
+        '''
+
+        solution = solve_plastic(self, increments, method, tolerance, maximum_iterations, minimum_increment)
+
+        self.delta = solution["delta"].reshape((-1, 1))
+        self.reactions = solution["reactions"].reshape((-1, 1))
+        self.plastic_state = {name: solution[name] for name in ("plastic_strain", "alpha", "sigma")}
+        self.load_case_results = {}
+        self._sigma_elements = {}
+
+        self.solved = True
+
+        return {name: solution[name] for name in ("load_factors", "iterations", "factorizations")}
+
+
+    def Solve_modal(self, n_modes, shift=0.0, tolerance=1e-10):
+        '''
+        The lowest natural frequencies and mode shapes of the model are obtained
+
+        The stiffness and mass matrices are assembled with the storage of the model and the supports are applied
+        (the constrained nodes are fixed). Only the modes requested are computed, with the shift-invert Lanczos
+        method (see FEA_1D.Modal.lanczos).
+
+        :param n_modes: (int) Number of modes
+        :param shift: (float) The modes with omega^2 closest to the shift are obtained. 0 gives the lowest ones
+        :param tolerance: (float) Relative tolerance of the eigenvalues
+        :return: (np.array) Natural frequencies [cycles per unit of time]
+        '''
+
+        self.Assemble_K_G()
+        self.Assemble_M_G()
+
+        # Only the supports are needed, the loads of the model are not used
+        if self.f_G is None or self.f_G.shape[0] != self.n_nodes:
+            self.Assemble_f_G()
+
+        self.Boundary_Conditions()
+
+        if self.storage == Storage.BANDED:
+            M_G_cc = self.M_G.submatrix(self.free)
         else:
+            M_G_cc = self.M_G[np.ix_(self.free, self.free)]
+
+        eigenvalues, vectors = lanczos(self.K_G_cc, M_G_cc, n_modes, shift, tolerance)
+
+        # The mode shapes are zero in the constrained nodes
+        self.mode_shapes = np.zeros((self.n_nodes, len(eigenvalues)))
+        self.mode_shapes[self.free] = vectors
+
+        self.eigenvalues = eigenvalues
+        self.frequencies = np.sqrt(np.maximum(eigenvalues, 0)) / (2 * np.pi)
+
+        return self.frequencies
+
+
+    def sigma_elements(self, case=None):
+        '''
+        Stress in the middle of each element
+
+        :param case: (str) Name of the load case. The loads of the model by default
+        :return: (np.array) Stress of each element, in the order of the ids of the elements
+        '''
+
+        if not self.solved:
             raise Exception("The model is not solved")
 
+        if case not in self._sigma_elements:
+            batch = self.element_batch()
+            i = np.arange(batch.n_elements)
 
+            if case is None and self.plastic_state is not None:
+                self._sigma_elements[case] = self._plastic_field("sigma_chi", i, np.zeros(batch.n_elements))
+            else:
+                delta = self.delta if case is None else self.load_case_results[case]["delta"]
+                self._sigma_elements[case] = batch.sigma_chi(delta, i, 0)
+
+        return self._sigma_elements[case]
 
 
+    def save(self, path):
+        '''
+        The model is saved in a binary file, see FEA_1D.IO.save_model
+
+        :param path: (str or Path) Path of the file
+        :return: None
+        '''
+
+        save_model(self, path)
+
+    @staticmethod
+    def load(path, mmap=True):
+        '''
+        A model is loaded from a binary file, see FEA_1D.IO.load_model
+
+        :param path: (str or Path) Path of the file
+        :param mmap: (bool) If True the large arrays are memory-mapped instead of read
+        :return: (Model) Model
+        '''
 
+        return load_model(path, mmap)
 
 
     def _obtain_element(self, x):
@@ -476,33 +1530,83 @@ class Model:
         for id, e in self.elements.items():
 
             # If the point is between the nodes of the element, the element is returned
-            if e.n1.x <= x <= e.n2.x:
+            if e.x1 <= x <= e.x2:
                 return e
 
         return None
 
 
+    def Factorize(self):
+        '''
+        The block of the free nodes of the global stiffness matrix is factorized
+
+        :return: None
+        '''
+
+        self.factorization = factorize(self.K_G_cc, self._dtype())
+
+        if not self.changed["geometry"] and not self.changed["supports"]:
+            self.changed["stiffness"] = False
+
+
     def Solve(self):
         '''
         The model is solved
 
+        Only the phases affected by the changes since the last solution are repeated (see Model.changed). For
+        example, after a change of the loads the assembled and factorized stiffness matrix is reused. The model
+        must be changed with its methods (add_*, update_*, mesh) or through the views of its nodes and elements
+        (model.nodes[id].F, model.elements[id].E) for the changes to be tracked.
+
         :return: None
         '''
 
+        geometry = self.changed["geometry"]
+        loads = geometry or self.changed["loads"]
+        refactorize = geometry or self.changed["stiffness"] or self.changed["supports"]
+
         # The global stiffness matrix is assembled
-        self.Assemble_K_G()
+        if geometry:
+            self.Assemble_K_G()
 
         # The global load vector is assembled
-        self.Assemble_f_G()
+        if loads:
+            self.Assemble_f_G()
 
-        # The boundary conditions are imposed
-        self.Boundary_Conditions()
+        # The boundary conditions are imposed, the block of the stiffness matrix is only needed if it's factorized
+        if refactorize or loads:
+            self.Boundary_Conditions(stiffness=refactorize)
+
+        # The stiffness matrix is factorized once and all the load cases are solved at the same time
+        if refactorize:
+            self.Factorize()
+
+        # The global load vectors of the load cases are added as columns after the loads of the model
+        f = np.hstack([self.f_G] + [self.obtain_vector_forces_load_case(name) for name in self.load_cases])
+        f_cc = f[self.free] - (self.K_G @ self.u_c)[self.free]
 
-        # The displacements are calculated
-        self.delta = np.linalg.solve(self.K_G_cc, self.f_G_cc)
+        # The displacements of the free nodes are calculated (banded or dense solver depending on the storage)
+        delta = np.repeat(self.u_c, f.shape[1], axis=1)
 
-        # The reactions are calculated
-        self.reactions = self.K_G @ self.delta - self.f_G
+        if self.precision == Precision.MIXED:
+            delta[self.free] = self._refine(f_cc)
+        else:
+            delta[self.free] = self.factorization.solve(f_cc)
+            self.refinement = None
+
+        # The reactions are recovered from the rows of the constrained nodes
+        reactions = np.zeros_like(f)
+        reactions[self.constrained] = (self.K_G @ delta)[self.constrained] - f[self.constrained]
+
+        # The first column is the solution with the loads of the model
+        self.delta = delta[:, :1]
+        self.reactions = reactions[:, :1]
+
+        for i, name in enumerate(self.load_cases, start=1):
+            self.load_case_results[name] = {"delta": delta[:, i:i + 1], "reactions": reactions[:, i:i + 1]}
+
+        self._sigma_elements = {}
+        self.plastic_state = None
 
         # Print the reactions
         # print("Reactions")
@@ -521,6 +1625,37 @@ class Model:
 
         # The model is solved
         self.solved = True
+        self.changed = dict.fromkeys(self.changed, False)
+
+
+    def _dtype(self):
+        '''
+        Type of the stored factorization of the stiffness matrix
+
+        :return: (np.dtype) np.float32 with Precision.MIXED, float64 otherwise
+        '''
+
+        return np.float32 if self.precision == Precision.MIXED else np.float64
+
+
+    def _refine(self, f_cc):
+        '''
+        The systems of the free nodes are solved with the float32 factorization and iterative refinement
+
+        :param f_cc: (np.array) Loads of the free nodes (n_free, n_cases)
+        :return: (np.array) Displacements of the free nodes (n_free, n_cases)
+        '''
+
+        K = self.K_G_cc
+        norm_K = K.norm() if isinstance(K, BandedMatrix) else float(np.max(np.sum(np.abs(K), axis=1), initial=0))
+
+        solutions = [iterative_refinement(self.factorization, K, f_cc[:, j], norm_K=norm_K)
+                     for j in range(f_cc.shape[1])]
+
+        self.refinement = {"iterations": [iterations for x, iterations, residual in solutions],
+                           "residuals": [residual for x, iterations, residual in solutions]}
+
+        return np.column_stack([x for x, iterations, residual in solutions])
 
 
     def info(self):
@@ -557,4 +1692,66 @@ class Model:
 
         print()
         print("Status of the model")
-        print("\t- Solved: ", self.solved)
\ No newline at end of file
+        print("\t- Solved: ", self.solved)
+
+        if self.profiler is not None:
+            print()
+            print("Profiling of the phases")
+            self.profiler.info()
+
+
+    def enable_profiling(self, memory=False, observers=None):
+        '''
+        The calls of the phases of the model (mesh, assembly, boundary conditions, factorization, Solve and the
+        queries *_pos) are measured
+
+        The methods are wrapped only in this model while the profiling is enabled, so a model without profiling
+        doesn't have any overhead.
+
+        :param memory: (bool) If True, the memory allocated in each phase is also measured
+        :param observers: (list) Functions called after each call of a phase with the arguments (phase, record)
+        :return: (Profiler) Profiler of the model
+        '''
+
+        if self.profiler is not None:
+            self.disable_profiling()
+
+        self.profiler = Profiler(memory, observers)
+        self.profiler.start()
+
+        # The wrapped methods are attributes of the instance, they hide the methods of the class
+        for phase in PROFILED_PHASES:
+            setattr(self, phase, self.profiler.wrap(phase, getattr(self, phase)))
+
+        return self.profiler
+
+    def disable_profiling(self):
+        '''
+        The profiling of the model is disabled, the original methods are used again
+
+        :return: (dict) Last report of the profiler, None if the profiling wasn't enabled
+        '''
+
+        if self.profiler is None:
+            return None
+
+        for phase in PROFILED_PHASES:
+            self.__dict__.pop(phase, None)
+
+        self.profiler.stop()
+        report = self.profiler.report()
+        self.profiler = None
+
+        return report
+
+    def profile_report(self):
+        '''
+        Report of the phases measured since the profiling was enabled
+
+        :return: (dict) {phase: {"calls", "time", "self_time", "allocated", "peak"}}, None if it's disabled
+        '''
+
+        if self.profiler is None:
+            return None
+
+        return self.profiler.report()
\ No newline at end of file
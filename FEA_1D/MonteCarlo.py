@@ -0,0 +1,232 @@
+import numpy as np
+
+from FEA_1D.Solver import band_order, solve_banded_batch
+
+
+def monte_carlo(model, samples, quantiles=(0.05, 0.5, 0.95), chunk_size=None):
+    '''
+    Monte Carlo analysis of the model with random properties of the elements
+
+    Each sample gives the Young's modulus "E", the area "A" and the distributed load "n_x" of every element. The
+    stiffness bands of all the samples of a chunk are assembled at once (the matrices of the elements are
+    computed once with unit properties and scaled by E·A), and the systems are solved with a banded solve
+    vectorized across the samples (tridiagonal for linear elements). Only the tip displacement and the maximum
+    stress of each sample are kept, not the full solutions.
+
+    :param model: (Model) Meshed model used as template. It is not modified
+    :param samples: (dict) Values of the properties {"E" | "A" | "n_x": np.array (n_samples, n_elements)}, the
+        columns follow the order of model.element_batch(). The properties not given keep the values of the model
+    :param quantiles: (tuple) Levels of the quantiles of the results
+    :param chunk_size: (int) Number of samples solved at the same time. By default the chunks need about 32 MB
+    :return: (dict) Statistics of the results:
+        - "n_samples": (int) Number of samples
+        - "quantiles": (np.array) Levels of the quantiles
+        - "tip_displacement": (dict) "mean", "variance" and "quantiles" of the displacement of the node with the
+          largest coordinate
+        - "max_stress": (dict) "mean", "variance" and "quantiles" of the maximum absolute stress in the elements
+    '''
+
+    batch = model.element_batch()
+
+    if batch.groups is not None and np.any(batch.groups >= 0):
+        raise NotImplementedError("Unimplemented method for models with properties defined as functions of x.")
+
+    n_samples, properties = _sample_arrays(samples, batch)
+
+    x = model.nodes.x[:model.n_nodes]
+    n = model.n_nodes
+    tip = int(np.argmax(x))
+
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+    is_constrained = ~np.isnan(displacements_imposed)
+    u_c = np.where(is_constrained, displacements_imposed, 0)
+    F = model.obtain_vector_forces()[:, 0]
+
+    # Position of the free nodes in the band of the free system
+    order, _ = band_order(x, batch.connectivity)
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(n)
+
+    selected = np.zeros(n, dtype=bool)
+    selected[rank[~is_constrained]] = True
+    position = np.full(n, -1)
+    position[~is_constrained] = (np.cumsum(selected) - 1)[rank[~is_constrained]]
+    n_free = int(np.count_nonzero(~is_constrained))
+
+    # Matrices and load vectors of the elements with unit properties, they are scaled by the samples
+    unit = type(batch)(batch.connectivity, batch.x1, batch.x2, 1.0, 1.0, 1.0)
+    K_unit = unit._K()
+    f_unit = unit._f()
+
+    stiffness, coupling, loads, bandwidth = _patterns(batch.connectivity, position, K_unit, f_unit, u_c)
+
+    chunk_size = chunk_size or max(1, 2 ** 22 // max((bandwidth + 2) * n_free, 1))
+
+    tip_displacement = np.zeros(n_samples)
+    max_stress = np.zeros(n_samples)
+
+    free = np.flatnonzero(~is_constrained)
+    free_band = free[np.argsort(position[free])]
+
+    # The stress is linear in chi in the elements, so the maximum is in the ends
+    B = [batch._B(chi) for chi in (-1.0, 1.0)]
+
+    for start in range(0, n_samples, chunk_size):
+        E, A, n_x = (values[start:start + chunk_size] for values in properties)
+        size = E.shape[0]
+
+        bands = np.zeros(((bandwidth + 1) * n_free, size))
+        _scatter(stiffness, (E * A).T, bands)
+        bands = bands.reshape((bandwidth + 1, n_free, size))
+
+        b = np.repeat(F[free_band, None], size, axis=1)
+        _scatter(coupling, -(E * A).T, b)
+        _scatter(loads, n_x.T, b)
+
+        delta = np.repeat(u_c[:, None], size, axis=1)
+        delta[free_band] = solve_banded_batch(bands, b)
+
+        tip_displacement[start:start + size] = delta[tip]
+
+        # Stresses in the ends of the elements (n_elements, n_samples)
+        delta_element = delta[batch.connectivity]
+        sigma = [E.T * np.sum(B_chi[:, :, None] * delta_element, axis=1) for B_chi in B]
+        max_stress[start:start + size] = np.max(np.abs(sigma), axis=(0, 1), initial=0)
+
+    quantiles = np.asarray(quantiles, dtype=float)
+
+    return {"n_samples": n_samples,
+            "quantiles": quantiles,
+            "tip_displacement": _statistics(tip_displacement, quantiles),
+            "max_stress": _statistics(max_stress, quantiles)}
+
+
+def _sample_arrays(samples, batch):
+    '''
+    The arrays of the samples are checked and the properties that aren't sampled are taken from the model
+
+    :param samples: (dict) Values of the properties {"E" | "A" | "n_x": np.array (n_samples, n_elements)}
+    :param batch: (element_1D_batch) Batch of the elements of the model
+    :return: (int, list) Number of samples and arrays of E, A and n_x (n_samples, n_elements)
+    '''
+
+    for name in samples:
+        if name not in ("E", "A", "n_x"):
+            raise ValueError("Unknown property {}, it must be E, A or n_x".format(name))
+
+    arrays = {name: np.asarray(values, dtype=float) for name, values in samples.items()}
+
+    for name, values in arrays.items():
+        if values.ndim != 2 or values.shape[1] not in (1, batch.n_elements):
+            raise ValueError("The samples of {} must be an array (n_samples, {})".format(name, batch.n_elements))
+
+    n_samples = {values.shape[0] for values in arrays.values()}
+    if len(n_samples) != 1:
+        raise ValueError("All the properties must have the same number of samples")
+
+    n_samples = n_samples.pop()
+
+    for name in ("E", "A"):
+        if name in arrays and np.any(arrays[name] <= 0):
+            raise ValueError("The samples of {} must be positive".format(name))
+
+    properties = [np.broadcast_to(arrays[name] if name in arrays else getattr(batch, name),
+                                  (n_samples, batch.n_elements)) for name in ("E", "A", "n_x")]
+
+    return n_samples, properties
+
+
+def _patterns(connectivity, position, K_unit, f_unit, u_c):
+    '''
+    The positions where the terms of the elements are added are computed once for all the samples
+
+    :param connectivity: (np.array) Global id of the nodes of each element (n_elements, nodes per element)
+    :param position: (np.array) Position of each node in the band of the free system, -1 if it's constrained
+    :param K_unit: (np.array) Stiffness matrices of the elements with E·A = 1
+    :param f_unit: (np.array) Load vectors of the elements with n_x = 1
+    :param u_c: (np.array) Imposed displacement of each node, 0 in the free nodes
+    :return: (tuple) Patterns of the stiffness bands, the effect of the imposed displacements and the
+        distributed loads, and the bandwidth of the free system
+    '''
+
+    n_free = int(np.max(position, initial=-1)) + 1
+    nodes = connectivity.shape[1]
+    elements = np.arange(connectivity.shape[0])
+
+    rows = position[connectivity]
+    bandwidth = 0
+
+    stiffness = []
+    coupling = []
+    loads = []
+
+    for a in range(nodes):
+        free_a = rows[:, a] >= 0
+        loads.append((rows[free_a, a], elements[free_a], f_unit[free_a, a]))
+
+        for b in range(nodes):
+            # Lower triangle of the band of the free system
+            lower = free_a & (rows[:, b] >= 0) & (rows[:, a] >= rows[:, b])
+            k = rows[lower, a] - rows[lower, b]
+            bandwidth = max(bandwidth, int(np.max(k, initial=0)))
+            stiffness.append((k, rows[lower, b], elements[lower], K_unit[lower, a, b]))
+
+            # Terms of the free rows and the constrained columns
+            constrained = free_a & (rows[:, b] < 0)
+            coupling.append((rows[constrained, a], elements[constrained],
+                             K_unit[constrained, a, b] * u_c[connectivity[constrained, b]]))
+
+    k, c, e, values = (np.concatenate(terms) for terms in zip(*stiffness))
+
+    return (_pattern(k * n_free + c, e, values),
+            _pattern(*(np.concatenate(terms) for terms in zip(*coupling))),
+            _pattern(*(np.concatenate(terms) for terms in zip(*loads))),
+            bandwidth)
+
+
+def _pattern(targets, elements, values):
+    '''
+    The terms are sorted by their target, so they can be added with np.add.reduceat for all the samples
+
+    :param targets: (np.array) Row where each term is added
+    :param elements: (np.array) Element of each term, it selects the sampled property that scales the term
+    :param values: (np.array) Value of each term for a unit property
+    :return: (tuple) Sorted elements and values, start of each target and targets
+    '''
+
+    order = np.argsort(targets, kind="stable")
+    targets = targets[order]
+    starts = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]]) if len(targets) else np.zeros(0, dtype=int)
+
+    return elements[order], values[order], starts, targets[starts]
+
+
+def _scatter(pattern, properties, out):
+    '''
+    The terms of a pattern, scaled by the sampled properties, are added to the rows of an array
+
+    :param pattern: (tuple) Pattern of the terms (see _pattern)
+    :param properties: (np.array) Sampled property of each element (n_elements, n_samples)
+    :param out: (np.array) Array where the terms are added (n_rows, n_samples)
+    :return: None
+    '''
+
+    elements, values, starts, targets = pattern
+    if len(starts) == 0:
+        return
+
+    out[targets] += np.add.reduceat(values[:, None] * properties[elements], starts, axis=0)
+
+
+def _statistics(values, quantiles):
+    '''
+    Statistics of a result of the samples
+
+    :param values: (np.array) Result of each sample
+    :param quantiles: (np.array) Levels of the quantiles
+    :return: (dict) Mean, sample variance and quantiles
+    '''
+
+    return {"mean": float(np.mean(values)) if len(values) else np.nan,
+            "variance": float(np.var(values, ddof=1)) if len(values) > 1 else 0.0,
+            "quantiles": np.quantile(values, quantiles) if len(values) else np.full(len(quantiles), np.nan)}
@@ -0,0 +1,324 @@
+import numpy as np
+
+from FEA_1D.Solver import BandedMatrix, band_order, factorize
+
+
+class Multigrid:
+    '''
+    Geometric multigrid of a model of linear elements
+
+    The levels are the meshes of the beams with the size of the elements doubled: each pair of consecutive
+    elements of a beam is merged in one element of the next level, the node in the middle is removed. The
+    corrections of the coarse level are prolongated with a linear interpolation in x, and the residuals are
+    restricted with the transpose. The stiffness of a coarse element is the Galerkin product P^T·K·P of its two
+    elements, so the properties that change in x are kept.
+
+    The smoother is the red-black Gauss-Seidel method (the nodes of a chain of elements are alternated in the order
+    of x), and the coarsest level is solved with the banded factorization. A V-cycle costs O(n) and the number of
+    cycles doesn't depend on the size of the elements.
+    '''
+
+    def __init__(self, model, smoothing=2, coarsest_size=32):
+        '''
+        Constructor of the class Multigrid. The hierarchy of levels is built
+
+        :param model: (Model) Meshed model of linear elements
+        :param smoothing: (int) Number of red-black sweeps before and after the coarse correction
+        :param coarsest_size: (int) The coarsening stops when a level has this number of free nodes or less
+        '''
+
+        batch = model.element_batch()
+        if batch.nodes_per_element != 2:
+            raise NotImplementedError("Unimplemented method for models with quadratic elements.")
+
+        n = model.n_nodes
+        self.smoothing = smoothing
+
+        # Stiffness of each element K_e = k·[[1, -1], [-1, 1]], integrated with the Gauss points
+        k = sum(w * batch.property("E", chi) * batch.property("A", chi) / (4 * batch._J())
+                for chi, w in zip(batch.gauss_points, batch.gauss_weights))
+
+        # Chains of elements that are merged: the elements of each beam. The rest of the elements are never merged
+        chain = np.arange(batch.n_elements) + len(model.beam_elements)
+        for c, elements in enumerate(model.beam_elements.values()):
+            chain[np.searchsorted(batch.ids, np.asarray(elements, dtype=int))] = c
+
+        n1, n2 = batch.connectivity[:, 0], batch.connectivity[:, 1]
+        x = model.nodes.x[:n]
+        free = np.isnan(model.obtain_displacements_imposed()[:, 0])
+
+        self.levels = [_level(n1, n2, k, x, free, chain)]
+
+        # Infinity norm of the stiffness matrix: the sum of the absolute values of a row is twice the diagonal
+        self.norm = 2 * float(np.max(self.levels[0]["diagonal"], initial=0))
+
+        while np.count_nonzero(self.levels[-1]["free"]) > coarsest_size:
+            coarse = _coarsen(self.levels[-1])
+            if coarse is None:
+                break
+
+            self.levels.append(coarse)
+
+        # The coarsest level is factorized
+        coarsest = self.levels[-1]
+        nodes = np.flatnonzero(coarsest["free"])
+
+        connectivity = np.column_stack([coarsest["n1"], coarsest["n2"]])
+        K_e = coarsest["k"][:, None, None] * np.array([[1, -1], [-1, 1]])
+
+        order, bandwidth = band_order(coarsest["x"], connectivity)
+        K = BandedMatrix(len(coarsest["x"]), bandwidth, order)
+        K.add(np.broadcast_to(connectivity[:, :, None], K_e.shape),
+              np.broadcast_to(connectivity[:, None, :], K_e.shape), K_e)
+
+        self.coarsest_nodes = nodes
+        self.coarsest_factorization = factorize(K.submatrix(nodes)) if len(nodes) else None
+
+    @property
+    def n_levels(self):
+        return len(self.levels)
+
+    def apply(self, v, level=0):
+        '''
+        Product of the stiffness matrix of a level with a vector
+
+        :param v: (np.array) Vector of the nodes of the level
+        :param level: (int) Level, 0 is the mesh of the model
+        :return: (np.array) Product
+        '''
+
+        l = self.levels[level]
+        force = l["k"] * (v[l["n2"]] - v[l["n1"]])
+        n = len(l["x"])
+
+        return np.bincount(l["n2"], weights=force, minlength=n) - np.bincount(l["n1"], weights=force, minlength=n)
+
+    def vcycle(self, r, level=0):
+        '''
+        A V-cycle is applied to a residual, it's an approximation of K^-1·r
+
+        The pre-smoothing and the post-smoothing are done in the opposite order of colors, so the V-cycle is a
+        symmetric operator and it can be used as the preconditioner of the conjugate gradient method.
+
+        :param r: (np.array) Residual of the nodes of the level, zero in the constrained nodes
+        :param level: (int) Level, 0 is the mesh of the model
+        :return: (np.array) Correction, zero in the constrained nodes
+        '''
+
+        l = self.levels[level]
+        u = np.zeros(len(l["x"]))
+
+        if level == self.n_levels - 1:
+            if self.coarsest_factorization is not None:
+                u[self.coarsest_nodes] = self.coarsest_factorization.solve(r[self.coarsest_nodes])
+            return u
+
+        self._smooth(level, u, r, l["colors"] * self.smoothing)
+
+        # Coarse correction of the residual
+        a, b, t, kept, removed = l["prolongation"]
+        residual = r - self.apply(u, level)
+
+        r_coarse = np.zeros(len(self.levels[level + 1]["x"]))
+        r_coarse[kept[1]] = residual[kept[0]]
+        r_coarse += np.bincount(a, weights=(1 - t) * residual[removed], minlength=len(r_coarse))
+        r_coarse += np.bincount(b, weights=t * residual[removed], minlength=len(r_coarse))
+
+        e = self.vcycle(r_coarse * self.levels[level + 1]["free"], level + 1)
+
+        u[kept[0]] += e[kept[1]]
+        u[removed] += (1 - t) * e[a] + t * e[b]
+
+        self._smooth(level, u, r, l["colors"][::-1] * self.smoothing)
+
+        return u
+
+    def _smooth(self, level, u, r, colors):
+        '''
+        Sweeps of the Gauss-Seidel method, each sweep updates the free nodes of one color
+
+        :param level: (int) Level
+        :param u: (np.array) Solution, it's updated
+        :param r: (np.array) Right hand side
+        :param colors: (list) Mask of the nodes updated in each sweep
+        :return: None
+        '''
+
+        diagonal = self.levels[level]["diagonal"]
+
+        for mask in colors:
+            u[mask] += (r - self.apply(u, level))[mask] / diagonal[mask]
+
+    def solve(self, f, u0=None, tolerance=1e-10, maximum_cycles=100):
+        '''
+        The system K·u = f of the free nodes of the model is solved with V-cycles
+
+        :param f: (np.array) Right hand side of the nodes of the model, zero in the constrained nodes
+        :param u0: (np.array) Initial solution, zero in the constrained nodes. Zero by default
+        :param tolerance: (float) Relative tolerance of the norm of the residual. The rounding errors of K·u in a large
+            stiff system can be larger than tolerance·||f||, so the cycles stop when ||r|| <= tolerance·||f|| +
+            eps·||K||·||u||
+        :param maximum_cycles: (int) Maximum number of V-cycles
+        :return: (np.array, int, float) Solution, number of V-cycles and relative norm of the residual
+        '''
+
+        u = np.zeros(len(f)) if u0 is None else np.array(u0, dtype=float)
+        free = self.levels[0]["free"]
+
+        norm_f = np.linalg.norm(f)
+        if norm_f == 0:
+            return np.zeros(len(f)), 0, 0.0
+
+        cycles = 0
+        r = (f - self.apply(u)) * free
+        residual = np.linalg.norm(r) / norm_f
+        eps = np.finfo(float).eps
+
+        while residual * norm_f > tolerance * norm_f + eps * self.norm * np.linalg.norm(u):
+            if cycles == maximum_cycles:
+                raise RuntimeError("The multigrid doesn't converge after {} V-cycles, relative residual {:.3e}"
+                                   .format(cycles, residual))
+
+            u += self.vcycle(r)
+            r = (f - self.apply(u)) * free
+
+            cycles += 1
+            residual = np.linalg.norm(r) / norm_f
+
+        return u, cycles, residual
+
+
+def _level(n1, n2, k, x, free, chain):
+    '''
+    A level of the hierarchy is built from its elements
+
+    :param n1: (np.array) First node of each element (index in the nodes of the level)
+    :param n2: (np.array) Second node of each element
+    :param k: (np.array) Stiffness of each element
+    :param x: (np.array) Coordinates of the nodes of the level
+    :param free: (np.array) Mask of the free nodes of the level
+    :param chain: (np.array) Chain of each element, only the elements of the same chain are merged
+    :return: (dict) Level
+    '''
+
+    n = len(x)
+
+    # The elements are sorted along each chain
+    order = np.lexsort((np.minimum(x[n1], x[n2]), chain))
+    n1, n2, k, chain = n1[order], n2[order], k[order], chain[order]
+
+    diagonal = np.bincount(n1, weights=k, minlength=n) + np.bincount(n2, weights=k, minlength=n)
+
+    # Red-black colors: the nodes of a chain alternate in the order of x. If an element has two nodes of the same
+    # color (the elements overlap), all the nodes are updated at the same time
+    rank = np.empty(n, dtype=int)
+    rank[np.argsort(x, kind="stable")] = np.arange(n)
+    red = rank % 2 == 0
+
+    if np.all(red[n1] != red[n2]):
+        colors = [red & free, ~red & free]
+    else:
+        colors = [free]
+
+    return {"n1": n1, "n2": n2, "k": k, "x": x, "free": free, "chain": chain, "diagonal": diagonal,
+            "colors": colors}
+
+
+def _coarsen(l):
+    '''
+    The next level is built merging the pairs of consecutive elements of each chain
+
+    The node in the middle of a pair is removed if it's free and it only belongs to the two elements. The stiffness
+    of the merged element is the Galerkin product of the pair with the linear interpolation in x.
+
+    :param l: (dict) Level, the prolongation to the new level is added to it
+    :return: (dict) New level, None if no element can be merged
+    '''
+
+    n1, n2, k, x, chain = l["n1"], l["n2"], l["k"], l["x"], l["chain"]
+    n = len(x)
+
+    # Position of each element in its chain
+    starts = np.r_[True, chain[1:] != chain[:-1]]
+    position = np.arange(len(chain)) - np.maximum.accumulate(np.where(starts, np.arange(len(chain)), 0))
+
+    degree = np.bincount(n1, minlength=n) + np.bincount(n2, minlength=n)
+
+    # The first element of each pair, the second one is the next element
+    first = np.flatnonzero((position[:-1] % 2 == 0) & (chain[:-1] == chain[1:]))
+    shared = np.where(n2[first] == n1[first + 1], n2[first], np.where(n1[first] == n2[first + 1], n1[first], -1))
+    valid = (shared >= 0)
+    valid[valid] &= l["free"][shared[valid]] & (degree[shared[valid]] == 2)
+    first, middle = first[valid], shared[valid]
+
+    if len(first) == 0:
+        return None
+
+    # Ends of the merged elements
+    a = np.where(n1[first] == middle, n2[first], n1[first])
+    b = np.where(n1[first + 1] == middle, n2[first + 1], n1[first + 1])
+    t = (x[middle] - x[a]) / (x[b] - x[a])
+
+    # The node in the middle is interpolated: u_m = (1 - t)·u_a + t·u_b
+    k_merged = k[first] * t ** 2 + k[first + 1] * (1 - t) ** 2
+
+    merged = np.zeros(len(k), dtype=bool)
+    merged[first] = merged[first + 1] = True
+
+    # Numbering of the nodes of the new level
+    kept = np.ones(n, dtype=bool)
+    kept[middle] = False
+    index = np.cumsum(kept) - 1
+
+    n1_coarse = index[np.r_[n1[~merged], a]]
+    n2_coarse = index[np.r_[n2[~merged], b]]
+    k_coarse = np.r_[k[~merged], k_merged]
+    chain_coarse = np.r_[chain[~merged], chain[first]]
+
+    kept_nodes = np.flatnonzero(kept)
+    l["prolongation"] = (index[a], index[b], t, (kept_nodes, index[kept_nodes]), middle)
+
+    return _level(n1_coarse, n2_coarse, k_coarse, x[kept], l["free"][kept], chain_coarse)
+
+
+def solve_multigrid(model, f, tolerance=1e-10, maximum_cycles=100, smoothing=2, x0=None):
+    '''
+    The model is solved with multigrid V-cycles, without assembling the global stiffness matrix
+
+    :param model: (Model) Meshed model of linear elements
+    :param f: (np.array) Global load vectors (n_nodes, n_cases)
+    :param tolerance: (float) Relative tolerance of the residual
+    :param maximum_cycles: (int) Maximum number of V-cycles of each load vector
+    :param smoothing: (int) Number of red-black sweeps before and after the coarse correction
+    :param x0: (np.array) Initial displacements (n_nodes, n_cases). None to start from the imposed displacements
+    :return: (np.array, np.array, list, list) Displacements and reactions (n_nodes, n_cases), number of V-cycles
+        and relative residual of each load vector
+    '''
+
+    n = model.n_nodes
+    multigrid = Multigrid(model, smoothing)
+
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+    is_constrained = ~np.isnan(displacements_imposed)
+    u_c = np.where(is_constrained, displacements_imposed, 0)
+
+    f = np.asarray(f, dtype=float).reshape((n, -1))
+    f_c = multigrid.apply(u_c)
+
+    delta = np.repeat(u_c[:, None], f.shape[1], axis=1)
+    reactions = np.zeros_like(f)
+    cycles = []
+    residuals = []
+
+    for j in range(f.shape[1]):
+        start = None if x0 is None else np.where(is_constrained, 0, np.asarray(x0, dtype=float).reshape((n, -1))[:, j])
+
+        u, count, residual = multigrid.solve(np.where(is_constrained, 0, f[:, j] - f_c), start, tolerance,
+                                             maximum_cycles)
+        delta[~is_constrained, j] = u[~is_constrained]
+        cycles.append(count)
+        residuals.append(residual)
+
+        reactions[is_constrained, j] = multigrid.apply(delta[:, j])[is_constrained] - f[is_constrained, j]
+
+    return delta, reactions, cycles, residuals
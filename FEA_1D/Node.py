@@ -1,10 +1,13 @@
 import numpy as np
+from collections.abc import Mapping
 
 class Node:
     '''
     Class that defines a node in a 1D finite element problem
     '''
 
+    __slots__ = ("x", "id_global", "F", "u")
+
     def __init__(self, x, id, F=None, u=None):
         '''
         Constructor of the class Node
@@ -34,3 +37,172 @@ class Node:
         new_instance = type(self)(self.x, self.id_global, self.F, self.u)
         return new_instance
 
+
+class NodeArrays(Mapping):
+    '''
+    Nodes of a model stored as a structure of arrays
+
+    The coordinates, forces and imposed displacements of all the nodes are stored in contiguous arrays (a force
+    or a displacement that is not defined is stored as NaN). It behaves as the dictionary {id: node} used before,
+    but the nodes are NodeView objects created when they are accessed, so there isn't a Python object per node.
+    '''
+
+    def __init__(self, capacity=16):
+        '''
+        Constructor of the class NodeArrays
+
+        :param capacity: (int) Initial number of nodes that can be stored without allocating memory
+        '''
+
+        self.n = 0
+        self.x = np.zeros(capacity)
+        self.F = np.full(capacity, np.nan)
+        self.u = np.full(capacity, np.nan)
+
+        # Function called with the parts of the model changed ("loads" or "supports") when a node is modified
+        # through a NodeView. The model that owns the arrays sets it
+        self.on_change = None
+
+    def add(self, x, F=None, u=None):
+        '''
+        A node is added
+
+        :param x: (float) Coordinate of the node
+        :param F: (float) Force in the node. It is None by default
+        :param u: (float) displacement in the node. It is None by default
+        :return: (NodeView) Node added
+        '''
+
+        return self[self.extend([x], [F], [u])[0]]
+
+    def extend(self, x, F=None, u=None):
+        '''
+        Several nodes are added at once
+
+        :param x: (np.array) Coordinates of the nodes
+        :param F: (np.array) Forces in the nodes, None or NaN if there isn't force
+        :param u: (np.array) Displacements of the nodes, None or NaN if the node is free
+        :return: (np.array) Global id of the nodes added
+        '''
+
+        x = np.asarray(x, dtype=float).reshape(-1)
+        n_new = len(x)
+
+        # The capacity of the arrays is doubled when they are full, so adding a node is O(1) on average
+        if self.n + n_new > len(self.x):
+            capacity = max(2 * len(self.x), self.n + n_new)
+            for name, value in (("x", 0), ("F", np.nan), ("u", np.nan)):
+                array = np.full(capacity, value, dtype=float)
+                array[:self.n] = getattr(self, name)[:self.n]
+                setattr(self, name, array)
+
+        ids = np.arange(self.n, self.n + n_new)
+        self.x[ids] = x
+        self.F[ids] = _to_array(F, n_new)
+        self.u[ids] = _to_array(u, n_new)
+
+        self.n += n_new
+        return ids
+
+    def notify(self, *parts):
+        '''
+        The owner of the arrays is notified of a change of the nodes
+
+        :param parts: (str) Parts of the model changed: "loads" or "supports"
+        :return: None
+        '''
+
+        if self.on_change is not None:
+            self.on_change(*parts)
+
+    def __getitem__(self, id):
+        if not 0 <= id < self.n:
+            raise KeyError(id)
+
+        return NodeView(self, int(id))
+
+    def __iter__(self):
+        return iter(range(self.n))
+
+    def __len__(self):
+        return self.n
+
+
+class NodeView:
+    '''
+    Node of a NodeArrays. It has the same attributes as Node, but the values are read and written in the arrays
+
+    The changes of the force or the displacement are notified to the model that owns the arrays.
+    '''
+
+    __slots__ = ("_arrays", "id_global")
+
+    def __init__(self, arrays, id):
+        '''
+        Constructor of the class NodeView
+
+        :param arrays: (NodeArrays) Arrays where the node is stored
+        :param id: (int) Identifier of the node
+        '''
+
+        self._arrays = arrays
+        self.id_global = id
+
+    @property
+    def x(self):
+        return self._arrays.x[self.id_global].item()
+
+    @property
+    def F(self):
+        return _to_value(self._arrays.F[self.id_global])
+
+    @F.setter
+    def F(self, F):
+        self._arrays.F[self.id_global] = np.nan if F is None else F
+        self._arrays.notify("loads")
+
+    @property
+    def u(self):
+        return _to_value(self._arrays.u[self.id_global])
+
+    @u.setter
+    def u(self, u):
+        # The set of free nodes changes only if the node is released or constrained
+        released = (u is None) != (self.u is None)
+
+        self._arrays.u[self.id_global] = np.nan if u is None else u
+        self._arrays.notify("supports" if released else "loads")
+
+    # Especial method to compare a node with a coordinate to now if the node is already created
+    def __eq__(self, other):
+        return self.x == other
+
+    def __copy__(self):
+        return Node(self.x, self.id_global, self.F, self.u)
+
+
+def _to_array(values, n):
+    '''
+    Values that can be None are converted to an array, None is stored as NaN
+
+    :param values: (list or np.array) Values or None
+    :param n: (int) Number of values
+    :return: (np.array) Values
+    '''
+
+    if values is None:
+        return np.full(n, np.nan)
+
+    return np.array([np.nan if v is None else v for v in values], dtype=float) \
+        if isinstance(values, (list, tuple)) else np.asarray(values, dtype=float)
+
+
+def _to_value(value):
+    '''
+    A value stored in an array is converted to the value of the node, NaN is None
+
+    :param value: (float) Stored value
+    :return: (float) Value or None
+    '''
+
+    return None if np.isnan(value) else value.item()
@@ -0,0 +1,218 @@
+import numpy as np
+from enum import Enum
+
+from FEA_1D.Solver import BandedMatrix, Storage, band_order, factorize
+
+
+class NonlinearMethod(Enum):
+    '''
+    Iterative method of the elasto-plastic solve
+        - NEWTON: the tangent stiffness is assembled and factorized in every iteration (quadratic convergence)
+        - MODIFIED_NEWTON: the factorized tangent is reused in the next iterations and increments, it's only
+          computed again when the residual decreases slowly
+    '''
+
+    NEWTON = 1
+    MODIFIED_NEWTON = 2
+
+
+def solve_plastic(model, increments=10, method=NonlinearMethod.NEWTON, tolerance=1e-8, maximum_iterations=20,
+                  minimum_increment=1e-6):
+    '''
+    The model is solved with an elasto-plastic material law and incremental loading
+
+    The materials with a yield stress (Material.sigma_y) follow a bilinear law with linear isotropic hardening
+    (Material.H), the rest are elastic. The state of the material (plastic strain and accumulated plastic strain)
+    is kept in each Gauss point of each element.
+
+    The loads and the imposed displacements of the model are applied proportionally with a load factor from 0 to
+    1. Each increment is solved with Newton-Raphson iterations. The increment is halved when the iterations don't
+    converge and it grows when they converge quickly.
+
+    :param model: (Model) Meshed model
+    :param increments: (int) Number of increments of the first try, the first load factor is 1 / increments
+    :param method: (NonlinearMethod) Iterative method
+    :param tolerance: (float) Relative tolerance of the norm of the residual forces
+    :param maximum_iterations: (int) Maximum number of iterations of an increment
+    :param minimum_increment: (float) Minimum increment of the load factor, smaller increments raise an error
+    :return: (dict) Solution:
+        - "delta": (np.array) Displacements of the nodes (n_nodes,)
+        - "reactions": (np.array) Reactions, zero in the free nodes (n_nodes,)
+        - "plastic_strain", "alpha", "sigma": (np.array) State in the Gauss points (n_elements, n_gauss)
+        - "load_factors": (list) Load factor at the end of each increment
+        - "iterations": (int) Total number of iterations
+        - "factorizations": (int) Number of factorizations of the tangent stiffness
+    '''
+
+    batch = model.element_batch()
+    n = model.n_nodes
+
+    # External loads and imposed displacements of the full load (load factor 1)
+    model.Assemble_f_G()
+    f_G = model.f_G[:, 0]
+
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+    is_constrained = ~np.isnan(displacements_imposed)
+    free = np.flatnonzero(~is_constrained)
+    constrained = np.flatnonzero(is_constrained)
+    u_c = displacements_imposed[constrained]
+
+    # Values in the Gauss points (n_gauss, n_elements)
+    chis = batch.gauss_points
+    B = [batch._B(chi) for chi in chis]
+    E = np.array([batch.property("E", chi) for chi in chis])
+    volume = np.array([w * batch._J() * batch.property("A", chi) for chi, w in zip(chis, batch.gauss_weights)])
+    sigma_y, H = _plastic_properties(model, batch)
+
+    if model.storage == Storage.BANDED:
+        order, bandwidth = band_order(model.nodes.x[:n], batch.connectivity)
+
+    def strains(u):
+        delta_element = u[batch.connectivity]
+        return np.array([np.sum(B_g * delta_element, axis=-1) for B_g in B])
+
+    def internal_forces(sigma):
+        f_e = sum((volume[g] * sigma[g])[:, None] * B[g] for g in range(len(chis)))
+        return np.bincount(batch.connectivity.ravel(), f_e.ravel(), n)
+
+    def tangent(E_t):
+        K_e = sum((volume[g] * E_t[g])[:, None, None] * B[g][:, :, None] * B[g][:, None, :] for g in range(len(chis)))
+
+        if model.storage == Storage.BANDED:
+            K = BandedMatrix(n, bandwidth, order)
+            batch.scatter_K(K, K_e)
+            return K.submatrix(free)
+
+        K = np.zeros((n, n))
+        batch.scatter_K(K, K_e)
+        return K[np.ix_(free, free)]
+
+    # Converged state
+    u = np.zeros(n)
+    plastic_strain = np.zeros(E.shape)
+    alpha = np.zeros(E.shape)
+
+    # Factorized tangent stiffness, it is kept between increments with the modified Newton method
+    factorization = None
+
+    load_factor = 0.0
+    step = 1 / increments
+    load_factors = []
+    total_iterations = 0
+    factorizations = 0
+
+    while load_factor < 1 - 1e-12:
+        step = min(step, 1 - load_factor)
+        target = load_factor + step
+
+        f_ext = target * f_G
+        u_try = u.copy()
+        u_try[constrained] = target * u_c
+
+        converged = False
+        previous_norm = np.inf
+
+        for iteration in range(maximum_iterations):
+            sigma, E_t, plastic_strain_try, alpha_try = _return_mapping(strains(u_try), plastic_strain, alpha, E,
+                                                                        sigma_y, H)
+
+            f_int = internal_forces(sigma)
+            residual = (f_ext - f_int)[free]
+
+            norm = np.linalg.norm(residual)
+            reference = max(np.linalg.norm(f_ext[free]), np.linalg.norm(f_int), 1e-300)
+            if norm <= tolerance * reference:
+                converged = True
+                break
+
+            # The modified Newton method computes the tangent again if the residual is not halved
+            if factorization is None or method == NonlinearMethod.NEWTON or norm > 0.5 * previous_norm:
+                # A singular tangent (perfect plasticity in a whole section) is treated as a failed increment
+                try:
+                    factorization = factorize(tangent(E_t))
+                except np.linalg.LinAlgError:
+                    break
+
+                factorizations += 1
+
+            u_try[free] += factorization.solve(residual)
+            total_iterations += 1
+            previous_norm = norm
+
+        if converged:
+            u = u_try
+            plastic_strain, alpha = plastic_strain_try, alpha_try
+            load_factor = target
+            load_factors.append(load_factor)
+
+            # The increment grows if the iterations converge quickly
+            if iteration <= maximum_iterations // 4:
+                step *= 1.5
+
+        else:
+            # The increment is repeated from the converged state with half the load
+            step /= 2
+            factorization = None
+            if step < minimum_increment:
+                raise RuntimeError("The elasto-plastic solve doesn't converge after the load factor {}"
+                                   .format(load_factor))
+
+    reactions = np.zeros(n)
+    reactions[constrained] = (f_int - f_ext)[constrained]
+
+    return {"delta": u,
+            "reactions": reactions,
+            "plastic_strain": plastic_strain.T,
+            "alpha": alpha.T,
+            "sigma": sigma.T,
+            "load_factors": load_factors,
+            "iterations": total_iterations,
+            "factorizations": factorizations}
+
+
+def _return_mapping(epsilon, plastic_strain, alpha, E, sigma_y, H):
+    '''
+    Stress and tangent modulus of the bilinear law with linear isotropic hardening (return mapping in 1D)
+
+    :param epsilon: (np.array) Total strain in the Gauss points
+    :param plastic_strain: (np.array) Plastic strain of the converged state
+    :param alpha: (np.array) Accumulated plastic strain of the converged state
+    :param E: (np.array) Young's modulus
+    :param sigma_y: (np.array) Yield stress, infinite for elastic materials
+    :param H: (np.array) Hardening modulus
+    :return: (tuple) Stress, tangent modulus, plastic strain and accumulated plastic strain
+    '''
+
+    sigma_trial = E * (epsilon - plastic_strain)
+    f_trial = np.abs(sigma_trial) - (sigma_y + H * alpha)
+
+    plastic = f_trial > 0
+    gamma = np.where(plastic, f_trial, 0) / (E + H)
+    sign = np.sign(sigma_trial)
+
+    sigma = sigma_trial - E * gamma * sign
+    E_t = np.where(plastic, E * H / (E + H), E)
+
+    return sigma, E_t, plastic_strain + gamma * sign, alpha + gamma
+
+
+def _plastic_properties(model, batch):
+    '''
+    Yield stress and hardening modulus of each element, from the material of its beam
+
+    :param model: (Model) Meshed model
+    :param batch: (element_1D_batch) Batch of the elements
+    :return: (np.array, np.array) Yield stress (infinite if the element is elastic) and hardening modulus
+    '''
+
+    sigma_y = np.full(batch.n_elements, np.inf)
+    H = np.zeros(batch.n_elements)
+
+    for id, elements in model.beam_elements.items():
+        material = model.beams[id].material
+        if material.sigma_y is not None:
+            i = np.searchsorted(batch.ids, elements)
+            sigma_y[i] = material.sigma_y
+            H[i] = material.H
+
+    return sigma_y, H
@@ -0,0 +1,163 @@
+import functools
+import time
+import tracemalloc
+
+
+class Profiler:
+    '''
+    Instrumentation of the phases of a model: mesh, assembly, boundary conditions, factorization, solution and
+    queries of the fields
+
+    For each phase the number of calls, the wall time and, optionally, the memory allocated are accumulated. The
+    phases can be nested (Solve calls Assemble_K_G...), so the time is given including the nested phases ("time")
+    and without them ("self_time").
+
+    The profiler is attached to a model with Model.enable_profiling. When it's not attached, the methods of the
+    model are not wrapped, so there isn't any overhead.
+    '''
+
+    def __init__(self, memory=False, observers=None):
+        '''
+        Constructor of the class Profiler
+
+        :param memory: (bool) If True, the memory allocated in each phase is measured with tracemalloc. It slows
+            down the code, mainly the loops in Python
+        :param observers: (list) Functions called after each call of a phase with the arguments (phase, record),
+            where record is a dictionary with the "time", "self_time", "allocated" and "peak" of the call
+        '''
+
+        self.memory = memory
+        self.observers = list(observers or [])
+
+        # Accumulated values of each phase {phase: {"calls", "time", "self_time", "allocated", "peak"}}
+        self.records = {}
+
+        # Calls in progress, each one is [start time, time of the nested phases, memory at the start, peak]
+        self._stack = []
+        self._started_tracing = False
+
+    def add_observer(self, observer):
+        '''
+        A function is called after each call of a phase
+
+        :param observer: (function) Function with the arguments (phase, record)
+        :return: None
+        '''
+
+        self.observers.append(observer)
+
+    def start(self):
+        '''
+        The measure of the memory is started if it's needed
+
+        :return: None
+        '''
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        '''
+        The measure of the memory is stopped if it was started by the profiler
+
+        :return: None
+        '''
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        '''
+        The accumulated values of all the phases are removed
+
+        :return: None
+        '''
+
+        self.records = {}
+
+    def wrap(self, phase, method):
+        '''
+        A method is wrapped to measure its calls as a phase
+
+        :param phase: (str) Name of the phase
+        :param method: (function) Bound method
+        :return: (function) Wrapped method
+        '''
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            self._enter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._exit(phase)
+
+        return wrapper
+
+    def _enter(self):
+        memory = 0
+        if self.memory and tracemalloc.is_tracing():
+            memory, peak = tracemalloc.get_traced_memory()
+
+            # The peak until now belongs to the phase that contains this one
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], peak)
+
+            tracemalloc.reset_peak()
+
+        self._stack.append([time.perf_counter(), 0.0, memory, memory])
+
+    def _exit(self, phase):
+        end = time.perf_counter()
+        start, nested, memory_start, peak = self._stack.pop()
+
+        record = {"time": end - start, "self_time": end - start - nested, "allocated": 0, "peak": 0}
+
+        if self.memory and tracemalloc.is_tracing():
+            memory, peak_traced = tracemalloc.get_traced_memory()
+            peak = max(peak, peak_traced)
+
+            # Net memory allocated by the phase and maximum memory above the memory at the start
+            record["allocated"] = memory - memory_start
+            record["peak"] = peak - memory_start
+
+        if self._stack:
+            self._stack[-1][1] += record["time"]
+            self._stack[-1][3] = max(self._stack[-1][3], peak)
+
+        total = self.records.setdefault(phase, {"calls": 0, "time": 0.0, "self_time": 0.0, "allocated": 0,
+                                                "peak": 0})
+        total["calls"] += 1
+        total["time"] += record["time"]
+        total["self_time"] += record["self_time"]
+        total["allocated"] += record["allocated"]
+        total["peak"] = max(total["peak"], record["peak"])
+
+        for observer in self.observers:
+            observer(phase, record)
+
+    def report(self):
+        '''
+        Report of the phases measured
+
+        :return: (dict) Accumulated values of each phase {phase: {"calls", "time", "self_time", "allocated", "peak"}}
+            Times in seconds and memory in bytes
+        '''
+
+        return {phase: dict(record) for phase, record in self.records.items()}
+
+    def info(self):
+        '''
+        The report is printed as a table
+
+        :return: None
+        '''
+
+        print("\t{:<22}{:>8}{:>14}{:>14}{:>16}{:>16}".format("Phase", "Calls", "Time [s]", "Self [s]",
+                                                             "Allocated [B]", "Peak [B]"))
+        for phase, record in self.records.items():
+            print("\t{:<22}{:>8}{:>14.6f}{:>14.6f}{:>16}{:>16}".format(phase, record["calls"], record["time"],
+                                                                       record["self_time"], record["allocated"],
+                                                                       record["peak"]))
@@ -0,0 +1,81 @@
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+# Arrays shared by the processes of the pool {name: np.array}
+shared = {}
+
+# Blocks of shared memory opened by a worker, they must be kept alive while the arrays are used
+_blocks = []
+
+
+def map_shared(function, chunks, arrays, processes):
+    '''
+    A function is applied to each chunk in a pool of processes that read the arrays from shared memory
+
+    The arrays are stored only once in shared memory and all the processes read them without copying through
+    the dictionary shared. With one process (or one chunk) the function is applied in the current process.
+
+    :param function: (function) Function of a chunk, it reads the arrays from shared
+    :param chunks: (list) Tasks of the pool
+    :param arrays: (dict) Read-only arrays {name: np.array}
+    :param processes: (int) Number of processes
+    :return: (list) Result of each chunk, in the order of the chunks
+    '''
+
+    if processes == 1 or len(chunks) <= 1:
+        shared.update(arrays)
+        try:
+            return [function(chunk) for chunk in chunks]
+        finally:
+            shared.clear()
+
+    blocks, specs = share(arrays)
+    try:
+        with Pool(processes, initializer=attach, initargs=(specs,)) as pool:
+            # imap keeps the order of the chunks
+            return list(pool.imap(function, chunks))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def share(arrays):
+    '''
+    The arrays are copied to blocks of shared memory
+
+    :param arrays: (dict) Arrays {name: np.array}
+    :return: (list, dict) Blocks of shared memory and description of the arrays {name: (block, shape, dtype)}
+    '''
+
+    blocks = []
+    specs = {}
+
+    for name, array in arrays.items():
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+
+    return blocks, specs
+
+
+def attach(specs):
+    '''
+    Initializer of the processes of the pool, the arrays in shared memory are opened without copying them
+
+    :param specs: (dict) Description of the arrays {name: (block, shape, dtype)}
+    :return: None
+    '''
+
+    for name, (block_name, shape, dtype) in specs.items():
+        block = SharedMemory(name=block_name)
+        _blocks.append(block)
+
+        array = np.ndarray(shape, dtype, buffer=block.buf)
+        array.flags.writeable = False
+        shared[name] = array
@@ -0,0 +1,559 @@
+import numpy as np
+from enum import Enum
+
+
+
+class Storage(Enum):
+    '''
+    Type of storage of the global stiffness matrix
+    '''
+
+    DENSE = 1
+    BANDED = 2
+
+
+class Precision(Enum):
+    '''
+    Precision of the factorization of the stiffness matrix
+        - DOUBLE: float64
+        - MIXED: the factors are stored in float32 (half of the memory of the factorization) and the systems are
+          solved in float32. The solution is corrected with iterative refinement with float64 residuals until it
+          has double precision accuracy
+    '''
+
+    DOUBLE = 1
+    MIXED = 2
+
+
+class BandedMatrix:
+    '''
+    Symmetric banded matrix of a 1D finite element problem
+
+    Only the diagonal and the lower diagonals are stored, so the memory is O(n * bandwidth) instead of O(n^2).
+
+    The rows are stored following the order given by the user (normally the nodes sorted by their coordinate),
+    because a chain of 1D elements only gives a narrow band when the nodes are numbered along the bar. The
+    matrix is always accessed with the original indices (the global id of the nodes), the permutation is internal.
+    '''
+
+    # The products with numpy scalars use the methods of this class
+    __array_ufunc__ = None
+
+    def __init__(self, n, bandwidth, order=None):
+        '''
+        Constructor of the class BandedMatrix
+
+        :param n: (int) Number of rows of the matrix
+        :param bandwidth: (int) Number of diagonals under the main diagonal
+        :param order: (np.array) Original index stored in each row of the band. Identity by default
+        '''
+
+        self.n = n
+        self.bandwidth = bandwidth
+
+        # bands[k, r] is the value of the row r + k and the column r (in the order of the band)
+        self.bands = np.zeros((bandwidth + 1, n))
+
+        # The permutation between the original indices and the rows of the band
+        if order is None:
+            order = np.arange(n)
+
+        self.order = np.asarray(order, dtype=int)
+        self.rank = np.empty(n, dtype=int)
+        self.rank[self.order] = np.arange(n)
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    def copy(self):
+        '''
+        Copy of the matrix
+
+        :return: (BandedMatrix) Copy
+        '''
+
+        new_matrix = BandedMatrix(self.n, self.bandwidth, self.order)
+        new_matrix.bands = self.bands.copy()
+        return new_matrix
+
+    def add(self, rows, cols, values):
+        '''
+        Values are added to the matrix. As the matrix is symmetric, only the terms with row >= col (in the
+        order of the band) are stored, the symmetric terms are ignored.
+
+        :param rows: (np.array) Original indices of the rows
+        :param cols: (np.array) Original indices of the columns
+        :param values: (np.array) Values to add
+        :return: None
+        '''
+
+        r = self.rank[np.asarray(rows, dtype=int)].ravel()
+        c = self.rank[np.asarray(cols, dtype=int)].ravel()
+        values = np.broadcast_to(values, np.shape(rows)).ravel()
+
+        k = r - c
+        if np.any(np.abs(k) > self.bandwidth):
+            raise ValueError("The term is outside of the band of the matrix")
+
+        lower = k >= 0
+        np.add.at(self.bands, (k[lower], c[lower]), values[lower])
+
+    def __add__(self, other):
+        '''
+        Sum of two banded matrices with the same order of the rows
+
+        :param other: (BandedMatrix) Matrix
+        :return: (BandedMatrix) Sum
+        '''
+
+        if not isinstance(other, BandedMatrix):
+            return NotImplemented
+
+        if other.n != self.n or not np.array_equal(other.order, self.order):
+            raise ValueError("The matrices must have the same size and order of the rows")
+
+        bandwidth = max(self.bandwidth, other.bandwidth)
+        new_matrix = BandedMatrix(self.n, bandwidth, self.order)
+        new_matrix.bands[:self.bandwidth + 1] += self.bands
+        new_matrix.bands[:other.bandwidth + 1] += other.bands
+        return new_matrix
+
+    def __mul__(self, scalar):
+        '''
+        Product of the matrix with a scalar
+
+        :param scalar: (float) Scalar
+        :return: (BandedMatrix) Product
+        '''
+
+        if not np.isscalar(scalar):
+            return NotImplemented
+
+        new_matrix = BandedMatrix(self.n, self.bandwidth, self.order)
+        new_matrix.bands = self.bands * scalar
+        return new_matrix
+
+    __rmul__ = __mul__
+
+    def __sub__(self, other):
+        if not isinstance(other, BandedMatrix):
+            return NotImplemented
+
+        return self + (-1) * other
+
+    def diagonal(self):
+        '''
+        Diagonal of the matrix in the original order
+
+        :return: (np.array) Diagonal
+        '''
+
+        return self.bands[0, self.rank]
+
+    def norm(self):
+        '''
+        Infinity norm of the matrix (maximum sum of the absolute values of a row)
+
+        :return: (float) Norm
+        '''
+
+        rows = np.abs(self.bands[0])
+        for k in range(1, self.bandwidth + 1):
+            band = np.abs(self.bands[k, :self.n - k])
+            rows[k:] += band
+            rows[:self.n - k] += band
+
+        return float(np.max(rows, initial=0))
+
+    def submatrix(self, indices):
+        '''
+        Square block of the matrix with the rows and columns of the indices
+
+        Removing rows and columns of a banded matrix does not increase its bandwidth, so the block is also banded.
+
+        :param indices: (np.array) Original indices of the rows and columns of the block
+        :return: (BandedMatrix) Block, the index i of the block is indices[i] in this matrix
+        '''
+
+        indices = np.asarray(indices, dtype=int)
+
+        # Rows of the band that are kept and their position in the new band
+        selected = np.zeros(self.n, dtype=bool)
+        selected[self.rank[indices]] = True
+        position = np.cumsum(selected) - 1
+
+        # The new band keeps the order of this band
+        new_rank = position[self.rank[indices]]
+        new_order = np.empty(len(indices), dtype=int)
+        new_order[new_rank] = np.arange(len(indices))
+
+        block = BandedMatrix(len(indices), self.bandwidth, new_order)
+
+        for k in range(self.bandwidth + 1):
+            c = np.flatnonzero(selected[:self.n - k] & selected[k:])
+            np.add.at(block.bands, (position[c + k] - position[c], position[c]), self.bands[k, c])
+
+        return block
+
+    def __matmul__(self, v):
+        '''
+        Product of the matrix with a vector or a matrix with n rows
+
+        :param v: (np.array) Vector (n,) or matrix (n, m) in the original order
+        :return: (np.array) Product in the original order
+        '''
+
+        v = np.asarray(v)
+        v_band = v[self.order]
+        result = self.bands[0].reshape((-1,) + (1,) * (v.ndim - 1)) * v_band
+
+        for k in range(1, self.bandwidth + 1):
+            band = self.bands[k, :self.n - k].reshape((-1,) + (1,) * (v.ndim - 1))
+
+            # Lower diagonal and upper diagonal (symmetric)
+            result[k:] += band * v_band[:self.n - k]
+            result[:self.n - k] += band * v_band[k:]
+
+        product = np.empty_like(result)
+        product[self.order] = result
+        return product
+
+    def toarray(self):
+        '''
+        Dense version of the matrix in the original order. Only for debugging small models
+
+        :return: (np.array) Dense matrix
+        '''
+
+        K = np.zeros((self.n, self.n))
+        for k in range(self.bandwidth + 1):
+            r = np.arange(k, self.n)
+            K[self.order[r], self.order[r - k]] = self.bands[k, :self.n - k]
+            K[self.order[r - k], self.order[r]] = self.bands[k, :self.n - k]
+
+        return K
+
+
+class BandedLDL:
+    '''
+    Factorization K = L·D·L^T of a symmetric banded matrix
+
+    The factorization does not need pivoting because the stiffness matrix with the boundary conditions imposed
+    is positive definite. The cost is O(n * bandwidth^2), linear in the number of nodes.
+    '''
+
+    def __init__(self, K, dtype=float):
+        '''
+        Constructor of the class BandedLDL. The matrix is factorized
+
+        :param K: (BandedMatrix) Matrix to factorize
+        :param dtype: (np.dtype) Type of the stored factors. They are always computed in float64
+        '''
+
+        self.n = K.n
+        self.bandwidth = K.bandwidth
+        self.order = K.order
+
+        n = self.n
+        p = self.bandwidth
+
+        # The factors are written straight into their storage, memoryviews have the scalar access of the lists
+        self.L = np.zeros((p + 1, n), dtype=dtype)
+        self.D = np.zeros(n, dtype=dtype)
+        L = [memoryview(row) for row in self.L]
+        D = memoryview(self.D)
+
+        # A column only needs the p previous ones, so they are kept in float64 in a ring of p + 1 columns. In this
+        # way the factors in float32 are the rounded factors in float64 and not the accumulation of the rounding
+        # errors of each column, which destroys the small pivots of the long chains of elements
+        w = p + 1
+        bands = K.bands.tolist()
+        L_w = [[0.0] * w for k in range(p + 1)]
+        D_w = [0.0] * w
+
+        for j in range(n):
+            c = j % w
+
+            # Diagonal term
+            d = bands[0][j]
+            for k in range(1, min(p, j) + 1):
+                l = L_w[k][(j - k) % w]
+                d -= l * l * D_w[(j - k) % w]
+
+            if d == 0:
+                raise np.linalg.LinAlgError("Singular matrix, check the boundary conditions of the model")
+
+            D_w[c] = D[j] = d
+
+            # Terms of the column j under the diagonal
+            for k in range(1, min(p, n - 1 - j) + 1):
+                i = j + k
+                s = bands[k][j]
+                for m in range(max(i - p, 0), j):
+                    m_w = m % w
+                    s -= L_w[i - m][m_w] * L_w[j - m][m_w] * D_w[m_w]
+
+                L_w[k][c] = L[k][j] = s / d
+
+    def solve(self, b):
+        '''
+        The system K·x = b is solved with the factorization
+
+        :param b: (np.array) Right hand side (n,) or (n, m) in the original order
+        :return: (np.array) Solution in the original order, in the precision of the factors
+        '''
+
+        # The substitutions are done in the precision of the factors
+        y = np.asarray(b)[self.order].astype(self.D.dtype)
+
+        n = self.n
+        p = self.bandwidth
+
+        if y.ndim == 1:
+            y = self._substitute(y)
+
+        elif y.ndim == 2 and y.shape[1] <= 4:
+            # The substitution of several right hand sides loops over the rows with numpy operations, it's only
+            # faster than solving the columns one by one with Python lists from about 4 columns
+            for j in range(y.shape[1]):
+                y[:, j] = self._substitute(y[:, j])
+
+        else:
+            # Several right hand sides are solved at the same time
+            for i in range(n):
+                for k in range(1, min(p, i) + 1):
+                    y[i] -= self.L[k, i - k] * y[i - k]
+
+            y /= self.D.reshape((-1,) + (1,) * (y.ndim - 1))
+
+            for i in range(n - 1, -1, -1):
+                for k in range(1, min(p, n - 1 - i) + 1):
+                    y[i] -= self.L[k, i] * y[i + k]
+
+        x = np.empty_like(y)
+        x[self.order] = y
+        return x
+
+    def _substitute(self, y):
+        '''
+        The forward substitution, the diagonal and the backward substitution of a right hand side
+
+        :param y: (np.array) Right hand side in the order of the band (n,), in the precision of the factors
+        :return: (np.array) Solution in the order of the band
+        '''
+
+        n = self.n
+        p = self.bandwidth
+
+        # Python lists are much faster than numpy arrays for scalar operations. In low precision the terms are
+        # read and written in memoryviews of the arrays, so each one is rounded when it's stored
+        if self.D.dtype == np.float64:
+            L = self.L.tolist()
+            D = self.D.tolist()
+            z = y.tolist()
+        else:
+            L = [memoryview(row) for row in self.L]
+            D = memoryview(self.D)
+            y = np.ascontiguousarray(y)
+            z = memoryview(y)
+
+        # Forward substitution L·z = b
+        for i in range(n):
+            s = z[i]
+            for k in range(1, min(p, i) + 1):
+                s -= L[k][i - k] * z[i - k]
+            z[i] = s
+
+        # Diagonal D·w = z
+        for i in range(n):
+            z[i] /= D[i]
+
+        # Backward substitution L^T·x = w
+        for i in range(n - 1, -1, -1):
+            s = z[i]
+            for k in range(1, min(p, n - 1 - i) + 1):
+                s -= L[k][i] * z[i + k]
+            z[i] = s
+
+        return np.array(z) if isinstance(z, list) else y
+
+
+def solve_banded_batch(bands, b):
+    '''
+    Several symmetric banded systems of the same size and bandwidth are solved at the same time
+
+    The factorization L·D·L^T is done row by row as in BandedLDL, but each operation is vectorized across the
+    systems, so the cost of the Python loop is paid once for all of them. With bandwidth 1 (chain of linear
+    elements) it is the tridiagonal algorithm of Thomas.
+
+    :param bands: (np.array) Bands of the matrices in the order of the band (bandwidth + 1, n, n_systems),
+        bands[k, r, s] is the value of the row r + k and the column r of the system s. It is overwritten
+    :param b: (np.array) Right hand sides in the order of the band (n, n_systems). It is overwritten
+    :return: (np.array) Solutions (n, n_systems)
+    '''
+
+    p = bands.shape[0] - 1
+    n = bands.shape[1]
+    D = bands[0]
+    L = bands
+
+    # A singular system gives a zero pivot, it is checked once at the end and not in each row
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j in range(n):
+            for k in range(1, min(p, j) + 1):
+                D[j] -= L[k, j - k] ** 2 * D[j - k]
+
+            # Terms of the column j under the diagonal
+            for k in range(1, min(p, n - 1 - j) + 1):
+                i = j + k
+                for m in range(max(i - p, 0), j):
+                    L[k, j] -= L[i - m, m] * L[j - m, m] * D[m]
+
+                L[k, j] /= D[j]
+
+    if not np.all(np.isfinite(D)) or np.any(D == 0):
+        raise np.linalg.LinAlgError("Singular matrix, check the boundary conditions of the model")
+
+    # Forward substitution, diagonal and backward substitution
+    for i in range(n):
+        for k in range(1, min(p, i) + 1):
+            b[i] -= L[k, i - k] * b[i - k]
+
+    b /= D
+
+    for i in range(n - 1, -1, -1):
+        for k in range(1, min(p, n - 1 - i) + 1):
+            b[i] -= L[k, i] * b[i + k]
+
+    return b
+
+
+def band_order(x, connectivity):
+    '''
+    The order of the rows of a banded matrix and its bandwidth are obtained
+
+    The nodes are sorted by their coordinate, in this way a chain of elements gives a tridiagonal matrix
+    independently of the order in which the nodes were created.
+
+    :param x: (np.array) Coordinates of the nodes
+    :param connectivity: (np.array) Global id of the nodes of each element (n_elements, nodes per element)
+    :return: (np.array, int) Order of the rows and bandwidth
+    '''
+
+    order = np.argsort(np.asarray(x, dtype=float), kind="stable")
+
+    rank = np.empty(len(order), dtype=int)
+    rank[order] = np.arange(len(order))
+
+    connectivity = np.asarray(connectivity, dtype=int)
+    if connectivity.size == 0:
+        return order, 0
+
+    ranks = rank[connectivity]
+    bandwidth = int(np.max(ranks.max(axis=1) - ranks.min(axis=1)))
+
+    return order, bandwidth
+
+
+class DenseFactorization:
+    '''
+    Wrapper of a dense matrix with the same interface as BandedLDL
+
+    The dense storage is only kept for debugging, so the matrix is not factorized and every solve costs O(n^3).
+    '''
+
+    def __init__(self, K, dtype=float):
+        '''
+        Constructor of the class DenseFactorization
+
+        :param K: (np.array) Matrix of the system
+        :param dtype: (np.dtype) Type of the stored matrix
+        '''
+
+        self.K = np.asarray(K, dtype=dtype)
+
+    def solve(self, b):
+        '''
+        The system K·x = b is solved
+
+        :param b: (np.array) Right hand side (n,) or (n, m)
+        :return: (np.array) Solution, in the precision of the stored matrix
+        '''
+
+        return np.linalg.solve(self.K, np.asarray(b, dtype=self.K.dtype))
+
+
+def factorize(K, dtype=float):
+    '''
+    The matrix of a system is factorized to solve several right hand sides with the same matrix
+
+    :param K: (np.array or BandedMatrix) Matrix of the system
+    :param dtype: (np.dtype) Type of the stored factorization, np.float32 for Precision.MIXED
+    :return: (BandedLDL or DenseFactorization) Factorization with a method solve(b)
+    '''
+
+    if isinstance(K, BandedMatrix):
+        return BandedLDL(K, dtype)
+
+    return DenseFactorization(K, dtype)
+
+
+def iterative_refinement(factorization, K, b, tolerance=1e-14, maximum_iterations=10, norm_K=0.0):
+    '''
+    The solution of a factorization in low precision is corrected with the residuals computed in float64
+
+        x_0 = solve(b),    x_k+1 = x_k + solve(b - K·x_k)
+
+    The solves are done in the precision of the factorization and the residuals and the solution in float64.
+
+    Each correction gains the digits of the low precision while the factorization is a good approximation of
+    the matrix. The iterations stop when ||r|| <= tolerance·||b|| + eps·||K||·||x||, the accuracy that a solution
+    in float64 can have.
+
+    :param factorization: (BandedLDL or DenseFactorization) Factorization of the matrix, in low precision
+    :param K: (np.array or BandedMatrix) Matrix of the system, in float64
+    :param b: (np.array) Right hand side (n,)
+    :param tolerance: (float) Relative tolerance of the norm of the residual
+    :param maximum_iterations: (int) Maximum number of corrections
+    :param norm_K: (float) Norm of the matrix
+    :return: (np.array, int, float) Solution, number of corrections and relative norm of the residual
+    '''
+
+    b = np.asarray(b, dtype=float)
+    norm_b = np.linalg.norm(b)
+    eps = np.finfo(float).eps
+
+    x = np.asarray(factorization.solve(b), dtype=float)
+    r = b - K @ x
+    residual = np.linalg.norm(r) / norm_b if norm_b > 0 else 0.0
+
+    iterations = 0
+    while residual * norm_b > tolerance * norm_b + eps * norm_K * np.linalg.norm(x):
+        if iterations == maximum_iterations:
+            raise RuntimeError("The iterative refinement doesn't converge after {} corrections, relative residual "
+                               "{:.3e}. The system is too ill-conditioned for Precision.MIXED"
+                               .format(iterations, residual))
+
+        # The residual is rounded to the precision of the factorization in solve(), it is scaled to norm 1 so
+        # that the small residuals of the last corrections don't underflow
+        norm_r = np.linalg.norm(r)
+        x += norm_r * factorization.solve(r / norm_r)
+        r = b - K @ x
+
+        iterations += 1
+        residual = np.linalg.norm(r) / norm_b
+
+    return x, iterations, residual
+
+
+def solve(K, f):
+    '''
+    The system K·x = f is solved
+
+    :param K: (np.array or BandedMatrix) Matrix of the system
+    :param f: (np.array) Right hand side
+    :return: (np.array) Solution
+    '''
+
+    return factorize(K).solve(f)
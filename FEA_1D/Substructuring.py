@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+
+from FEA_1D.Shared import map_shared, shared
+from FEA_1D.Solver import BandedMatrix, band_order, factorize
+
+
+def solve_substructured(model, f, processes=None, chunksize=None):
+    '''
+    The model is solved by substructuring: each beam is condensed to a superelement of its boundary nodes
+
+    The interior nodes of a beam (the nodes created by the mesh) are only connected to the rest of the model
+    through the ends of the beam. They are eliminated with a static condensation of each beam in a pool of
+    processes:
+
+        S = K_bb - K_bi · K_ii^-1 · K_ib        g = - K_bi · K_ii^-1 · f_i
+
+    The small system of the boundary nodes (ends of the beams, constrained nodes and nodes shared by several beams)
+    is solved, and the interior displacements are recovered with the vectors of the condensation:
+
+        u_i = K_ii^-1 · f_i - K_ii^-1 · K_ib · u_b
+
+    :param model: (Model) Meshed model
+    :param f: (np.array) Global load vectors (n_nodes, n_cases)
+    :param processes: (int) Number of processes. All the cores by default, 1 to solve without a pool
+    :param chunksize: (int) Number of beams condensed by a process in each task
+    :return: (np.array, np.array) Displacements and reactions of the nodes (n_nodes, n_cases)
+    '''
+
+    batch = model.element_batch()
+    n = model.n_nodes
+    x = model.nodes.x[:n]
+    f = np.asarray(f, dtype=float).reshape((n, -1))
+
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+    is_constrained = ~np.isnan(displacements_imposed)
+
+    # Position in the batch of the elements of each beam
+    beams = [np.searchsorted(batch.ids, np.asarray(elements, dtype=int))
+             for elements in model.beam_elements.values() if len(elements)]
+    in_beam = np.zeros(batch.n_elements, dtype=bool)
+    for positions in beams:
+        in_beam[positions] = True
+
+    # Boundary nodes: constrained, ends of the beams, shared by several beams or used by elements without beam
+    is_boundary = is_constrained.copy()
+    is_boundary[batch.connectivity[~in_beam].ravel()] = True
+
+    count = np.zeros(n, dtype=int)
+    for positions in beams:
+        nodes = np.unique(batch.connectivity[positions])
+        count[nodes] += 1
+        is_boundary[nodes[[np.argmin(x[nodes]), np.argmax(x[nodes])]]] = True
+
+    is_boundary |= count > 1
+
+    arrays = {"x": x,
+              "connectivity": batch.connectivity,
+              "K_e": batch._K(),
+              "f": f,
+              "is_boundary": is_boundary,
+              "positions": np.concatenate(beams) if beams else np.zeros(0, dtype=int),
+              "offsets": np.cumsum([0] + [len(positions) for positions in beams])}
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(beams) // (4 * processes))
+    chunks = [range(i, min(i + chunksize, len(beams))) for i in range(0, len(beams), chunksize)]
+
+    superelements = map_shared(_condense_chunk, chunks, arrays, processes)
+    superelements = [superelement for chunk in superelements for superelement in chunk]
+
+    # The system of the boundary nodes is assembled with the superelements and the elements without beam
+    boundary = np.flatnonzero(is_boundary)
+    reduced = np.full(n, -1)
+    reduced[boundary] = np.arange(len(boundary))
+
+    # Terms of the elements without beam and of the superelements (rows, columns, values)
+    others = reduced[batch.connectivity[~in_beam]]
+    K_others = arrays["K_e"][~in_beam]
+    terms = [(np.broadcast_to(others[:, :, None], K_others.shape).ravel(),
+              np.broadcast_to(others[:, None, :], K_others.shape).ravel(), K_others.ravel())]
+
+    f_b = f[boundary].copy()
+    for interior, nodes, S, g, X_b, X_f in superelements:
+        rows, cols = np.meshgrid(reduced[nodes], reduced[nodes], indexing="ij")
+        terms.append((rows.ravel(), cols.ravel(), S.ravel()))
+        f_b[reduced[nodes]] += g
+
+    rows, cols, values = (np.concatenate(t) for t in zip(*terms))
+
+    order, bandwidth = band_order(x[boundary], np.column_stack([rows, cols]))
+    K_b = BandedMatrix(len(boundary), bandwidth, order)
+    K_b.add(rows, cols, values)
+
+    # Partition in free and constrained boundary nodes
+    constrained = is_constrained[boundary]
+    free = np.flatnonzero(~constrained)
+    u_c = np.where(constrained, displacements_imposed[boundary], 0)[:, None]
+
+    u_b = np.repeat(u_c, f.shape[1], axis=1)
+    u_b[free] = factorize(K_b.submatrix(free)).solve(f_b[free] - (K_b @ u_c)[free])
+
+    delta = np.zeros_like(f)
+    delta[boundary] = u_b
+
+    # Recovery of the interior nodes of each beam
+    for interior, nodes, S, g, X_b, X_f in superelements:
+        delta[interior] = X_f - X_b @ u_b[reduced[nodes]]
+
+    reactions = np.zeros_like(f)
+    reactions[boundary[constrained]] = (K_b @ u_b - f_b)[constrained]
+
+    return delta, reactions
+
+
+def _condense_chunk(beams):
+    '''
+    The beams of a chunk are condensed to their boundary nodes with the shared arrays of the mesh
+
+    :param beams: (range) Index of the beams
+    :return: (list) Superelement of each beam (interior nodes, boundary nodes, S, g, K_ii^-1·K_ib, K_ii^-1·f_i)
+    '''
+
+    s = shared
+    return [_condense(s["positions"][s["offsets"][b]:s["offsets"][b + 1]]) for b in beams]
+
+
+def _condense(positions):
+    '''
+    Static condensation of the interior nodes of a beam
+
+    :param positions: (np.array) Position in the batch of the elements of the beam
+    :return: (tuple) Interior nodes, boundary nodes, condensed stiffness S, condensed loads g, K_ii^-1·K_ib and
+        K_ii^-1·f_i
+    '''
+
+    s = shared
+    connectivity = s["connectivity"][positions]
+    K_e = s["K_e"][positions]
+
+    nodes = np.unique(connectivity)
+    boundary = nodes[s["is_boundary"][nodes]]
+    interior = nodes[~s["is_boundary"][nodes]]
+
+    # Local index of each node in the interior or the boundary block
+    is_interior = ~s["is_boundary"][connectivity]
+    index = np.where(is_interior, np.searchsorted(interior, connectivity), np.searchsorted(boundary, connectivity))
+
+    rows = np.broadcast_to(index[:, :, None], K_e.shape)
+    cols = np.broadcast_to(index[:, None, :], K_e.shape)
+    row_interior = np.broadcast_to(is_interior[:, :, None], K_e.shape)
+    col_interior = np.broadcast_to(is_interior[:, None, :], K_e.shape)
+
+    # Blocks of the stiffness matrix of the beam, K_ii is banded
+    K_bb = np.zeros((len(boundary), len(boundary)))
+    block = ~row_interior & ~col_interior
+    np.add.at(K_bb, (rows[block], cols[block]), K_e[block])
+
+    K_ib = np.zeros((len(interior), len(boundary)))
+    block = row_interior & ~col_interior
+    np.add.at(K_ib, (rows[block], cols[block]), K_e[block])
+
+    n_cases = s["f"].shape[1]
+    if len(interior) == 0:
+        return interior, boundary, K_bb, np.zeros((len(boundary), n_cases)), K_ib, np.zeros((0, n_cases))
+
+    block = row_interior & col_interior
+    order, bandwidth = band_order(s["x"][interior], np.column_stack([rows[block], cols[block]]))
+    K_ii = BandedMatrix(len(interior), bandwidth, order)
+    K_ii.add(rows[block], cols[block], K_e[block])
+
+    # Each right hand side is solved alone, the substitution of a vector is the fastest
+    factorization = factorize(K_ii)
+    X_b = np.column_stack([factorization.solve(K_ib[:, j]) for j in range(len(boundary))])
+    X_f = np.column_stack([factorization.solve(s["f"][interior, j]) for j in range(n_cases)])
+
+    return interior, boundary, K_bb - K_ib.T @ X_b, -K_ib.T @ X_f, X_b, X_f
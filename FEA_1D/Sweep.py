@@ -0,0 +1,150 @@
+import itertools
+import os
+
+import numpy as np
+
+from FEA_1D.Elements import ELEMENT_BATCHES, Element
+from FEA_1D.Shared import map_shared, shared
+from FEA_1D.Solver import BandedMatrix, band_order, factorize
+
+
+def parametric_sweep(model, parameters, processes=None, chunksize=None):
+    '''
+    The model is solved for all the combinations of a grid of parameters
+
+    The parameters that can be changed are the Young's modulus "E", the area "A" and the distributed load "n_x"
+    of each beam. The variants are solved in a pool of processes. The arrays of the mesh are stored only once in
+    shared memory and all the processes read them without copying.
+
+    The variants are the cartesian product of the values of the parameters, in the order of the dictionary, and
+    the results are returned in the same order independently of the number of processes.
+
+    :param model: (Model) Meshed model used as template. It is not modified
+    :param parameters: (dict) Values of each parameter {("E" | "A" | "n_x", id beam): list of values}
+    :param processes: (int) Number of processes. All the cores by default, 1 to solve without a pool
+    :param chunksize: (int) Number of variants solved by a process in each task
+    :return: (dict) Results of the variants:
+        - "parameters": (np.array) Values of the parameters of each variant (n_variants, n_parameters)
+        - "tip_displacement": (np.array) Displacement of the node with the largest coordinate (n_variants,)
+        - "max_stress": (np.array) Maximum absolute stress in the elements (n_variants,)
+        - "reactions": (np.array) Reactions in the constrained nodes (n_variants, n_constrained)
+        - "constrained": (np.array) Global id of the constrained nodes
+    '''
+
+    keys = list(parameters)
+    for kind, id in keys:
+        if kind not in ("E", "A", "n_x"):
+            raise ValueError("Unknown parameter {}, it must be E, A or n_x".format(kind))
+
+        if id not in model.beams:
+            raise ValueError("The beam {} is not defined".format(id))
+
+    values = np.array(list(itertools.product(*parameters.values())), dtype=float).reshape((-1, len(keys)))
+
+    # The read-only arrays of the mesh
+    arrays = _mesh_arrays(model, keys)
+
+    n_variants = values.shape[0]
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, n_variants // (4 * processes))
+
+    # The variants are divided in chunks, a chunk is a task of the pool
+    chunks = [values[i:i + chunksize] for i in range(0, n_variants, chunksize)]
+
+    results = map_shared(_solve_chunk, chunks, arrays, processes)
+
+    if len(results) == 0:
+        results = [(np.zeros(0), np.zeros(0), np.zeros((0, len(arrays["constrained"]))))]
+
+    return {"parameters": values,
+            "tip_displacement": np.concatenate([r[0] for r in results]),
+            "max_stress": np.concatenate([r[1] for r in results]),
+            "reactions": np.concatenate([r[2] for r in results]),
+            "constrained": arrays["constrained"]}
+
+
+def _mesh_arrays(model, keys):
+    '''
+    The arrays of the mesh needed to solve a variant are obtained from the model
+
+    :param model: (Model) Meshed model
+    :param keys: (list) Parameters of the sweep [("E" | "A" | "n_x", id beam)]
+    :return: (dict) Arrays of the mesh
+    '''
+
+    batch = model.element_batch()
+    x = model.nodes.x[:model.n_nodes]
+
+    if batch.groups is not None and np.any(batch.groups >= 0):
+        raise NotImplementedError("Unimplemented method for models with properties defined as functions of x.")
+
+    order, bandwidth = band_order(x, batch.connectivity)
+    displacements_imposed = model.obtain_displacements_imposed()[:, 0]
+
+    # Mask of the elements of the beam of each parameter (n_parameters, n_elements)
+    masks = np.zeros((len(keys), batch.n_elements), dtype=bool)
+    for k, (kind, id) in enumerate(keys):
+        masks[k, np.searchsorted(batch.ids, model.beam_elements.get(id, []))] = True
+
+    return {"x": x,
+            "order": order,
+            "bandwidth": np.array([bandwidth]),
+            "element_type": np.array([(model.element_type or Element.LINEAR).value]),
+            "connectivity": batch.connectivity,
+            "x1": batch.x1,
+            "x2": batch.x2,
+            "E": batch.E,
+            "A": batch.A,
+            "n_x": batch.n_x,
+            "F": model.obtain_vector_forces()[:, 0],
+            "u": displacements_imposed,
+            "constrained": np.flatnonzero(~np.isnan(displacements_imposed)),
+            "kinds": np.array([["E", "A", "n_x"].index(kind) for kind, id in keys], dtype=int),
+            "masks": masks}
+
+
+def _solve_chunk(values):
+    '''
+    The variants of a chunk are solved with the shared arrays of the mesh
+
+    :param values: (np.array) Values of the parameters of each variant (n_variants, n_parameters)
+    :return: (tuple) Tip displacement, maximum stress and reactions of the variants
+    '''
+
+    s = shared
+    n = len(s["x"])
+    tip = int(np.argmax(s["x"]))
+
+    is_constrained = ~np.isnan(s["u"])
+    free = np.flatnonzero(~is_constrained)
+    u_c = np.where(is_constrained, s["u"], 0)
+
+    tip_displacement = np.zeros(len(values))
+    max_stress = np.zeros(len(values))
+    reactions = np.zeros((len(values), len(s["constrained"])))
+
+    for v, variant in enumerate(values):
+        properties = [s["E"].copy(), s["A"].copy(), s["n_x"].copy()]
+
+        # The values of the variant are applied to the elements of each beam
+        for kind, mask, value in zip(s["kinds"], s["masks"], variant):
+            properties[kind][mask] = value
+
+        batch = ELEMENT_BATCHES[Element(int(s["element_type"][0]))](s["connectivity"], s["x1"], s["x2"], *properties)
+
+        K_G = BandedMatrix(n, int(s["bandwidth"][0]), s["order"])
+        batch.scatter_K(K_G)
+
+        f_G = s["F"].reshape((-1, 1)).copy()
+        batch.scatter_f(f_G)
+        f_G = f_G[:, 0]
+
+        # Partition in free and constrained degrees of freedom
+        delta = u_c.copy()
+        delta[free] = factorize(K_G.submatrix(free)).solve(f_G[free] - (K_G @ u_c)[free])
+
+        tip_displacement[v] = delta[tip]
+        max_stress[v] = np.max(np.abs(batch.sigma_chi(delta, np.arange(batch.n_elements), 0)), initial=0)
+        reactions[v] = (K_G @ delta)[s["constrained"]] - f_G[s["constrained"]]
+
+    return tip_displacement, max_stress, reactions
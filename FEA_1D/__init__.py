@@ -4,4 +4,12 @@ from FEA_1D.Model import Model
 from FEA_1D.Material import *
 from FEA_1D.Beam import *
 from FEA_1D.Section import *
+from FEA_1D.Distribution import PiecewiseLinear
+from FEA_1D.Solver import *
+from FEA_1D.Profiler import Profiler
+from FEA_1D.Plasticity import NonlinearMethod
+from FEA_1D.Iterative import Preconditioner
+from FEA_1D.Sweep import parametric_sweep
+from FEA_1D.MonteCarlo import monte_carlo
+from FEA_1D.IO import save_model, load_model, iter_fields, export_fields, load_fields
 
@@ -27,19 +27,10 @@ model.mesh(element_size)
 
 model.Solve()
 
-list_x = []
-list_delta = []
-list_F = []
-
-# The displacement of the nodes are plotted
-list_x = []
-list_delta = []
-list_F = []
-
-for i in np.linspace(0, 200, 1000):
-  list_x.append(i)
-  list_delta.append(model.delta_pos(i))
-  list_F.append(model.force_pos(i))
+# The displacement and the force are evaluated in all the points at once
+list_x = np.linspace(0, 200, 1000)
+list_delta = model.delta_pos(list_x)
+list_F = model.force_pos(list_x)
 
 
   # The displacement are plotted
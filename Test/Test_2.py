@@ -0,0 +1,68 @@
+from FEA_1D import *
+
+
+def build_model(element_size, element=Element.LINEAR):
+    model = Model()
+
+    # The material and the section are defined
+    material = Material("Steel", 200e3)
+    section = Section(100)
+
+    # The nodes are added x [mm], F [N], u [mm]
+    model.add_aux_node(0, u=0)
+    model.add_aux_node(100, F=1000)
+    model.add_aux_node(200, F=2000)
+
+    # The beams are added
+    model.add_beam([0, 1], material, section, 0)
+    model.add_beam([1, 2], material, section, 100)
+
+    model.mesh(element_size, element=element)
+    return model
+
+
+def relative_error(model, delta):
+    return np.abs(model.delta - delta).max() / np.abs(delta).max()
+
+
+tolerance = 1e-10
+
+# The iterative solvers are compared with the direct solver in two meshes
+for element_size in (1, 0.1):
+    model = build_model(element_size)
+    model.Solve()
+    delta = model.delta.copy()
+
+    # Jacobi needs about one iteration per node (more with the rounding errors), the tridiagonal preconditioner
+    # is exact for linear elements and the iterations of multigrid don't depend on the size of the elements
+    maximum_iterations = {Preconditioner.JACOBI: 2 * model.n_nodes, Preconditioner.TRIDIAGONAL: 1,
+                          Preconditioner.MULTIGRID: 8}
+
+    for preconditioner, maximum in maximum_iterations.items():
+        model = build_model(element_size)
+        statistics = model.Solve_iterative(preconditioner, tolerance=tolerance)
+        print(element_size, preconditioner.name, statistics["iterations"], relative_error(model, delta))
+
+        assert max(statistics["iterations"]) <= maximum
+        assert relative_error(model, delta) < 1e-8
+
+    model = build_model(element_size)
+    statistics = model.Solve_multigrid(tolerance=tolerance)
+    print(element_size, "V-cycles", statistics["cycles"], relative_error(model, delta))
+
+    assert max(statistics["cycles"]) <= 10
+    assert relative_error(model, delta) < 1e-8
+
+# With quadratic elements the tridiagonal preconditioner only takes the coupling of neighbouring nodes
+for element_size in (1, 0.1):
+    model = build_model(element_size, Element.CUADRATIC)
+    model.Solve()
+    delta = model.delta.copy()
+
+    for preconditioner, maximum in ((Preconditioner.JACOBI, 2 * model.n_nodes), (Preconditioner.TRIDIAGONAL, 3)):
+        model = build_model(element_size, Element.CUADRATIC)
+        statistics = model.Solve_iterative(preconditioner, tolerance=tolerance)
+        print(element_size, "CUADRATIC", preconditioner.name, statistics["iterations"], relative_error(model, delta))
+
+        assert max(statistics["iterations"]) <= maximum
+        assert relative_error(model, delta) < 1e-8
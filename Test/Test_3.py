@@ -0,0 +1,53 @@
+from FEA_1D import *
+
+
+def build_model(element=Element.LINEAR):
+    model = Model()
+
+    # The material and the section are defined, the Young's modulus of the second material is a function of x
+    steel = Material("Steel", 200e3)
+    aluminium = Material("Aluminium", lambda x: 70e3 + 10 * x)
+    section = Section(100)
+
+    # The nodes are added x [mm], F [N], u [mm]
+    model.add_aux_node(0, u=0)
+    model.add_aux_node(100, F=1000)
+    model.add_aux_node(200, F=2000)
+
+    # The beams are added
+    model.add_beam([0, 1], steel, section, 0)
+    model.add_beam([1, 2], aluminium, section, 100)
+
+    model.mesh(10, element=element)
+    return model
+
+
+# Changes made through the views of the nodes and the elements, (model, id) -> None
+changes = {"force of a node": lambda model, id: setattr(model.nodes[id], "F", 9999),
+           "displacement of a constrained node": lambda model, id: setattr(model.nodes[0], "u", 0.5),
+           "support of a free node": lambda model, id: setattr(model.nodes[id], "u", 0),
+           "Young's modulus of an element": lambda model, id: setattr(model.elements[1], "E", 1e3),
+           "area of an element with E(x)": lambda model, id: setattr(model.elements[model.n_elements], "A", 10),
+           "load of an element": lambda model, id: setattr(model.elements[2], "n_x", 500)}
+
+for element in (Element.LINEAR, Element.CUADRATIC):
+    for name, change in changes.items():
+        # The model is solved, changed through a view and solved again
+        model = build_model(element)
+        model.Solve()
+        delta = model.delta.copy()
+
+        id = model.created_node(150).id_global
+        change(model, id)
+        model.Solve()
+
+        # The reference is changed before it's solved for the first time, so everything is computed
+        reference = build_model(element)
+        change(reference, id)
+        reference.Solve()
+
+        error = np.abs(model.delta - reference.delta).max() / np.abs(reference.delta).max()
+        print(element.name, name, np.abs(model.delta - delta).max(), error)
+
+        assert not np.allclose(model.delta, delta)
+        assert error < 1e-10